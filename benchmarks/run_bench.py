@@ -0,0 +1,143 @@
+"""
+MySekai 分析流程基准测试 (离线运行，不需要真实游戏资源)。
+
+在仓库根目录执行:
+    python -m benchmarks.run_bench --drops 200 --repeat 5 --output bench.json
+
+每个阶段单独计时: 第一次在全新 loader 上运行记为冷启动，其余重复记为热运行。
+结果以 JSON 输出，可在不同提交之间对比。插件本身需要可用的 configs.py 与字体文件。
+"""
+import argparse
+import json
+import os
+import platform
+import runpy
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.synthetic import make_encrypted_bin, make_fake_resources, make_payload  # noqa: E402
+
+BENCH_KEY = bytes(range(16))
+BENCH_IV = bytes(range(16, 32))
+REGION = "jp"
+
+
+PLUGIN_DIR = REPO_ROOT / "mysekaianalyser_plugin"
+
+
+def _import_plugin():
+    # 与渲染子进程一样登记一个不执行 __init__ 的插件包：包的 __init__ 会初始化 NoneBot 的匹配器、
+    # 创建临时目录、缓存目录与历史数据库，基准测试只需要 utils 下的模块
+    install_package_stub = runpy.run_path(str(PLUGIN_DIR / "utils" / "worker_bootstrap.py"))["install_package_stub"]
+    install_package_stub(PLUGIN_DIR.name, str(PLUGIN_DIR))
+    from mysekaianalyser_plugin.utils import decrypter, drawer, encoder, extractor, loader, md_index
+    return decrypter, drawer, encoder, extractor, loader, md_index
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+class StageTimer:
+    """记录各阶段每次运行的耗时 (毫秒)。"""
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    def run(self, stage: str, fn: Callable, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.samples.setdefault(stage, []).append((time.perf_counter() - start) * 1000)
+        return result
+
+    def report(self) -> Dict[str, dict]:
+        report = {}
+        for stage, samples in self.samples.items():
+            warm = samples[1:] or samples
+            report[stage] = {
+                "cold_ms": round(samples[0], 3),
+                "warm_min_ms": round(min(warm), 3),
+                "warm_median_ms": round(statistics.median(warm), 3),
+                "warm_mean_ms": round(statistics.fmean(warm), 3),
+                "runs": len(samples),
+            }
+        return report
+
+
+def run(drops: int, fixtures: int, filler: int, repeat: int, seed: int, show_harvested: bool) -> dict:
+    decrypter, drawer, encoder_mod, extractor, loader_mod, md_index = _import_plugin()
+    import msgpack
+
+    payload = make_payload(drops, fixtures, filler, seed)
+    encrypted = make_encrypted_bin(payload, BENCH_KEY, BENCH_IV)
+    timer = StageTimer()
+    encoders = [encoder_mod.ImageEncoder(fmt) for fmt in encoder_mod.FILE_EXTENSIONS]
+    output_sizes = {}
+
+    with tempfile.TemporaryDirectory(prefix="msa_bench_") as tmp:
+        resource_path = make_fake_resources(Path(tmp) / "resources", REGION, seed=seed)
+        md_index.compile_masterdata_index(resource_path / "metadata" / REGION)
+        out_dir = Path(tmp) / "out"
+        out_dir.mkdir()
+        loader = loader_mod.LocalAssetLoader(resource_path, REGION)
+
+        for _ in range(repeat):
+            plain = timer.run("decrypt_aes_cbc_pkcs7", decrypter.decrypt_aes_cbc_pkcs7, encrypted, BENCH_KEY, BENCH_IV)
+            data = timer.run("msgpack.unpackb", msgpack.unpackb, plain, raw=False)
+            timer.run("decrypt_and_parse_bin_bytes", decrypter.decrypt_and_parse_bin_bytes, encrypted, BENCH_KEY, BENCH_IV)
+            summary_data = timer.run("extract_summary_data", extractor.extract_summary_data, data, loader, show_harvested)
+            map_data_list = timer.run("extract_all_harvest_map_data", extractor.extract_all_harvest_map_data, data, loader, show_harvested)
+            summary_image = timer.run("draw_summary_image", drawer.draw_summary_image, summary_data, loader)
+            map_images = timer.run("draw_harvest_map_image", lambda: [drawer.draw_harvest_map_image(d, loader) for d in map_data_list])
+            maps_image = timer.run("combine_maps", drawer.combine_maps, map_images)
+            timer.run("combine_and_save_maps", drawer.combine_and_save_maps, map_data_list, loader, str(out_dir / "maps.png"))
+            for enc in encoders:
+                encoded = timer.run(enc.stage_name, lambda: (enc.encode(summary_image), enc.encode(maps_image)))
+                output_sizes[enc.format] = [len(b) if b else 0 for b in encoded]
+
+    return {
+        "revision": _git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": {"drops_per_site": drops, "fixtures_per_site": fixtures, "filler_items": filler, "repeat": repeat, "seed": seed,
+                   "show_harvested": show_harvested, "bin_bytes": len(encrypted)},
+        "stages": timer.report(),
+        "output_bytes": {fmt: {"summary": s, "maps": m} for fmt, (s, m) in output_sizes.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MySekai 分析流程基准测试")
+    parser.add_argument("--drops", type=int, default=200, help="每个场景的掉落物数量")
+    parser.add_argument("--fixtures", type=int, default=40, help="每个场景的采集点数量")
+    parser.add_argument("--filler", type=int, default=2000, help="分析器不读取的家具条目数量")
+    parser.add_argument("--repeat", type=int, default=5, help="每个阶段的重复次数 (第一次为冷启动)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--hide-harvested", action="store_true", help="不显示已采集的资源")
+    parser.add_argument("--output", type=str, default="", help="结果 JSON 路径，默认输出到标准输出")
+    args = parser.parse_args()
+
+    result = run(args.drops, args.fixtures, args.filler, max(1, args.repeat), args.seed, not args.hide_harvested)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+        print(f"结果已写入 {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
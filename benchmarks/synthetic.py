@@ -0,0 +1,170 @@
+"""
+合成 MySekai 数据与伪造资源树，供基准测试离线使用 (不需要任何真实游戏资源)。
+
+- make_payload(): 生成与真实解密结果结构一致的数据
+- make_encrypted_bin(): 按 AES/CBC/PKCS7 + MessagePack 生成对应的 .bin
+- make_fake_resources(): 生成小型的元数据 JSON 与占位 PNG
+"""
+import json
+import os
+import random
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import msgpack
+from cryptography.hazmat.primitives import padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from PIL import Image, ImageDraw
+
+SITE_IDS = (5, 6, 7, 8)
+MATERIAL_IDS = list(range(1, 71))
+ITEM_IDS = list(range(1, 11))
+FIXTURE_IDS = list(range(1, 131))
+MUSIC_RECORD_IDS = list(range(1, 21))
+PHENOMENA_IDS = list(range(1, 9))
+HARVEST_FIXTURE_IDS = list(range(1, 41))
+RARITY_TYPES = ("rarity_1", "rarity_2", "rarity_3")
+CHARACTER_UNIT_IDS = list(range(1, 41))
+
+# 资源类型及其抽样权重，大致接近真实账号
+RESOURCE_TYPES = (
+    ("mysekai_material", MATERIAL_IDS, 80),
+    ("mysekai_item", ITEM_IDS, 6),
+    ("mysekai_fixture", FIXTURE_IDS, 6),
+    ("mysekai_music_record", MUSIC_RECORD_IDS, 3),
+    ("material", [17, 170, 173], 5),
+)
+
+
+def _random_position(rng: random.Random) -> Tuple[float, float]:
+    return rng.randint(-24, 24) / 2, rng.randint(-24, 24) / 2
+
+
+def _make_site(rng: random.Random, site_id: int, drops: int, fixtures: int) -> dict:
+    fixture_list, positions = [], []
+    for _ in range(fixtures):
+        x, z = _random_position(rng)
+        positions.append((x, z))
+        fixture_list.append({
+            "mysekaiSiteHarvestFixtureId": rng.choice(HARVEST_FIXTURE_IDS),
+            "positionX": x, "positionZ": z,
+            "userMysekaiSiteHarvestFixtureStatus": "spawned" if rng.random() < 0.8 else "harvested",
+        })
+
+    types = [t for t in RESOURCE_TYPES]
+    weights = [t[2] for t in RESOURCE_TYPES]
+    drop_list = []
+    for _ in range(drops):
+        # 掉落物大多堆在采集点上，少量散落
+        x, z = rng.choice(positions) if positions and rng.random() < 0.85 else _random_position(rng)
+        res_type, ids, _ = rng.choices(types, weights)[0]
+        drop_list.append({
+            "resourceType": res_type,
+            "resourceId": rng.choice(ids),
+            "positionX": x, "positionZ": z,
+            "quantity": rng.choices((1, 2, 3, 6), (70, 18, 8, 4))[0],
+            "mysekaiSiteHarvestResourceDropStatus": "before_drop" if rng.random() < 0.8 else "dropped",
+        })
+    return {
+        "mysekaiSiteId": site_id,
+        "userMysekaiSiteHarvestFixtures": fixture_list,
+        "userMysekaiSiteHarvestResourceDrops": drop_list,
+    }
+
+
+def make_payload(drops_per_site: int = 200, fixtures_per_site: int = 40, filler_items: int = 2000, seed: int = 0) -> dict:
+    """
+    生成合成数据。filler_items 控制分析器不读取的顶层字段体积，模拟真实文件中的其它数据。
+    """
+    rng = random.Random(seed)
+    return {
+        "updatedResources": {
+            "now": int(time.mktime((2025, 1, 1, 10, 0, 0, 0, 0, -1)) * 1000),
+            "userMysekaiHarvestMaps": [_make_site(rng, site_id, drops_per_site, fixtures_per_site) for site_id in SITE_IDS],
+            "userMysekaiMusicRecords": [{"mysekaiMusicRecordId": i} for i in rng.sample(MUSIC_RECORD_IDS, 8)],
+        },
+        "mysekaiPhenomenaSchedules": [{"mysekaiPhenomenaId": rng.choice(PHENOMENA_IDS)} for _ in range(2)],
+        "userMysekaiGateCharacterVisit": {
+            "userMysekaiGate": {"mysekaiGateId": rng.randint(1, 5), "mysekaiGateLevel": rng.randint(1, 40)},
+            "userMysekaiGateCharacters": [{"mysekaiGameCharacterUnitGroupId": i} for i in rng.sample(CHARACTER_UNIT_IDS, 5)],
+        },
+        "userMysekaiFixtures": [
+            {"mysekaiFixtureId": rng.choice(FIXTURE_IDS), "positionX": rng.random(), "positionZ": rng.random(), "rotation": rng.randint(0, 3)}
+            for _ in range(filler_items)
+        ],
+    }
+
+
+def make_encrypted_bin(payload: dict, key: bytes, iv: bytes) -> bytes:
+    plain = msgpack.packb(payload, use_bin_type=True)
+    padder = padding.PKCS7(algorithms.AES.block_size).padder()
+    padded = padder.update(plain) + padder.finalize()
+    encryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).encryptor()
+    return encryptor.update(padded) + encryptor.finalize()
+
+
+def _color(rng: random.Random) -> Tuple[int, int, int, int]:
+    return rng.randint(40, 255), rng.randint(40, 255), rng.randint(40, 255), 255
+
+
+def _save_icon(path: Path, size: Tuple[int, int], rng: random.Random):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    image = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((2, 2, size[0] - 3, size[1] - 3), fill=_color(rng), outline=(0, 0, 0, 255), width=2)
+    image.save(path)
+
+
+def _save_site_map(path: Path, rng: random.Random):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    image = Image.new("RGBA", (1920, 1080), _color(rng))
+    draw = ImageDraw.Draw(image)
+    for _ in range(60):
+        x, y = rng.randint(0, 1920), rng.randint(0, 1080)
+        r = rng.randint(20, 120)
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=_color(rng))
+    image.save(path)
+
+
+def _write_json(path: Path, rows: List[Dict]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False)
+
+
+def make_fake_resources(root, region: str = "jp", icon_size: int = 128, seed: int = 0) -> Path:
+    """在 root 下生成与 RESOURCE_PATH 结构一致的伪造资源树，返回 root。"""
+    rng = random.Random(seed)
+    root = Path(root)
+    metadata = root / "metadata" / region
+    assets = root / "assets" / region
+    static = root / "static_images"
+    os.makedirs(assets, exist_ok=True)
+
+    _write_json(metadata / "mysekaiMaterials.json", [{"id": i, "iconAssetbundleName": f"item_material_{i}"} for i in MATERIAL_IDS])
+    _write_json(metadata / "mysekaiItems.json", [{"id": i, "iconAssetbundleName": f"item_{i}"} for i in ITEM_IDS])
+    _write_json(metadata / "mysekaiFixtures.json", [{"id": i, "assetbundleName": f"fixture_{i}"} for i in FIXTURE_IDS])
+    _write_json(metadata / "musics.json", [{"id": 100 + i, "assetbundleName": f"jacket_s_{100 + i:03d}"} for i in MUSIC_RECORD_IDS])
+    _write_json(metadata / "mysekaiMusicRecords.json", [{"id": i, "externalId": 100 + i} for i in MUSIC_RECORD_IDS])
+    _write_json(metadata / "mysekaiPhenomenas.json", [{"id": i, "iconAssetbundleName": f"phenom_{i}"} for i in PHENOMENA_IDS])
+    _write_json(metadata / "mysekaiSiteHarvestFixtures.json", [
+        {"id": i, "assetbundleName": f"harvest_{i}", "mysekaiSiteHarvestFixtureRarityType": RARITY_TYPES[i % len(RARITY_TYPES)]}
+        for i in HARVEST_FIXTURE_IDS
+    ])
+
+    size = (icon_size, icon_size)
+    for i in MATERIAL_IDS: _save_icon(assets / f"mysekai/thumbnail/material/item_material_{i}.png", size, rng)
+    for i in ITEM_IDS: _save_icon(assets / f"mysekai/thumbnail/item/item_{i}.png", size, rng)
+    for i in FIXTURE_IDS: _save_icon(assets / f"mysekai/thumbnail/fixture/fixture_{i}_1.png", size, rng)
+    for i in MUSIC_RECORD_IDS: _save_icon(assets / f"music/jacket/jacket_s_{100 + i:03d}/jacket_s_{100 + i:03d}.png", size, rng)
+    for i in (17, 170, 173): _save_icon(assets / f"thumbnail/material/{i}.png", size, rng)
+    for i in PHENOMENA_IDS: _save_icon(assets / f"mysekai/thumbnail/phenomena/phenom_{i}.png", size, rng)
+    for i in CHARACTER_UNIT_IDS: _save_icon(assets / f"character/character_sd_l/chr_sp_{i}.png", (200, 160), rng)
+    for site_id in SITE_IDS: _save_site_map(assets / f"mysekai/site_map/{site_id}.png", rng)
+
+    for i in HARVEST_FIXTURE_IDS:
+        _save_icon(static / f"mysekai/harvest_fixture_icon/{RARITY_TYPES[i % len(RARITY_TYPES)]}/harvest_{i}.png", (256, 256), rng)
+    for i in range(1, 6): _save_icon(static / f"mysekai/gate_icon/gate_{i}.png", size, rng)
+    _save_icon(static / "mysekai/light.png", (256, 256), rng)
+    return root
@@ -1,14 +1,16 @@
 import asyncio
 import hashlib
-import shutil
+import os
+import time
 from datetime import datetime
 from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
 
 import orjson
-import aiohttp
 from nonebot.log import logger
 from nonebot.plugin import PluginMetadata
-from nonebot import require, on_message, on_command
+from nonebot.params import CommandArg
+from nonebot import require, on_message, on_command, get_driver
 from nonebot.adapters.onebot.v11 import (
     Bot,
     MessageEvent,
@@ -19,15 +21,31 @@ from nonebot.adapters.onebot.v11 import (
 )
 
 # 导入本地模块
-from .rules import is_valid_sekai_file, is_valid_user
-from .configs import (TEMP_PATH, RESOURCE_PATH, TARGET_REGION, SHOW_HARVESTED, AES_KEY_BYTES, AES_IV_BYTES)
+from .rules import is_valid_sekai_file, is_valid_sekai_batch, is_valid_user, get_sekai_files
+from .configs import (TEMP_PATH, RESOURCE_PATH, TARGET_REGION, SHOW_HARVESTED, AES_KEY_BYTES, AES_IV_BYTES, IMAGE_CACHE_MAX_BYTES,
+                      SPRITE_CACHE_MAX_BYTES, DEBUG_SAVE_TEMP_FILES, MAX_UPLOAD_BYTES,
+                      DOWNLOAD_TIMEOUT, RENDER_MODE, RENDER_PROCESSES, TIMEOUT, JOB_QUEUE_SIZE, JOB_WORKERS,
+                      RESULT_CACHE_ENABLED, RESULT_CACHE_PATH, RESULT_CACHE_TTL, RESULT_CACHE_MAX_BYTES, ASSET_STORE,
+                      METRICS_EXPORTER_ENABLED, METRICS_EXPORTER_HOST, METRICS_EXPORTER_PORT, WARMUP_ENABLED,
+                      LOOP_LAG_INTERVAL, LOOP_LAG_TARGET, BATCH_MAX_FILES, BATCH_PROCESSES, HISTORY_ENABLED, HISTORY_DB_PATH)
 # --- 导入解密函数 ---
-from .utils.decrypter import decrypt_and_parse_bin_file
+from .utils.decrypter import StreamDecrypter, MYSEKAI_TOP_LEVEL_KEYS
+from .utils.downloader import SessionPool, DownloadError, FileTooLargeError
 # --------------------------
-from .utils.loader import LocalAssetLoader
+from .utils.loader import LocalAssetLoader, get_shared_loader, clear_shared_loaders
 from .utils.asset_updator import update_resources
-from .utils.drawer import combine_and_save_maps, draw_summary_image
-from .utils.extractor import extract_all_harvest_map_data, extract_summary_data
+from .utils.pipeline import RenderedImages, render_images
+from .utils.drawer import SITE_ID_TO_NAME_MAP
+from .utils.render_pool import ProcessRenderPool
+from .utils.scheduler import JobScheduler, QueueFullError
+from .utils.result_cache import ResultCache, read_asset_version
+from .utils.extractor import MYSEKAI_HARVEST_MAP_IMAGE_SCALE, ENABLE_MAP_CROPPING
+from .utils.metrics import METRICS, OUTPUT_SIZES, LOOP_LAG, LoopLagMonitor, PrometheusExporter, format_output_sizes, format_loop_lag, timed
+from .utils.executor import BLOCKING_EXECUTOR, run_blocking
+from .utils.batch import BatchFile, BatchLimitError, expand_batch_files, is_zip_name, render_batch_report
+from .utils.history import HistoryStore
+from .utils.encoder import DEFAULT_ENCODER
+from .utils.warmup import Warmup, WarmupError, build_warmup_steps, COMPONENT_FONTS, COMPONENT_MASTERDATA, COMPONENT_SITE_MAPS
 
 __plugin_meta__ = PluginMetadata(
     name="MySekai文件解析",
@@ -37,35 +55,173 @@ __plugin_meta__ = PluginMetadata(
 
 TEMP_PATH.mkdir(exist_ok=True)
 
-async def download_file(url: str, save_path: Path) -> bool:
-    """文件下载"""
+driver = get_driver()
+session_pool = SessionPool(timeout=DOWNLOAD_TIMEOUT)
+
+@driver.on_startup
+async def _start_session_pool():
+    await session_pool.start()
+
+@driver.on_shutdown
+async def _close_session_pool():
+    await session_pool.close()
+
+job_scheduler = JobScheduler(max_queue=JOB_QUEUE_SIZE, workers=JOB_WORKERS, timeout=TIMEOUT)
+
+@driver.on_startup
+async def _start_job_scheduler():
+    job_scheduler.start()
+
+@driver.on_shutdown
+async def _stop_job_scheduler():
+    await job_scheduler.stop()
+
+loop_lag_monitor = LoopLagMonitor(
+    LOOP_LAG, LOOP_LAG_INTERVAL, LOOP_LAG_TARGET,
+    on_slow=lambda lag: logger.warning(f"事件循环阻塞 {lag * 1000:.0f}ms (目标 {LOOP_LAG_TARGET * 1000:.0f}ms)"),
+)
+
+@driver.on_startup
+async def _start_loop_lag_monitor():
+    loop_lag_monitor.start()
+
+@driver.on_shutdown
+async def _stop_loop_lag_monitor():
+    await loop_lag_monitor.stop()
+
+@driver.on_shutdown
+async def _stop_blocking_executor():
+    BLOCKING_EXECUTOR.shutdown()
+
+if METRICS_EXPORTER_ENABLED:
+    metrics_exporter = PrometheusExporter(METRICS, METRICS_EXPORTER_HOST, METRICS_EXPORTER_PORT, OUTPUT_SIZES, LOOP_LAG)
+
+    @driver.on_startup
+    async def _start_metrics_exporter():
+        await metrics_exporter.start()
+        logger.info(f"耗时统计导出已启动: http://{METRICS_EXPORTER_HOST}:{METRICS_EXPORTER_PORT}/metrics")
+
+    @driver.on_shutdown
+    async def _stop_metrics_exporter():
+        await metrics_exporter.stop()
+
+render_pool = ProcessRenderPool(
+    RENDER_PROCESSES, RESOURCE_PATH, TARGET_REGION, IMAGE_CACHE_MAX_BYTES, SPRITE_CACHE_MAX_BYTES, ASSET_STORE == "atlas"
+) if RENDER_MODE == "process" else None
+
+if render_pool is not None:
+    @driver.on_startup
+    async def _start_render_pool():
+        await run_blocking(render_pool.start)
+        logger.info(f"渲染进程池已就绪: {RENDER_PROCESSES} 个进程")
+
+    @driver.on_shutdown
+    async def _stop_render_pool():
+        render_pool.shutdown()
+
+# 批量解析的进程池：进程渲染模式下复用渲染进程池，否则单独创建 (首次批量解析时启动)。
+# 子进程不是 fork 出来的，启动时机不受预热线程与插件线程池状态的影响
+batch_pool = render_pool if render_pool is not None else ProcessRenderPool(
+    BATCH_PROCESSES or os.cpu_count() or 1, RESOURCE_PATH, TARGET_REGION, IMAGE_CACHE_MAX_BYTES, SPRITE_CACHE_MAX_BYTES, ASSET_STORE == "atlas"
+)
+
+if batch_pool is not render_pool:
+    @driver.on_shutdown
+    async def _stop_batch_pool():
+        batch_pool.shutdown()
+
+result_cache = ResultCache(RESULT_CACHE_PATH, RESULT_CACHE_TTL, RESULT_CACHE_MAX_BYTES) if RESULT_CACHE_ENABLED else None
+
+history_store = HistoryStore(HISTORY_DB_PATH) if HISTORY_ENABLED else None
+
+if history_store is not None:
+    @driver.on_startup
+    async def _start_history_store():
+        history_store.start()
+
+    @driver.on_shutdown
+    async def _stop_history_store():
+        await run_blocking(history_store.stop)
+
+def get_result_cache_key(content_digest: str) -> str:
+    """结果缓存键：文件内容 + 影响输出的配置 + 资源版本"""
+    return ResultCache.make_key(
+        content_digest,
+        show_harvested=SHOW_HARVESTED,
+        region=TARGET_REGION,
+        scale=MYSEKAI_HARVEST_MAP_IMAGE_SCALE,
+        cropping=ENABLE_MAP_CROPPING,
+        output_format=DEFAULT_ENCODER.format,
+        png_compress_level=DEFAULT_ENCODER.png_compress_level,
+        quality=DEFAULT_ENCODER.quality,
+        webp_method=DEFAULT_ENCODER.webp_method,
+        quantize_colors=DEFAULT_ENCODER.quantize_colors,
+        asset_version=read_asset_version(RESOURCE_PATH),
+    )
+
+def get_loader() -> LocalAssetLoader:
+    """当前区服的进程级共享 loader"""
+    return get_shared_loader(RESOURCE_PATH, TARGET_REGION, IMAGE_CACHE_MAX_BYTES, SPRITE_CACHE_MAX_BYTES, ASSET_STORE == "atlas")
+
+warmup = Warmup(build_warmup_steps(get_loader))
+# 解析请求开始渲染前需要等待的预热组件；进程池模式下由子进程自行预热，主进程只检查字体
+RENDER_COMPONENTS = (COMPONENT_FONTS,) if render_pool is not None else (COMPONENT_FONTS, COMPONENT_MASTERDATA, COMPONENT_SITE_MAPS)
+
+if WARMUP_ENABLED:
+    @driver.on_startup
+    async def _start_warmup():
+        warmup.start()
+        logger.info("资源预热已在后台开始")
+
+    @driver.on_shutdown
+    async def _stop_warmup():
+        await warmup.stop()
+
+async def download_file(url: str, on_chunk: Callable[[bytes], None]) -> bool:
+    """文件下载，分块交给 on_chunk 处理 (直接送入解密)"""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=60) as response:
-                if response.status == 200:
-                    with open(save_path, "wb") as f:
-                        f.write(await response.read())
-                    return True
-                logger.error(f"文件下载失败，状态码: {response.status}, URL: {url}")
-                return False
+        size = await session_pool.stream_download(url, on_chunk, max_bytes=MAX_UPLOAD_BYTES)
+        logger.info(f"文件下载完成: {size} 字节")
+        return True
+    except FileTooLargeError:
+        raise
+    except DownloadError as e:
+        logger.error(f"文件下载失败: {e}, URL: {url}")
+        return False
     except Exception as e:
         logger.error(f"文件下载异常: {e}", exc_info=True)
         return False
 
-def generate_images_sync(json_path: Path, output_summary_path: Path, output_maps_path: Path):
+async def generate_images(mysekai_data: dict, timings: Optional[Dict[str, float]] = None) -> RenderedImages:
+    """按 RENDER_MODE 选择在进程池中并行渲染，或在单个线程中顺序渲染"""
+    if render_pool is None:
+        return await run_blocking(generate_images_sync, mysekai_data, timings)
+    start_time = datetime.now()
+    result = await render_pool.render(mysekai_data, SHOW_HARVESTED, timings)
+    logger.info(f"图片生成完毕 (进程池)，耗时 {(datetime.now() - start_time).total_seconds():.2f} 秒")
+    return result
+
+def generate_images_sync(mysekai_data: dict, timings: Optional[Dict[str, float]] = None) -> RenderedImages:
     """"图片生成"""
     start_time = datetime.now()
-    logger.info(f"图片生成开始: {json_path.name}")
-    loader = LocalAssetLoader(resource_path=RESOURCE_PATH, region=TARGET_REGION)
-    with open(json_path, "r", encoding="utf-8") as f:
-        mysekai_data = orjson.loads(f.read()) # 使用 orjson 加载更快
-    summary_data = extract_summary_data(mysekai_data, loader, SHOW_HARVESTED)
-    map_data_list = extract_all_harvest_map_data(mysekai_data, loader, SHOW_HARVESTED)
-    summary_image = draw_summary_image(summary_data, loader)
-    summary_image.save(output_summary_path)
-    combine_and_save_maps(map_data_list, loader, output_maps_path)
+    logger.info("图片生成开始")
+    loader = get_loader()
+    result = render_images(mysekai_data, loader, SHOW_HARVESTED, timings)
     duration = (datetime.now() - start_time).total_seconds()
-    logger.info(f"图片生成完毕，耗时 {duration:.2f} 秒")
+    logger.info(f"图片生成完毕，耗时 {duration:.2f} 秒 | 图像缓存: {loader.cache_stats()} | 缩放缓存: {loader.sprite_cache_stats()}")
+    return result
+
+def save_debug_files(task_dir: Path, file_name: str, encrypted_bytes: bytes, decrypted_data: dict, result: RenderedImages):
+    """调试模式下把中间结果写入临时目录，便于排查"""
+    task_dir.mkdir(parents=True, exist_ok=True)
+    (task_dir / file_name).write_bytes(encrypted_bytes)
+    (task_dir / "mysekai.json").write_bytes(orjson.dumps(decrypted_data, option=orjson.OPT_INDENT_2))
+    if result.summary_image: (task_dir / f"summary.{DEFAULT_ENCODER.extension}").write_bytes(result.summary_image)
+    if result.maps_image: (task_dir / f"maps.{DEFAULT_ENCODER.extension}").write_bytes(result.maps_image)
+    if result.site_maps is not None:
+        for map_name, image_bytes in result.site_maps.encoded_all().items():
+            (task_dir / f"maps_{map_name}.{result.site_maps.extension}").write_bytes(image_bytes)
+    logger.info(f"调试文件已写入: {task_dir}")
 
 
 sekai_handler = on_message(rule=is_valid_user() & is_valid_sekai_file(), priority=1, block=False)
@@ -91,66 +247,243 @@ async def handle_sekai_file(bot: Bot, event: GroupMessageEvent):
     if not file_url:
         await sekai_handler.finish("无法获取文件下载链接。", reply_message=True)
 
+    def runner():
+        return process_sekai_file(bot, event, file_name, file_url, start_time)
+
+    group_key = f"group_{event.group_id}" if isinstance(event, GroupMessageEvent) else f"private_{event.user_id}"
+    try:
+        job = job_scheduler.submit(group_key, event.user_id, runner)
+    except QueueFullError as e:
+        logger.warning(f"任务队列已满，拒绝解析: {file_name} | {e}")
+        await sekai_handler.finish("当前解析任务过多，请稍后再试。", reply_message=True)
+
+    if job_scheduler.will_start_immediately(job):
+        await bot.send(event=event, message="收到，正在为您解析 MySekai 文件...", reply_message=True)
+    else:
+        await bot.send(event=event, message=f"收到，当前排在第 {job_scheduler.position(job) + 1} 位，请稍候...", reply_message=True)
+
+    try:
+        await job.future
+    except asyncio.TimeoutError:
+        logger.error(f"解析任务超时 ({TIMEOUT} 秒): {file_name}")
+        await bot.send(event=event, message="解析超时，请稍后再试。", reply_message=True)
+    except asyncio.CancelledError:
+        logger.warning(f"解析任务已取消: {file_name}")
+
+def format_timings(timings: Dict[str, float]) -> str:
+    return " ".join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in timings.items())
+
+async def send_result(bot: Bot, event: MessageEvent, result: RenderedImages, start_time: datetime, timings: Dict[str, float]) -> bool:
+    """发送解析结果，返回是否包含有效图片"""
+    result_message = Message()
+    if result.summary_image and len(result.summary_image) > 1000:
+        result_message.append(MessageSegment.image(result.summary_image))
+    if result.maps_image and len(result.maps_image) > 1000:
+        result_message.append(MessageSegment.image(result.maps_image))
+
+    if result_message:
+        duration = (datetime.now() - start_time).total_seconds()
+        with timed(timings, "upload"):
+            await bot.send(event=event, message=Message(f"解析完成！\n耗时 {duration:.2f} 秒\n" + result_message), reply_message=True)
+        return True
+    await bot.send(event=event, message="图片生成失败，未找到有效结果。", reply_message=True)
+    return False
+
+async def process_sekai_file(bot: Bot, event: MessageEvent, file_name: str, file_url: str, start_time: datetime):
+    """单个 .bin 文件的完整处理流程，由调度器的 worker 执行"""
     unique_seed = f"{event.user_id}-{file_name}-{datetime.now().timestamp()}"
     task_hash = hashlib.sha1(unique_seed.encode()).hexdigest()[:10]
     task_dir = TEMP_PATH / task_hash
-    task_dir.mkdir(exist_ok=True)
-
-    local_bin_path = task_dir / file_name
-    decrypted_json_path = task_dir / "mysekai.json"
-    output_summary_path = task_dir / "summary.png"
-    output_maps_path = task_dir / "maps.png"
+    timings: Dict[str, float] = {}
 
     try:
-        sekai_handler.block = True
-        await bot.send(event=event, message="收到，正在为您解析 MySekai 文件...", reply_message=True)
+        # 调试模式下保留完整数据以便写出 json，否则只解析分析器需要的字段
+        decrypter = StreamDecrypter(AES_KEY_BYTES, AES_IV_BYTES, None if DEBUG_SAVE_TEMP_FILES else MYSEKAI_TOP_LEVEL_KEYS)
+        content_hash = hashlib.sha256()
+        encrypted_bytes = bytearray()
+        # 启用结果缓存时下载过程中只哈希并保留密文，命中缓存就不必解密；未启用时边下载边解密
+        buffer_ciphertext = result_cache is not None or DEBUG_SAVE_TEMP_FILES
+
+        def consume_chunk(chunk: bytes):
+            content_hash.update(chunk)
+            if buffer_ciphertext: encrypted_bytes.extend(chunk)
+            else: decrypter.feed(chunk)
+
+        def decrypt_file() -> dict:
+            if buffer_ciphertext: decrypter.feed(encrypted_bytes)
+            return decrypter.finalize()
 
-        if not await download_file(file_url, local_bin_path):
+        # 解密、解析与哈希都在插件线程池中进行，下载协程只负责搬运数据
+        def on_chunk(chunk: bytes):
+            return run_blocking(consume_chunk, chunk)
+
+        download_start = time.perf_counter()
+        try:
+            downloaded = await download_file(file_url, on_chunk)
+        except FileTooLargeError as e:
+            logger.warning(f"文件过大，已中止下载: {file_name} | {e}")
+            await bot.send(event=event, message="文件过大，已拒绝解析。", reply_message=True)
+            return
+        if not downloaded:
             await bot.send(event=event, message="文件下载失败，请稍后再试。", reply_message=True)
             return
+        # 边下载边解密时，同步进行的解密与解析单独计入 decrypt / parse
+        timings["download"] = time.perf_counter() - download_start - sum(decrypter.timings.values())
 
-        try:
-            encrypted_bytes = local_bin_path.read_bytes()
+        # 缓存键包含从磁盘读取的资源版本号
+        cache_key = await run_blocking(get_result_cache_key, content_hash.hexdigest()) if result_cache else None
+        if cache_key:
+            cached = await run_blocking(result_cache.get, cache_key)
+            if cached is not None:
+                logger.info(f"命中结果缓存: {file_name} ({cache_key[:12]})")
+                await send_result(bot, event, cached, start_time, timings)
+                return
 
+        try:
             logger.info(f"开始解密文件: {file_name}")
-            decrypted_data = await decrypt_and_parse_bin_file(encrypted_bytes, AES_KEY_BYTES, AES_IV_BYTES)
-
-            with open(decrypted_json_path, "wb") as f:
-                f.write(orjson.dumps(decrypted_data, option=orjson.OPT_INDENT_2))
-            logger.info(f"文件解密成功 -> {decrypted_json_path}")
+            decrypted_data = await run_blocking(decrypt_file)
+            timings.update(decrypter.timings)
+            logger.info(f"文件解密成功: {file_name}")
+            if history_store is not None:
+                history_store.record(str(event.user_id), decrypted_data)
 
         except Exception as e:
             logger.error(f"文件解密失败 for {file_name}: {e}", exc_info=True)
             await bot.send(event=event, message="文件解密失败，可能是文件损坏、格式不正确或密钥错误。", reply_message=True)
             return
 
-        await asyncio.to_thread(
-            generate_images_sync,
-            decrypted_json_path,
-            output_summary_path,
-            output_maps_path
-        )
-
-        result_message = Message()
-        if output_summary_path.exists() and output_summary_path.stat().st_size > 1000:
-            result_message.append(MessageSegment.image(output_summary_path))
-        if output_maps_path.exists() and output_maps_path.stat().st_size > 1000:
-            result_message.append(MessageSegment.image(output_maps_path))
-
-        if result_message:
-            duration = (datetime.now() - start_time).total_seconds()
-            await bot.send(event=event, message=Message(f"解析完成！\n耗时 {duration:.2f} 秒\n" + result_message), reply_message=True)
-        else:
-            await bot.send(event=event, message="图片生成失败，未找到有效结果。", reply_message=True)
+        if not warmup.is_ready(RENDER_COMPONENTS):
+            logger.info(f"等待资源预热完成: {file_name}")
+            try:
+                with timed(timings, "warmup_wait"):
+                    await warmup.wait_for(RENDER_COMPONENTS)
+            except WarmupError as e:
+                logger.error(f"资源预热失败，无法解析 {file_name}: {e}")
+                await bot.send(event=event, message="插件资源加载失败，请联系管理员。", reply_message=True)
+                return
+
+        result = await generate_images(decrypted_data, timings)
+        for image_bytes in (result.summary_image, result.maps_image):
+            if image_bytes: OUTPUT_SIZES.observe(DEFAULT_ENCODER.format, len(image_bytes))
+        if DEBUG_SAVE_TEMP_FILES:
+            await run_blocking(save_debug_files, task_dir, file_name, encrypted_bytes, decrypted_data, result)
+
+        if await send_result(bot, event, result, start_time, timings) and cache_key:
+            await run_blocking(result_cache.put, cache_key, result)
 
     except Exception as e:
         logger.error(f"处理 MySekai 文件时发生未知异常: {e}", exc_info=True)
         await bot.send(event=event, message="处理时发生内部错误，请联系管理员。", reply_message=True)
     finally:
-        sekai_handler.block = False
-        if task_dir.exists():
-            shutil.rmtree(task_dir)
-            logger.info(f"已清理临时目录: {task_dir}")
+        timings["total"] = (datetime.now() - start_time).total_seconds()
+        METRICS.observe_all(timings)
+        logger.info(f"阶段耗时 [{task_hash}]: {format_timings(timings)}")
+
+
+batch_handler = on_message(rule=is_valid_user() & is_valid_sekai_batch(), priority=1, block=False)
+
+@batch_handler.handle()
+async def handle_sekai_batch(bot: Bot, event: MessageEvent):
+    start_time = datetime.now()
+    files = get_sekai_files(event.message)
+
+    def runner():
+        return process_sekai_batch(bot, event, files, start_time)
+
+    group_key = f"group_{event.group_id}" if isinstance(event, GroupMessageEvent) else f"private_{event.user_id}"
+    try:
+        job = job_scheduler.submit(group_key, event.user_id, runner)
+    except QueueFullError as e:
+        logger.warning(f"任务队列已满，拒绝批量解析: {len(files)} 个文件 | {e}")
+        await batch_handler.finish("当前解析任务过多，请稍后再试。", reply_message=True)
+
+    position = "" if job_scheduler.will_start_immediately(job) else f"当前排在第 {job_scheduler.position(job) + 1} 位，"
+    await bot.send(event=event, message=f"收到 {len(files)} 个文件，{position}正在批量解析...", reply_message=True)
+
+    try:
+        await job.future
+    except asyncio.TimeoutError:
+        logger.error(f"批量解析任务超时 ({TIMEOUT} 秒)")
+        await bot.send(event=event, message="批量解析超时，请减少文件数量后再试。", reply_message=True)
+    except asyncio.CancelledError:
+        logger.warning("批量解析任务已取消")
+
+async def download_bytes(url: str, max_bytes: int) -> bytes:
+    buffer = bytearray()
+    await session_pool.stream_download(url, buffer.extend, max_bytes=max_bytes)
+    return bytes(buffer)
+
+async def process_sekai_batch(bot: Bot, event: MessageEvent, files: List[Tuple[str, str]], start_time: datetime):
+    """
+    批量解析：并发下载全部文件 (压缩包展开为其中的 .bin)，各账号在进程池中并行解密、提取并绘制统计图，
+    最后拼成一张带稀有资源汇总表的报告。
+    """
+    timings: Dict[str, float] = {}
+    try:
+        with timed(timings, "download"):
+            downloads = await asyncio.gather(
+                *(download_bytes(url, MAX_UPLOAD_BYTES * BATCH_MAX_FILES if is_zip_name(name) else MAX_UPLOAD_BYTES) for name, url in files),
+                return_exceptions=True,
+            )
+        batch_files, failures = [], []
+        for (name, _), data in zip(files, downloads):
+            if isinstance(data, BaseException):
+                logger.error(f"批量解析下载失败: {name} | {data}")
+                failures.append(name)
+            else:
+                batch_files.append(BatchFile(name, data))
+
+        try:
+            batch_files = await run_blocking(expand_batch_files, batch_files, BATCH_MAX_FILES, MAX_UPLOAD_BYTES)
+        except BatchLimitError as e:
+            await bot.send(event=event, message=f"批量解析已拒绝: {e}", reply_message=True)
+            return
+        if not batch_files:
+            await bot.send(event=event, message="没有可解析的 .bin 文件。", reply_message=True)
+            return
+
+        # 账号在子进程中渲染，主进程只绘制汇总表
+        try:
+            with timed(timings, "warmup_wait"):
+                await warmup.wait_for((COMPONENT_FONTS, COMPONENT_MASTERDATA))
+        except WarmupError as e:
+            logger.error(f"资源预热失败，无法批量解析: {e}")
+            await bot.send(event=event, message="插件资源加载失败，请联系管理员。", reply_message=True)
+            return
+
+        with timed(timings, "analyse"):
+            outcomes = await batch_pool.analyse_batch(batch_files, AES_KEY_BYTES, AES_IV_BYTES, SHOW_HARVESTED)
+        results = []
+        for file, outcome in zip(batch_files, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error(f"批量解析失败: {file.name} | {outcome}")
+                failures.append(file.name)
+            else:
+                results.append(outcome)
+                if history_store is not None:
+                    history_store.record_entry(str(event.user_id), outcome.history)
+        if not results:
+            await bot.send(event=event, message="所有文件均解析失败，可能是文件损坏、格式不正确或密钥错误。", reply_message=True)
+            return
+
+        report = await run_blocking(render_batch_report, results, get_loader(), timings)
+        if report: OUTPUT_SIZES.observe(DEFAULT_ENCODER.format, len(report))
+        duration = (datetime.now() - start_time).total_seconds()
+        text = f"批量解析完成！共 {len(results)} 个账号，耗时 {duration:.2f} 秒"
+        if failures: text += f"\n解析失败: {', '.join(failures)}"
+        message = Message(text + "\n")
+        if report: message.append(MessageSegment.image(report))
+        with timed(timings, "upload"):
+            await bot.send(event=event, message=message, reply_message=True)
+
+    except Exception as e:
+        logger.error(f"批量解析时发生未知异常: {e}", exc_info=True)
+        await bot.send(event=event, message="批量解析时发生内部错误，请联系管理员。", reply_message=True)
+    finally:
+        timings["total"] = (datetime.now() - start_time).total_seconds()
+        METRICS.observe_all({f"batch:{stage}": seconds for stage, seconds in timings.items()})
+        logger.info(f"批量解析阶段耗时: {format_timings(timings)}")
+
 
 update_handler = on_command(
     "update_ms",
@@ -177,7 +510,93 @@ async def handle_update_resources(bot: Bot, event: MessageEvent):
             msg_id = result.get("message_id")
 
     try:
-        await update_resources(progress_callback)
+        updated_count = await update_resources(progress_callback)
+        if updated_count:
+            clear_shared_loaders()
+            if result_cache is not None:
+                await run_blocking(result_cache.clear)
+            await warmup.run()
+            logger.info(f"资源预热完成: {warmup.format_timings()}")
+            if render_pool is not None:
+                await run_blocking(render_pool.restart)
+            if batch_pool is not render_pool and batch_pool.started:
+                await run_blocking(batch_pool.restart)
     except Exception as e:
         logger.error(f"资源更新时发生未知错误: {e}", exc_info=True)
         await progress_callback(f"更新过程中发生严重错误，请检查后台日志。\n错误: {e}")
+
+
+stats_handler = on_command(
+    "ms_stats",
+    rule=is_valid_user(),
+    priority=2,
+    block=True
+)
+
+@stats_handler.handle()
+async def handle_stats():
+    loader = get_loader()
+    lines = [
+        "【MySekai解析统计】",
+        METRICS.format_summary(),
+        format_output_sizes(),
+        format_loop_lag(),
+        f"任务队列: 排队 {job_scheduler.pending} / 执行中 {job_scheduler.running}",
+        f"线程池: {BLOCKING_EXECUTOR.stats()}",
+        warmup.format_status(),
+        f"图像缓存: {loader.cache_stats()}",
+        f"缩放缓存: {loader.sprite_cache_stats()}",
+    ]
+    if history_store is not None:
+        lines.append(f"采集记录: 已写入 {history_store.written} / 待写入 {history_store.pending} / 失败 {history_store.failed}")
+    await stats_handler.finish("\n".join(lines))
+
+
+def parse_resource_key(text: str) -> str:
+    """纯数字视为 mysekai_material 的 ID，其余按资源 key 原样使用"""
+    text = text.strip()
+    return f"mysekai_material_{text}" if text.isdigit() else text
+
+
+last_drop_handler = on_command(
+    "ms_last",
+    rule=is_valid_user(),
+    priority=2,
+    block=True
+)
+
+@last_drop_handler.handle()
+async def handle_last_drop(event: MessageEvent, args: Message = CommandArg()):
+    if history_store is None:
+        await last_drop_handler.finish("采集记录未启用。")
+    resource_key = parse_resource_key(args.extract_plain_text())
+    if not resource_key:
+        await last_drop_handler.finish("用法: /ms_last <资源key或素材ID>，例如 /ms_last mysekai_material_24")
+    drop = await run_blocking(history_store.last_drop, str(event.user_id), resource_key)
+    if drop is None:
+        await last_drop_handler.finish(f"没有找到 {resource_key} 的记录。")
+    upload_time = datetime.fromtimestamp(drop.upload_time / 1000).strftime("%Y-%m-%d %H:%M")
+    sites = ", ".join(f"{SITE_ID_TO_NAME_MAP.get(site_id, site_id)} x{quantity}" for site_id, quantity in drop.sites)
+    await last_drop_handler.finish(f"{resource_key} 最近一次出现在 {upload_time} 上传的数据中: {sites}")
+
+
+daily_yield_handler = on_command(
+    "ms_avg",
+    rule=is_valid_user(),
+    priority=2,
+    block=True
+)
+
+@daily_yield_handler.handle()
+async def handle_daily_yield(event: MessageEvent, args: Message = CommandArg()):
+    if history_store is None:
+        await daily_yield_handler.finish("采集记录未启用。")
+    parts = args.extract_plain_text().split()
+    if not parts or (len(parts) > 1 and not parts[1].isdigit()):
+        await daily_yield_handler.finish("用法: /ms_avg <资源key或素材ID> [天数，默认30]")
+    resource_key = parse_resource_key(parts[0])
+    days = int(parts[1]) if len(parts) > 1 else 30
+    result = await run_blocking(history_store.average_daily_yield, str(event.user_id), resource_key, days)
+    if not result.days:
+        await daily_yield_handler.finish(f"最近 {days} 天没有上传记录。")
+    await daily_yield_handler.finish(f"{resource_key} 最近 {days} 天 (有记录 {result.days} 天) 共 {result.total} 个，日均 {result.average:.1f} 个")
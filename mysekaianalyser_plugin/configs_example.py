@@ -5,6 +5,13 @@ PLUGIN_ROOT = Path(__file__).parent.resolve()
 TARGET_REGION = "jp"
 MASTERDATA_BASE_URL = "https://raw.githubusercontent.com/"
 ASSET_BASE_URL = f"https:///{TARGET_REGION}-assets/"
+# 资源同步：同时下载的文件数与失败重试次数
+ASSET_DOWNLOAD_CONCURRENCY = 16
+ASSET_DOWNLOAD_RETRIES = 3
+# 资源存储格式: "files" 直接读取零散的 PNG; "atlas" 在更新后打包为单个 mmap 图集
+ASSET_STORE = "files"
+# 图集中存储解码后的 RGBA 像素 (读取零解码，但体积大很多)
+ATLAS_PREDECODED = False
 
 # fonts
 DEFAULT_FONT_PATH = PLUGIN_ROOT  / "resources/fonts/SourceHanSansSC-Regular.otf"
@@ -18,11 +25,61 @@ OUTPUT_SUMMARY_FILENAME = "output_summary.png"
 OUTPUT_MAPS_FILENAME = "output_maps.png"
 
 ENABLE_MAP_CROPPING = True
+# 地图动态图层的合成后端: "pil" 或 "numpy" (需要安装 numpy，缺失时回退到 pil)
+COMPOSITOR_BACKEND = "pil"
+# 输出图片编码: "png" / "png_quantized" (调色板量化) / "webp_lossless" / "webp" (有损) / "jpeg" (透明部分铺白底)
+OUTPUT_FORMAT = "png"
+# PNG zlib 压缩等级 0-9，越低编码越快、体积越大
+OUTPUT_PNG_COMPRESS_LEVEL = 6
+# 有损 WebP / JPEG 的质量 (0-100)
+OUTPUT_QUALITY = 85
+# WebP 压缩力度 0-6，越低编码越快
+OUTPUT_WEBP_METHOD = 4
+# 调色板量化的颜色数
+OUTPUT_QUANTIZE_COLORS = 256
 
 
 RESOURCE_PATH = PLUGIN_ROOT / "resources"
 TIMEOUT = 300
+# 任务调度：排队上限 (超过则直接拒绝) 与同时执行的解析任务数
+JOB_QUEUE_SIZE = 20
+JOB_WORKERS = 2
+# 渲染模式: "thread" 在单个线程中顺序渲染; "process" 使用常驻进程池并行渲染各场景地图与统计图
+RENDER_MODE = "thread"
+RENDER_PROCESSES = 4
+# 启动后在后台预热字体、元数据、场景底图与常用图标，首个请求只等待它用到的部分
+WARMUP_ENABLED = True
+# 插件专用线程池大小 (解密解析、渲染编码、文件读写)，不占用 asyncio 默认线程池
+BLOCKING_EXECUTOR_WORKERS = 8
+# 事件循环延迟监控: 采样间隔与目标上限 (秒)，超过目标时记录警告
+LOOP_LAG_INTERVAL = 0.25
+LOOP_LAG_TARGET = 0.05
+# 批量解析 (一条消息中的多个 .bin 或 .zip 压缩包): 单次最多文件数；
+# 进程数为 0 时使用 CPU 核数 (RENDER_MODE = "process" 时直接复用渲染进程池)
+BATCH_MAX_FILES = 10
+BATCH_PROCESSES = 0
+# 结果缓存：相同文件 + 相同配置 + 相同资源版本直接返回已生成的图片
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_PATH = PLUGIN_ROOT / "cache" / "results"
+RESULT_CACHE_TTL = 24 * 3600
+RESULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# 采集记录：每次解析的各场景资源数量、门等级与天气保存到 SQLite，供 /ms_last、/ms_avg 查询
+HISTORY_ENABLED = True
+HISTORY_DB_PATH = PLUGIN_ROOT / "cache" / "history.sqlite3"
+# 上传文件下载：超时时间 (秒) 与允许的最大体积，超过则提前中止
+DOWNLOAD_TIMEOUT = 60
+MAX_UPLOAD_BYTES = 32 * 1024 * 1024
 TEMP_PATH = PLUGIN_ROOT / "temp"
+# 调试用：把下载的 .bin、解密后的 json 和生成的图片写入 TEMP_PATH (正常运行时全程在内存中处理)
+DEBUG_SAVE_TEMP_FILES = False
+# 共享图像缓存上限 (按解码后的字节数计算)
+IMAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# 缩放后图标 (按路径/尺寸/重采样方式) 缓存上限
+SPRITE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# 分阶段耗时统计：可选在本地端口以 Prometheus 文本格式导出 (/metrics)
+METRICS_EXPORTER_ENABLED = False
+METRICS_EXPORTER_HOST = "127.0.0.1"
+METRICS_EXPORTER_PORT = 9464
 msa_white_lists = []
 
 AES_KEY_BYTES =
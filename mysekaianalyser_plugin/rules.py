@@ -1,3 +1,5 @@
+from typing import List, Tuple
+
 from nonebot.rule import Rule
 from nonebot.log import logger
 from nonebot.adapters.onebot.v11 import Event, MessageEvent, GroupMessageEvent
@@ -6,30 +8,58 @@ from .configs import msa_white_lists
 
 white_lists = msa_white_lists
 
+def get_sekai_files(message) -> List[Tuple[str, str]]:
+    """
+    消息中带下载链接的 .bin / .zip 文件，返回 [(文件名, 下载链接)]。
+    """
+    files = []
+    for seg in message:
+        if seg.type == "file":
+            file_name = seg.data.get("file", "") or seg.data.get("file_name", "")
+            file_url = seg.data.get("url")
+            if file_url and (file_name.endswith('.bin') or file_name.lower().endswith('.zip')):
+                files.append((file_name, file_url))
+    return files
+
+def is_batch(files: List[Tuple[str, str]]) -> bool:
+    """多个 .bin 文件或包含压缩包时按批量解析处理"""
+    return len(files) > 1 or any(name.lower().endswith('.zip') for name, _ in files)
+
+def _log_head(event: MessageEvent) -> str:
+    if isinstance(event, GroupMessageEvent):
+        return f"群聊 {event.group_id}"
+    return "私聊"
+
 def is_valid_sekai_file() -> Rule:
     """
     一个规则检查器 (Rule)，用于判断消息是否包含一个有效的 .bin 文件。
+    多个文件或压缩包交给 is_valid_sekai_batch。
     """
     async def _check(event: Event) -> bool:
         if not isinstance(event, MessageEvent):
             return False
 
-        for seg in event.message:
-            if seg.type == "file":
-                file_name = seg.data.get("file", "") or seg.data.get("file_name", "")
+        files = get_sekai_files(event.message)
+        if len(files) == 1 and not is_batch(files):
+            logger.info(f"【MySekai规则匹配成功】来源: {_log_head(event)} | 用户: {event.user_id} | 文件: {files[0][0]}")
+            return True
 
-                file_url = seg.data.get("url")
+        return False
 
-                if file_name.endswith('.bin') and file_url:
+    return Rule(_check)
 
-                    log_head = ""
-                    if isinstance(event, GroupMessageEvent):
-                        log_head = f"群聊 {event.group_id}"
-                    else:
-                        log_head = "私聊"
+def is_valid_sekai_batch() -> Rule:
+    """
+    一个规则检查器 (Rule)，用于判断消息是否包含多个 .bin 文件或 .zip 压缩包。
+    """
+    async def _check(event: Event) -> bool:
+        if not isinstance(event, MessageEvent):
+            return False
 
-                    logger.info(f"【MySekai规则匹配成功】来源: {log_head} | 用户: {event.user_id} | 文件: {file_name}")
-                    return True
+        files = get_sekai_files(event.message)
+        if is_batch(files):
+            logger.info(f"【MySekai批量规则匹配成功】来源: {_log_head(event)} | 用户: {event.user_id} | 文件: {', '.join(name for name, _ in files)}")
+            return True
 
         return False
 
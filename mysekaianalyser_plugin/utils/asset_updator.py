@@ -1,14 +1,23 @@
 import os
 import json
+import random
 import asyncio
+import hashlib
+import threading
+from email.utils import formatdate
 from pathlib import Path
-from typing import Set, Callable, Coroutine
+from typing import Dict, Optional, Set, Callable, Coroutine, Tuple
 
 import aiohttp
 import aiofiles
 from tqdm.asyncio import tqdm
 
-from ..configs import RESOURCE_PATH, TARGET_REGION, MASTERDATA_BASE_URL, ASSET_BASE_URL
+from ..configs import (RESOURCE_PATH, TARGET_REGION, MASTERDATA_BASE_URL, ASSET_BASE_URL,
+                       ASSET_DOWNLOAD_CONCURRENCY, ASSET_DOWNLOAD_RETRIES, ASSET_STORE, ATLAS_PREDECODED)
+from .result_cache import bump_asset_version
+from .md_index import INDEX_FILENAME, compile_masterdata_index
+from .atlas import atlas_paths, build_atlas
+from .executor import run_blocking
 
 METADATA_FILES = [
     "mysekaiMaterials", "mysekaiPhenomenas", "mysekaiSiteHarvestFixtures",
@@ -20,61 +29,146 @@ STATIC_FILES = [
     *[f"mysekai/gate_icon/gate_{i}.png" for i in range(1, 6)],
 ]
 
-async def download_file(session: aiohttp.ClientSession, url: str, dest_path: Path) -> bool:
-    try:
-        async with session.get(url) as response:
-            if response.status == 200:
-                dest_path.parent.mkdir(parents=True, exist_ok=True)
-                async with aiofiles.open(dest_path, 'wb') as f:
-                    await f.write(await response.read())
-                return True
-            return False
-    except (asyncio.TimeoutError, aiohttp.ClientError):
-        return False
-
-async def download_asset(session: aiohttp.ClientSession, path: str, dest_base: Path) -> bool:
-    path_no_rip = path.replace("_rip", "")
-    dest_path = dest_base / path_no_rip
-
-    if dest_path.exists():
-        return True # 已存在，跳过
-
-    # 优先 ondemand
-    url_ondemand = f"{ASSET_BASE_URL}ondemand/{path_no_rip}"
-    if await download_file(session, url_ondemand, dest_path):
-        return True
-
-    # 失败则 startapp
-    url_startapp = f"{ASSET_BASE_URL}startapp/{path_no_rip}"
-    return await download_file(session, url_startapp, dest_path)
+# 单个文件的同步结果
+UPDATED, UNCHANGED, NOT_FOUND, FAILED = "updated", "unchanged", "not_found", "failed"
 
-# --- 主更新函数 ---
 
-ProgressCallback = Callable[[str], Coroutine[None, None, None]]
+class AssetManifest:
+    """
+    本地资源清单：记录每个文件的来源 URL、ETag、Last-Modified、大小和 sha256，
+    用于条件请求与断点续传。写入采用临时文件 + 重命名。
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+        self._dirty = 0
+        self._save_lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
 
-async def update_resources(progress_callback: ProgressCallback):
+    def get(self, key: str) -> Optional[dict]:
+        return self.entries.get(key)
+
+    def set(self, key: str, entry: dict):
+        self.entries[key] = entry
+        self._dirty += 1
+
+    def save(self, entries: Optional[Dict[str, dict]] = None):
+        with self._save_lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.entries if entries is None else entries, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+
+    async def save_async(self):
+        """在事件循环中取快照 (其它下载任务仍在修改 entries)，再在线程池中写盘。"""
+        snapshot = dict(self.entries)
+        self._dirty = 0
+        await run_blocking(self.save, snapshot)
+
+    async def save_every(self, n: int):
+        """累计 n 次修改后落盘一次，中断后可从已完成的部分继续。"""
+        if self._dirty >= n: await self.save_async()
+
+
+class AssetSyncer:
     """
-    主更新函数，接收一个异步回调函数来报告进度。
+    增量资源同步：条件请求 (ETag / Last-Modified)、并发上限、失败重试与退避、原子写入。
     """
-    metadata_dest_dir = RESOURCE_PATH / "metadata" / TARGET_REGION
+    def __init__(self, session: aiohttp.ClientSession, manifest: AssetManifest,
+                 concurrency: int = ASSET_DOWNLOAD_CONCURRENCY, retries: int = ASSET_DOWNLOAD_RETRIES):
+        self.session = session
+        self.manifest = manifest
+        self.retries = retries
+        self._semaphore = asyncio.Semaphore(concurrency)
 
-    # --- 1. 下载 Metadata ---
-    await progress_callback(f"阶段 1/3: 开始下载 {len(METADATA_FILES)} 个元数据文件...")
+    def _conditional_headers(self, key: str, dest_path: Path, url: str) -> Dict[str, str]:
+        if not dest_path.exists(): return {}
+        entry = self.manifest.get(key)
+        if entry and entry.get("url") == url:
+            headers = {}
+            if entry.get("etag"): headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"): headers["If-Modified-Since"] = entry["last_modified"]
+            if headers: return headers
+        # 旧版本下载的文件没有清单记录，用文件修改时间做条件请求
+        return {"If-Modified-Since": formatdate(dest_path.stat().st_mtime, usegmt=True)}
 
-    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
-        tasks = []
-        for table_name in METADATA_FILES:
-            url = f"{MASTERDATA_BASE_URL}{table_name}.json"
-            dest = metadata_dest_dir / f"{table_name}.json"
-            tasks.append(download_file(session, url, dest))
+    async def _fetch_once(self, key: str, url: str, dest_path: Path) -> str:
+        headers = self._conditional_headers(key, dest_path, url)
+        async with self.session.get(url, headers=headers) as response:
+            if response.status == 304:
+                return UNCHANGED
+            if response.status == 404:
+                return NOT_FOUND
+            if response.status != 200:
+                raise aiohttp.ClientResponseError(response.request_info, response.history, status=response.status)
 
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        success_count = sum(1 for r in results if r is True)
-    await progress_callback(f"元数据下载完成，成功 {success_count}/{len(METADATA_FILES)} 个。")
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = dest_path.with_name(f".{dest_path.name}.part")
+            digest, size = hashlib.sha256(), 0
+            try:
+                async with aiofiles.open(tmp_path, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(64 * 1024):
+                        digest.update(chunk); size += len(chunk)
+                        await f.write(chunk)
+                os.replace(tmp_path, dest_path)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+
+            old = self.manifest.get(key)
+            self.manifest.set(key, {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "size": size,
+                "sha256": digest.hexdigest(),
+            })
+            # 内容未变 (服务器不支持条件请求时) 不算作更新
+            if old and old.get("sha256") == digest.hexdigest(): return UNCHANGED
+            return UPDATED
+
+    async def fetch(self, key: str, url: str, dest_path: Path) -> str:
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                try:
+                    return await self._fetch_once(key, url, dest_path)
+                except (asyncio.TimeoutError, aiohttp.ClientError, OSError):
+                    if attempt == self.retries: return FAILED
+                    await asyncio.sleep(min(2 ** attempt, 30) * (0.5 + random.random()))
+        return FAILED
+
+    async def fetch_asset(self, path: str, dest_base: Path) -> str:
+        path_no_rip = path.replace("_rip", "")
+        dest_path = dest_base / path_no_rip
+        key = str(dest_path.relative_to(RESOURCE_PATH))
+
+        # 优先 ondemand，失败则 startapp；已知来源时先试上次成功的地址
+        urls = [f"{ASSET_BASE_URL}ondemand/{path_no_rip}", f"{ASSET_BASE_URL}startapp/{path_no_rip}"]
+        entry = self.manifest.get(key)
+        if entry and entry.get("url") in urls:
+            urls.remove(entry["url"]); urls.insert(0, entry["url"])
+
+        status = FAILED
+        for url in urls:
+            status = await self.fetch(key, url, dest_path)
+            if status in (UPDATED, UNCHANGED): break
+        await self.manifest.save_every(200)
+        return status
 
-    # --- 2. 提取动态资源路径 ---
-    await progress_callback("阶段 2/3: 正在从元数据中提取资源路径...")
 
+def _summarize(results) -> Dict[str, int]:
+    counts = {UPDATED: 0, UNCHANGED: 0, NOT_FOUND: 0, FAILED: 0}
+    for r in results:
+        counts[r if r in counts else FAILED] += 1
+    return counts
+
+def _collect_asset_paths(metadata_dest_dir: Path) -> Tuple[Set[str], Set[str]]:
+    """从元数据中提取需要同步的 (动态资源, 静态资源) 路径，读取 JSON 较慢，在线程池中执行。"""
     asset_paths: Set[str] = set()
     static_paths: Set[str] = set()
 
@@ -106,26 +200,82 @@ async def update_resources(progress_callback: ProgressCallback):
     asset_paths.update({f"thumbnail/material/{i}.png" for i in [17, 170, 173]})
     asset_paths.update({f"character/character_sd_l/chr_sp_{i}.png" for i in range(1, 41)})
     asset_paths.update({f"character/character_sd_l/chr_sp_{i}.png" for i in range(701, 741)})
+    return asset_paths, static_paths
+
+# --- 主更新函数 ---
+
+ProgressCallback = Callable[[str], Coroutine[None, None, None]]
+
+async def update_resources(progress_callback: ProgressCallback):
+    """
+    主更新函数，接收一个异步回调函数来报告进度。
+    """
+    metadata_dest_dir = RESOURCE_PATH / "metadata" / TARGET_REGION
+    manifest = await run_blocking(AssetManifest, RESOURCE_PATH / f"manifest_{TARGET_REGION}.json")
+
+    # --- 1. 下载 Metadata ---
+    await progress_callback(f"阶段 1/3: 开始同步 {len(METADATA_FILES)} 个元数据文件...")
+
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+        syncer = AssetSyncer(session, manifest)
+        tasks = []
+        for table_name in METADATA_FILES:
+            url = f"{MASTERDATA_BASE_URL}{table_name}.json"
+            dest = metadata_dest_dir / f"{table_name}.json"
+            tasks.append(syncer.fetch(str(dest.relative_to(RESOURCE_PATH)), url, dest))
+
+        metadata_counts = _summarize(await asyncio.gather(*tasks))
+    await manifest.save_async()
+    if metadata_counts[UPDATED] or not (metadata_dest_dir / INDEX_FILENAME).exists():
+        await run_blocking(compile_masterdata_index, metadata_dest_dir)
+    await progress_callback(
+        f"元数据同步完成: 更新 {metadata_counts[UPDATED]} 个, 未变化 {metadata_counts[UNCHANGED]} 个, "
+        f"失败 {metadata_counts[FAILED] + metadata_counts[NOT_FOUND]} 个。"
+    )
+
+    # --- 2. 提取动态资源路径 ---
+    await progress_callback("阶段 2/3: 正在从元数据中提取资源路径...")
+
+    asset_paths, static_paths = await run_blocking(_collect_asset_paths, metadata_dest_dir)
 
     total_assets = len(asset_paths)
     total_statics = len(static_paths.union(STATIC_FILES))
     await progress_callback(f"提取完成: {total_assets} 个动态资源, {total_statics} 个静态资源。")
 
     # --- 3. 下载所有文件 ---
-    await progress_callback(f"阶段 3/3: 开始下载共 {total_assets + total_statics} 个资源文件 (这可能需要几分钟)...")
+    await progress_callback(f"阶段 3/3: 开始同步共 {total_assets + total_statics} 个资源文件 (首次下载可能需要几分钟)...")
 
     asset_dest_dir = RESOURCE_PATH / "assets" / TARGET_REGION
     static_dest_dir = RESOURCE_PATH / "static_images"
 
     async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60)) as session:
+        syncer = AssetSyncer(session, manifest)
         all_tasks = []
         for path in asset_paths:
-            all_tasks.append(download_asset(session, path, asset_dest_dir))
+            all_tasks.append(syncer.fetch_asset(path, asset_dest_dir))
         for path in static_paths.union(STATIC_FILES):
-            all_tasks.append(download_asset(session, path, static_dest_dir))
+            all_tasks.append(syncer.fetch_asset(path, static_dest_dir))
 
         # 使用 tqdm 包装，但进度条只在控制台显示
-        results = await tqdm.gather(*all_tasks, desc="Downloading Resources")
-        success_count = sum(1 for r in results if r is True)
+        try:
+            results = await tqdm.gather(*all_tasks, desc="Syncing Resources")
+        finally:
+            await manifest.save_async()
+        asset_counts = _summarize(results)
+
+    # 有文件发生变化时更新资源版本号，使依赖旧资源生成的结果缓存失效
+    changed = metadata_counts[UPDATED] + asset_counts[UPDATED]
+    if changed:
+        await run_blocking(bump_asset_version, RESOURCE_PATH)
+
+    if ASSET_STORE == "atlas" and (asset_counts[UPDATED] or not atlas_paths(RESOURCE_PATH, TARGET_REGION)[0].exists()):
+        await progress_callback("正在打包资源图集...")
+        count, size = await run_blocking(build_atlas, RESOURCE_PATH, TARGET_REGION, ATLAS_PREDECODED)
+        await progress_callback(f"图集打包完成: {count} 个文件, {size / 1024 / 1024:.1f} MB。")
+        changed = changed or count
 
-    await progress_callback(f"全部资源下载完成！\n成功: {success_count}/{len(all_tasks)} 个文件。")
\ No newline at end of file
+    await progress_callback(
+        f"全部资源同步完成！\n更新: {asset_counts[UPDATED]} 个, 未变化: {asset_counts[UNCHANGED]} 个, "
+        f"失败: {asset_counts[FAILED] + asset_counts[NOT_FOUND]} 个 (共 {len(all_tasks)} 个文件)。"
+    )
+    return changed
\ No newline at end of file
@@ -0,0 +1,120 @@
+import io
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import msgpack
+from PIL import Image
+
+ATLAS_VERSION = 1
+FORMAT_ENCODED = "encoded"
+FORMAT_RGBA = "rgba"
+
+# 图集中的命名空间，对应 LocalAssetLoader 的两个查找目录
+NAMESPACE_STATIC = "static"
+NAMESPACE_ASSETS = "assets"
+
+
+def atlas_paths(resource_path, region: str) -> Tuple[Path, Path]:
+    base = Path(resource_path) / "atlas"
+    return base / f"{region}.bin", base / f"{region}.idx"
+
+
+def _iter_images(root: Path) -> Iterator[Tuple[str, Path]]:
+    if not root.is_dir(): return
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if not filename.lower().endswith(".png"): continue
+            file_path = Path(dirpath) / filename
+            yield file_path.relative_to(root).as_posix(), file_path
+
+
+def build_atlas(resource_path, region: str, predecoded: bool = False) -> Tuple[int, int]:
+    """
+    把 static_images 与 assets/<region> 下的 PNG 打包成一个数据文件 + 一个索引文件。
+    predecoded=True 时存储解码后的 RGBA 像素，读取时无需再解压 PNG (体积会大很多)。
+    返回 (文件数, 数据文件字节数)。
+    """
+    resource_path = Path(resource_path)
+    data_path, index_path = atlas_paths(resource_path, region)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    data_tmp, index_tmp = data_path.with_suffix(".bin.tmp"), index_path.with_suffix(".idx.tmp")
+
+    entries: Dict[str, list] = {}
+    offset = 0
+    roots = ((NAMESPACE_STATIC, resource_path / "static_images"), (NAMESPACE_ASSETS, resource_path / "assets" / region))
+    with open(data_tmp, "wb") as out:
+        for namespace, root in roots:
+            for rel_path, file_path in _iter_images(root):
+                try:
+                    if predecoded:
+                        with Image.open(file_path) as im:
+                            image = im.convert("RGBA")
+                        payload, fmt, (w, h) = image.tobytes(), FORMAT_RGBA, image.size
+                    else:
+                        payload, fmt, w, h = file_path.read_bytes(), FORMAT_ENCODED, 0, 0
+                except Exception:
+                    continue
+                out.write(payload)
+                entries[f"{namespace}/{rel_path}"] = [offset, len(payload), fmt, w, h]
+                offset += len(payload)
+
+    index_tmp.write_bytes(msgpack.packb({"version": ATLAS_VERSION, "entries": entries}, use_bin_type=True))
+    os.replace(data_tmp, data_path)
+    os.replace(index_tmp, index_path)
+    return len(entries), offset
+
+
+class AssetAtlas:
+    """
+    只读图集：数据文件通过 mmap 映射，按 "命名空间/路径" 查询偏移、长度和格式。
+    RGBA 格式的条目直接以 mmap 切片构造图像，不做任何解码。
+    """
+    def __init__(self, data_path: Path, entries: Dict[str, list]):
+        self._file = open(data_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view = memoryview(self._mm) if self._mm is not None else memoryview(b"")
+        self._entries = entries
+
+    @classmethod
+    def open(cls, resource_path, region: str) -> Optional["AssetAtlas"]:
+        data_path, index_path = atlas_paths(resource_path, region)
+        try:
+            raw = msgpack.unpackb(index_path.read_bytes(), raw=False)
+        except (FileNotFoundError, ValueError, msgpack.UnpackException):
+            return None
+        if raw.get("version") != ATLAS_VERSION or not data_path.exists(): return None
+        return cls(data_path, raw.get("entries", {}))
+
+    def close(self):
+        """
+        释放映射与文件句柄。仍有直接引用 mmap 的图像时映射无法立即关闭，
+        等这些图像被回收后随之释放；关闭后 load() 一律返回 None。
+        """
+        self._entries = {}
+        try:
+            self._view.release()
+            if self._mm is not None: self._mm.close()
+        except BufferError:
+            pass
+        self._file.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def load(self, namespace: str, path_no_rip: str) -> Optional[Image.Image]:
+        """读取 RGBA 图像，图集中没有该文件时返回 None。"""
+        entry = self._entries.get(f"{namespace}/{path_no_rip}")
+        if entry is None: return None
+        offset, length, fmt, w, h = entry
+        buf = self._view[offset:offset + length]
+        if fmt == FORMAT_RGBA:
+            return Image.frombuffer("RGBA", (w, h), buf, "raw", "RGBA", 0, 1)
+        with Image.open(io.BytesIO(buf)) as im:
+            return im.convert("RGBA")
+
@@ -0,0 +1,95 @@
+import io
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from .decrypter import decrypt_and_parse_bin_bytes
+from .drawer import draw_batch_report, draw_rare_resource_table, draw_summary_image
+from .encoder import DEFAULT_ENCODER, ImageEncoder
+from .extractor import RareResourceCount, count_rare_resources, extract_summary_data
+from .history import HistoryEntry, build_history_entry
+from .loader import LocalAssetLoader
+from .metrics import timed
+
+
+class BatchLimitError(Exception):
+    """批量解析的文件数量或单个文件体积超过上限"""
+
+
+@dataclass
+class BatchFile: name: str; data: bytes
+@dataclass
+class AccountResult: name: str; upload_time: int; summary_size: Tuple[int, int]; summary_raw: bytes; rare: List[RareResourceCount]; history: HistoryEntry; timings: Dict[str, float]
+
+
+def is_zip_name(name: str) -> bool:
+    return name.lower().endswith(".zip")
+
+
+def expand_batch_files(files: List[BatchFile], max_files: int, max_file_bytes: int) -> List[BatchFile]:
+    """
+    把压缩包展开为其中的 .bin 文件 (忽略其它文件)，其余文件原样保留。
+    按解压后的实际字节数检查体积上限，不信任压缩包中记录的大小。
+    """
+    result = []
+    for file in files:
+        if not is_zip_name(file.name):
+            result.append(file)
+        else:
+            try:
+                with zipfile.ZipFile(io.BytesIO(file.data)) as archive:
+                    for info in archive.infolist():
+                        if info.is_dir() or not info.filename.lower().endswith(".bin"): continue
+                        if info.file_size > max_file_bytes:
+                            raise BatchLimitError(f"{info.filename} 超过单个文件上限 {max_file_bytes} 字节")
+                        with archive.open(info) as member:
+                            data = member.read(max_file_bytes + 1)
+                        if len(data) > max_file_bytes:
+                            raise BatchLimitError(f"{info.filename} 超过单个文件上限 {max_file_bytes} 字节")
+                        result.append(BatchFile(f"{file.name}/{info.filename}", data))
+                        if len(result) > max_files: break
+            except zipfile.BadZipFile as e:
+                raise BatchLimitError(f"{file.name} 不是有效的 zip 文件: {e}") from e
+        if len(result) > max_files:
+            raise BatchLimitError(f"文件数量超过上限 {max_files} 个")
+    return result
+
+
+def analyse_account(file: BatchFile, loader: LocalAssetLoader, aes_key: bytes, aes_iv: bytes, show_harvested: bool) -> AccountResult:
+    """
+    单个账号：解密 -> 提取统计数据 -> 绘制统计图，返回原始像素以便跨进程传输。
+    采集记录也在这里整理好，主进程只需写入，不必传回完整的解析数据。
+    """
+    timings = {}
+    with timed(timings, "decrypt"):
+        mysekai_data = decrypt_and_parse_bin_bytes(file.data, aes_key, aes_iv)
+    with timed(timings, "extract"):
+        summary_data = extract_summary_data(mysekai_data, loader, show_harvested)
+        history = build_history_entry(mysekai_data)
+    with timed(timings, "draw_summary"):
+        image = draw_summary_image(summary_data, loader)
+    return AccountResult(
+        file.name, mysekai_data['updatedResources']['now'], image.size, image.tobytes(),
+        count_rare_resources(summary_data), history, timings,
+    )
+
+
+def account_label(result: AccountResult) -> str:
+    upload_time = datetime.fromtimestamp(result.upload_time / 1000).strftime("%m-%d %H:%M")
+    return f"{result.name} ({upload_time})"
+
+
+def render_batch_report(results: List[AccountResult], loader: LocalAssetLoader, timings: Optional[Dict[str, float]] = None,
+                        encoder: ImageEncoder = DEFAULT_ENCODER) -> Optional[bytes]:
+    """各账号的统计图拼成一张图，附稀有资源汇总表，编码后返回。"""
+    timings = {} if timings is None else timings
+    with timed(timings, "compose"):
+        labels = [account_label(r) for r in results]
+        accounts = [(label, Image.frombytes("RGBA", r.summary_size, r.summary_raw)) for label, r in zip(labels, results)]
+        rare_table = draw_rare_resource_table([(label, r.rare) for label, r in zip(labels, results)], loader)
+        image = draw_batch_report(accounts, rare_table)
+    with timed(timings, encoder.stage_name):
+        return encoder.encode(image)
@@ -0,0 +1,127 @@
+import functools
+from typing import Dict, Tuple
+
+from PIL import Image, ImageDraw
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，缺失时使用 PIL 后端
+    np = None
+
+BACKEND_PIL = "pil"
+BACKEND_NUMPY = "numpy"
+
+
+def alpha_composite_clipped(canvas: Image.Image, sprite: Image.Image, x: int, y: int):
+    """把 sprite 以 alpha 混合绘制到 canvas 的 (x, y)，允许部分或全部超出画布 (包括负坐标)。"""
+    src_x, src_y = max(0, -x), max(0, -y)
+    dst_x, dst_y = max(0, x), max(0, y)
+    width = min(sprite.width - src_x, canvas.width - dst_x)
+    height = min(sprite.height - src_y, canvas.height - dst_y)
+    if width <= 0 or height <= 0: return
+    canvas.alpha_composite(sprite, (dst_x, dst_y), (src_x, src_y, src_x + width, src_y + height))
+
+
+@functools.lru_cache(maxsize=256)
+def get_outline_sprite(size: int, color: Tuple[int, int, int, int], width: int) -> Image.Image:
+    """
+    描边贴图，用 LayerCompositor.paste() 绘制时与 draw.rectangle([(x, y), (x + size, y + size)], outline=color, width=width)
+    的效果相同 (像素直接写入，半透明描边不与下层混合)。返回共享对象，请勿原地修改。
+    """
+    sprite = Image.new("RGBA", (size + 1, size + 1), (0, 0, 0, 0))
+    ImageDraw.Draw(sprite).rectangle([(0, 0), (size, size)], outline=color, width=width)
+    return sprite
+
+
+class LayerCompositor:
+    """
+    静态底层 + 单个动态图层的合成器。
+    所有贴图按调用顺序合成到同一个透明图层，最后与 (缓存的、只读的) 底层一次性合成，底层本身不会被修改。
+    backend="numpy" 时动态图层保存为预乘 alpha 的 float32 数组，逐个贴图做切片混合，只在最后转换一次。
+    paste() 的像素不参与混合，而是记在单独的替换层上，合成时先覆盖底层的对应像素。
+    """
+    def __init__(self, base: Image.Image, backend: str = BACKEND_PIL):
+        self.base = base
+        self._use_numpy = backend == BACKEND_NUMPY and np is not None
+        self._overlay = None
+        # 同一次合成中重复使用的贴图只转换一次: id(sprite) -> (sprite, 预乘数组)
+        self._arrays: Dict[int, tuple] = {}
+        self._masks: Dict[int, tuple] = {}
+        self._replaced = None
+        self._replaced_mask = None
+
+    def blit(self, sprite: Image.Image, x: int, y: int):
+        if self._use_numpy:
+            self._blit_numpy(sprite, x, y)
+            return
+        if self._overlay is None:
+            self._overlay = Image.new("RGBA", self.base.size, (0, 0, 0, 0))
+        alpha_composite_clipped(self._overlay, sprite, x, y)
+
+    def paste(self, sprite: Image.Image, x: int, y: int):
+        """
+        把 sprite 中不透明度非 0 的像素原样写入 (包括 alpha，不混合)，
+        与 ImageDraw 直接在 RGBA 画布上绘制线条、矩形的效果相同。之后 blit 的贴图仍会叠加在其上。
+        """
+        mask = self._binary_mask(sprite)
+        if self._replaced is None:
+            self._replaced = Image.new("RGBA", self.base.size, (0, 0, 0, 0))
+            self._replaced_mask = Image.new("L", self.base.size, 0)
+        self._replaced.paste(sprite, (x, y), mask)
+        self._replaced_mask.paste(255, (x, y, x + sprite.width, y + sprite.height), mask)
+        # 被替换的像素上，之前叠加的内容全部作废
+        if self._overlay is None: return
+        if not self._use_numpy:
+            self._overlay.paste((0, 0, 0, 0), (x, y, x + sprite.width, y + sprite.height), mask)
+            return
+        src_x, src_y = max(0, -x), max(0, -y)
+        dst_x, dst_y = max(0, x), max(0, y)
+        width = min(sprite.width - src_x, self.base.width - dst_x)
+        height = min(sprite.height - src_y, self.base.height - dst_y)
+        if width <= 0 or height <= 0: return
+        covered = np.asarray(mask)[src_y:src_y + height, src_x:src_x + width] > 0
+        self._overlay[dst_y:dst_y + height, dst_x:dst_x + width][covered] = 0.0
+
+    def _binary_mask(self, sprite: Image.Image) -> Image.Image:
+        entry = self._masks.get(id(sprite))
+        if entry is None:
+            mask = sprite.getchannel("A").point(lambda v: 255 if v else 0)
+            entry = self._masks[id(sprite)] = (sprite, mask)
+        return entry[1]
+
+    def _premultiplied(self, sprite: Image.Image):
+        entry = self._arrays.get(id(sprite))
+        if entry is None:
+            arr = np.asarray(sprite if sprite.mode == "RGBA" else sprite.convert("RGBA"), dtype=np.float32) / 255.0
+            arr[..., :3] *= arr[..., 3:4]
+            entry = self._arrays[id(sprite)] = (sprite, arr)
+        return entry[1]
+
+    def _blit_numpy(self, sprite: Image.Image, x: int, y: int):
+        if self._overlay is None:
+            self._overlay = np.zeros((self.base.height, self.base.width, 4), dtype=np.float32)
+        src_x, src_y = max(0, -x), max(0, -y)
+        dst_x, dst_y = max(0, x), max(0, y)
+        width = min(sprite.width - src_x, self.base.width - dst_x)
+        height = min(sprite.height - src_y, self.base.height - dst_y)
+        if width <= 0 or height <= 0: return
+        src = self._premultiplied(sprite)[src_y:src_y + height, src_x:src_x + width]
+        region = self._overlay[dst_y:dst_y + height, dst_x:dst_x + width]
+        region *= 1.0 - src[..., 3:4]
+        region += src
+
+    def _overlay_image(self) -> Image.Image:
+        if not self._use_numpy: return self._overlay
+        alpha = self._overlay[..., 3:4]
+        rgb = np.divide(self._overlay[..., :3], alpha, out=np.zeros_like(self._overlay[..., :3]), where=alpha > 0)
+        pixels = np.concatenate((rgb, alpha), axis=2) * 255.0 + 0.5
+        return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+    def compose(self) -> Image.Image:
+        """返回底层与动态图层合成后的新图像"""
+        base = self.base
+        if self._replaced is not None:
+            base = base.copy()
+            base.paste(self._replaced, (0, 0), self._replaced_mask)
+        if self._overlay is None: return base if base is not self.base else base.copy()
+        return Image.alpha_composite(base, self._overlay_image())
@@ -1,9 +1,12 @@
-import orjson
+import time
+from typing import Any, Dict, Iterable, Optional
+
 import msgpack
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import ciphers, padding
 from cryptography.hazmat.primitives.ciphers import algorithms, modes
 
+
 def decrypt_aes_cbc_pkcs7(encrypted_data: bytes, key: bytes, iv: bytes) -> bytes:
     """
     使用 AES/CBC/PKCS7 同步解密数据。
@@ -17,20 +20,120 @@ def decrypt_aes_cbc_pkcs7(encrypted_data: bytes, key: bytes, iv: bytes) -> bytes
 
     return unpadded_data
 
-async def decrypt_and_parse_bin_file(
+# 分析器实际读取的顶层字段，其余字段在解析时直接跳过
+MYSEKAI_TOP_LEVEL_KEYS = ("updatedResources", "mysekaiPhenomenaSchedules", "userMysekaiGateCharacterVisit")
+# 解析遇到不完整对象后，至少再积累这么多数据才重试
+MIN_PARSE_RETRY_BYTES = 64 * 1024
+_NO_KEY = object()
+
+class SelectiveMapParser:
+    """
+    增量解析顶层为 map 的 MessagePack 文档：数据分块 feed() 进来，
+    只为 keys 中的顶层字段构建 Python 对象，其余子树用 Unpacker.skip() 跳过。
+    keys 为 None 时解析全部字段。
+    """
+    def __init__(self, keys: Optional[Iterable[str]] = MYSEKAI_TOP_LEVEL_KEYS):
+        self._keys = frozenset(keys) if keys is not None else None
+        self._unpacker = msgpack.Unpacker(raw=False)
+        self._result: Dict[str, Any] = {}
+        self._remaining: Optional[int] = None
+        self._key: Any = _NO_KEY
+        self._fed = 0
+        self._object_start = 0
+        self._retry_at = 0
+
+    def feed(self, data: bytes):
+        if not data: return
+        self._unpacker.feed(data)
+        self._fed += len(data)
+        # 纯 Python 版 Unpacker 遇到不完整的对象会回滚重扫，按已积累的数据量成倍推迟重试
+        if self._fed >= self._retry_at:
+            self._advance()
+
+    def _advance(self):
+        try:
+            if self._remaining is None:
+                self._remaining = self._unpacker.read_map_header()
+            while self._remaining > 0:
+                if self._key is _NO_KEY:
+                    self._key = self._unpacker.unpack()
+                if self._keys is None or self._key in self._keys:
+                    self._result[self._key] = self._unpacker.unpack()
+                else:
+                    self._unpacker.skip()
+                self._key = _NO_KEY
+                self._remaining -= 1
+                self._object_start = self._fed
+        except msgpack.OutOfData:
+            self._retry_at = self._fed + max(MIN_PARSE_RETRY_BYTES, self._fed - self._object_start)
+
+    def result(self) -> Dict[str, Any]:
+        """所有数据 feed 完毕后调用，返回解析出的字段。"""
+        self._advance()
+        if self._remaining != 0:
+            raise ValueError("MessagePack 数据不完整")
+        return self._result
+
+class StreamDecrypter:
+    """
+    AES/CBC/PKCS7 流式解密：下载时逐块 feed()，解密结果直接送入 SelectiveMapParser，
+    不保留完整的密文或明文。finalize() 返回解析出的字段 (默认只含分析器需要的顶层字段)。
+    """
+    def __init__(self, key: bytes, iv: bytes, keys: Optional[Iterable[str]] = MYSEKAI_TOP_LEVEL_KEYS):
+        cipher = ciphers.Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
+        self._decryptor = cipher.decryptor()
+        self._unpadder = padding.PKCS7(algorithms.AES.block_size).unpadder()
+        self._parser = SelectiveMapParser(keys)
+        # 下载过程中的解析错误留到 finalize() 再抛出，避免被当作下载失败
+        self._error: Optional[Exception] = None
+        # 解密与解析分别累计的耗时 (秒)
+        self.timings: Dict[str, float] = {"decrypt": 0.0, "parse": 0.0}
+
+    def _push(self, plain: bytes):
+        if self._error is not None: return
+        start = time.perf_counter()
+        try:
+            self._parser.feed(plain)
+        except Exception as e:
+            self._error = e
+        self.timings["parse"] += time.perf_counter() - start
+
+    def feed(self, chunk: bytes):
+        start = time.perf_counter()
+        plain = self._unpadder.update(self._decryptor.update(chunk))
+        self.timings["decrypt"] += time.perf_counter() - start
+        self._push(plain)
+
+    def finalize(self) -> Dict[str, Any]:
+        try:
+            start = time.perf_counter()
+            plain = self._unpadder.update(self._decryptor.finalize()) + self._unpadder.finalize()
+            self.timings["decrypt"] += time.perf_counter() - start
+            self._push(plain)
+            if self._error is not None: raise self._error
+            start = time.perf_counter()
+            result = self._parser.result()
+            self.timings["parse"] += time.perf_counter() - start
+            return result
+        except Exception as e:
+            raise ValueError(f"解密或解析数据失败: {e}")
+
+def decrypt_and_parse_bin_bytes(
         encrypted_bytes: bytes,
         aes_key: bytes,
-        aes_iv: bytes
+        aes_iv: bytes,
+        keys: Optional[Iterable[str]] = MYSEKAI_TOP_LEVEL_KEYS,
+        chunk_size: int = 256 * 1024
 ) -> dict:
     """
-    主函数：解密 .bin 文件内容并使用 MessagePack 解析。
-    返回解析后的 Python 字典。
+    主函数：分块解密 .bin 文件内容并使用 MessagePack 解析。
+    返回解析后的 Python 字典 (默认只含分析器需要的顶层字段)。
     """
+    decrypter = StreamDecrypter(aes_key, aes_iv, keys)
+    view = memoryview(encrypted_bytes)
     try:
-        decrypted_bytes = decrypt_aes_cbc_pkcs7(encrypted_bytes, aes_key, aes_iv)
-
-        parsed_data = msgpack.unpackb(decrypted_bytes, raw=False)
-
-        return parsed_data
+        for offset in range(0, len(view), chunk_size):
+            decrypter.feed(view[offset:offset + chunk_size])
     except Exception as e:
-        raise ValueError(f"解密或解析数据失败: {e}")
\ No newline at end of file
+        raise ValueError(f"解密或解析数据失败: {e}")
+    return decrypter.finalize()
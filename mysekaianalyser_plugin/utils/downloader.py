@@ -0,0 +1,79 @@
+import asyncio
+import inspect
+from typing import Awaitable, Callable, Optional, Union
+
+import aiohttp
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class DownloadError(Exception):
+    """下载失败 (状态码异常、网络错误等)"""
+
+
+class FileTooLargeError(DownloadError):
+    """文件超过允许的最大体积"""
+
+
+class SessionPool:
+    """
+    进程内共享的 aiohttp 会话：连接复用 (keep-alive) + DNS 缓存。
+    在 bot 启动时 start()，关闭时 close()。
+    """
+    def __init__(self, limit: int = 32, dns_cache_ttl: int = 300, keepalive_timeout: float = 30, timeout: float = 60):
+        self._limit = limit
+        self._dns_cache_ttl = dns_cache_ttl
+        self._keepalive_timeout = keepalive_timeout
+        self._timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        if self._session is not None and not self._session.closed: return
+        connector = aiohttp.TCPConnector(
+            limit=self._limit,
+            ttl_dns_cache=self._dns_cache_ttl,
+            use_dns_cache=True,
+            keepalive_timeout=self._keepalive_timeout,
+        )
+        self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self._timeout))
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def get(self) -> aiohttp.ClientSession:
+        # 未在启动钩子中创建时 (例如单独调用) 懒加载
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    async def stream_download(
+            self,
+            url: str,
+            on_chunk: Callable[[bytes], Union[None, Awaitable[None]]],
+            max_bytes: Optional[int] = None,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> int:
+        """
+        分块下载并把每块交给 on_chunk 处理，返回总字节数。
+        on_chunk 可以是协程函数 (例如把解密放进线程池)，下一块在它完成后才交付，保证顺序。
+        Content-Length 或实际已读字节超过 max_bytes 时立即中止并抛出 FileTooLargeError。
+        """
+        session = await self.get()
+        try:
+            async with session.get(url) as response:
+                if response.status != 200:
+                    raise DownloadError(f"状态码: {response.status}")
+                if max_bytes is not None and response.content_length is not None and response.content_length > max_bytes:
+                    raise FileTooLargeError(f"文件大小 {response.content_length} 超过上限 {max_bytes}")
+                total = 0
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    total += len(chunk)
+                    if max_bytes is not None and total > max_bytes:
+                        raise FileTooLargeError(f"文件大小超过上限 {max_bytes}")
+                    result = on_chunk(chunk)
+                    if inspect.isawaitable(result): await result
+                return total
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise DownloadError(str(e) or type(e).__name__) from e
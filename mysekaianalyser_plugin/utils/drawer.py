@@ -1,9 +1,13 @@
 import os
 import math
-from typing import List
+import functools
+from typing import List, Optional, Tuple
 
-from PIL import Image, ImageDraw, ImageFont
-from .extractor import SummaryDrawData, HarvestMapDrawData
+from PIL import Image, ImageDraw
+from .extractor import SummaryDrawData, HarvestMapDrawData, RareResourceCount, SITE_ID_ORDER, get_site_map_background, get_light_size, get_resource_registry, \
+    get_map_icon_sizes, get_harvest_fixture_icon_path, get_rare_order
+from .compositor import LayerCompositor, get_outline_sprite
+from .fonts import FontRegistry
 from .. import configs
 
 
@@ -19,6 +23,11 @@ WIDGET_BG_COLOR = (180, 180, 180, 255)
 WIDGET_BG_RADIUS = 10
 DEFAULT_WATERMARK = "MapView & original code by MiddleRed, ported to python by NeuraXmy. Generated by mysekai-analyser."
 MYSEKAI_HARVEST_MAP_IMAGE_SCALE = 1.0
+LIGHT_IMAGE_PATH = "mysekai/light.png"
+COMPOSITOR_BACKEND = configs.COMPOSITOR_BACKEND
+SUMMARY_ICON_SIZE = (40, 40)
+# 统计图用到的 (字体, 字号)
+SUMMARY_FONTS = (('regular', 12), ('heavy', 24), ('bold', 14), ('bold', 30))
 
 SITE_ID_TO_NAME_MAP = {
     5: "grassland",
@@ -27,23 +36,16 @@ SITE_ID_TO_NAME_MAP = {
     8: "ruins"
 }
 
-try:
-    if not os.path.exists(DEFAULT_FONT_PATH): raise IOError(f"Font file not found: {DEFAULT_FONT_PATH}")
-    FONT_CACHE = {
-        'regular_12': ImageFont.truetype(DEFAULT_FONT_PATH, 12),
-        'heavy_24': ImageFont.truetype(DEFAULT_HEAVY_FONT_PATH, 24),
-        'bold_15': ImageFont.truetype(DEFAULT_BOLD_FONT_PATH, 15),
-        'bold_14': ImageFont.truetype(DEFAULT_BOLD_FONT_PATH, 14),
-        'bold_30': ImageFont.truetype(DEFAULT_BOLD_FONT_PATH, 30),
-    }
-except IOError as e:
-    print(f"FATAL ERROR: {e}. Please ensure font files are in './resources/fonts'.")
-    raise SystemExit("Font files are required.")
+FONTS = FontRegistry({
+    'regular': DEFAULT_FONT_PATH,
+    'bold': DEFAULT_BOLD_FONT_PATH,
+    'heavy': DEFAULT_HEAVY_FONT_PATH,
+})
 
 # --- 辅助函数 ---
 def add_watermark(image, text=DEFAULT_WATERMARK):
     draw = ImageDraw.Draw(image)
-    font = FONT_CACHE['regular_12']
+    font = FONTS.get('regular', 12)
     try:
         # Pillow 10.0.0+
         bbox = font.getbbox(text)
@@ -58,6 +60,11 @@ def add_watermark(image, text=DEFAULT_WATERMARK):
 def draw_rounded_rect(image_draw, bounds, radius, fill):
     image_draw.rounded_rectangle(bounds, radius=radius, fill=fill)
 
+def get_resized_icon(loader, image: Image.Image, path: str, size, resample=Image.Resampling.BICUBIC) -> Image.Image:
+    """有路径时走 loader 的缩放缓存，否则退回直接缩放。返回值只读。"""
+    if path: return loader.sprite(path, size, resample)
+    return image.resize(size, resample)
+
 
 # ======================================================================
 #  资源统计图绘制逻辑
@@ -70,10 +77,10 @@ def draw_summary_image(data: SummaryDrawData, loader) -> Image.Image:
     y_cursor = BG_PADDING
     top_bar_h = 80
     title_text = "MySekai 资源分析"
-    title_w = int(FONT_CACHE['heavy_24'].getlength(title_text))
+    title_w = int(FONTS.get('heavy', 24).getlength(title_text))
     title_box_w, title_box_h = title_w + 32, 60
     draw_rounded_rect(draw, (BG_PADDING, y_cursor + top_bar_h - title_box_h, BG_PADDING + title_box_w, y_cursor + top_bar_h), WIDGET_BG_RADIUS, WIDGET_BG_COLOR)
-    draw.text((BG_PADDING + 16, y_cursor + top_bar_h - title_box_h + 14), title_text, font=FONT_CACHE['heavy_24'], fill=BLACK)
+    draw.text((BG_PADDING + 16, y_cursor + top_bar_h - title_box_h + 14), title_text, font=FONTS.get('heavy', 24), fill=BLACK)
 
     if hasattr(data, 'weather'):
         weather_box_w = 270
@@ -110,7 +117,7 @@ def draw_summary_image(data: SummaryDrawData, loader) -> Image.Image:
             gate_icon_resized = data.gate_icon.resize((64, 64))
             canvas.paste(gate_icon_resized, (panel_x_start + 32, panel_y_cursor + 18), gate_icon_resized)
         if hasattr(data, 'gate_level'):
-            draw.text((panel_x_start + 32 + 32, panel_y_cursor + 100), f"Lv.{data.gate_level}", font=FONT_CACHE['bold_14'], fill=BLACK, anchor="ms")
+            draw.text((panel_x_start + 32 + 32, panel_y_cursor + 100), f"Lv.{data.gate_level}", font=FONTS.get('bold', 14), fill=BLACK, anchor="ms")
         char_x = panel_x_start + 116
         for char in data.visited_characters:
             if hasattr(char, 'sd_image') and char.sd_image.width > 1:
@@ -133,12 +140,12 @@ def draw_summary_image(data: SummaryDrawData, loader) -> Image.Image:
                 col, row = i % 5, i // 5
                 item_x, item_y = res_x_start + col * 120, panel_y_cursor + 16 + row * 45
                 if res.image.width > 1:
-                    res_img_resized = res.image.resize((40, 40))
+                    res_img_resized = get_resized_icon(loader, res.image, res.image_path, SUMMARY_ICON_SIZE)
                     canvas.paste(res_img_resized, (item_x, item_y), res_img_resized)
                 color = (120, 120, 120)
                 if hasattr(res, 'is_most_rare') and res.is_most_rare: color = (200, 50, 0)
                 elif hasattr(res, 'is_rare') and res.is_rare: color = (50, 0, 200)
-                draw.text((item_x + 45, item_y + 20), f"{res.quantity}", font=FONT_CACHE['bold_30'], fill=color, anchor="lm")
+                draw.text((item_x + 45, item_y + 20), f"{res.quantity}", font=FONTS.get('bold', 30), fill=color, anchor="lm")
             panel_y_cursor += site_box_h + 16
     y_cursor = panel_y_cursor
     final_image = canvas.crop((0, 0, canvas_w, y_cursor + BG_PADDING - 16))
@@ -148,83 +155,142 @@ def draw_summary_image(data: SummaryDrawData, loader) -> Image.Image:
 #  地图绘制逻辑
 # ======================================================================
 
+def get_quantity_label_style(quantity: int):
+    """数量标签的 (字体, 字号, 颜色)"""
+    scale = MYSEKAI_HARVEST_MAP_IMAGE_SCALE
+    if quantity == 2: return 'heavy', int(13 * scale), (200, 20, 0, 255)
+    if quantity > 2: return 'heavy', int(13 * scale), (200, 20, 200, 255)
+    return 'bold', int(11 * scale), (50, 50, 50, 255)
+
+def preload_quantity_glyphs():
+    """预渲染数量标签会用到的全部数字字形"""
+    for quantity in (1, 2, 3):
+        FONTS.preload_glyphs("0123456789", *get_quantity_label_style(quantity))
+
+def preload_fonts():
+    """检查字体文件，预加载统计图用到的字体与数量标签字形。字体缺失时抛出 FileNotFoundError。"""
+    missing = FONTS.missing_faces()
+    if missing:
+        raise FileNotFoundError(f"字体文件缺失: {', '.join(missing)}，请将字体文件放在 ./resources/fonts")
+    for face, size in SUMMARY_FONTS:
+        FONTS.get(face, size)
+    preload_quantity_glyphs()
+
+def _build_site_base_layer(data: HarvestMapDrawData) -> Image.Image:
+    canvas = Image.new("RGBA", (data.draw_width, data.draw_height))
+    if data.map_bg_image.width > 1:
+        canvas.paste(data.map_bg_image, (0, 0))
+    return canvas
+
+def get_site_base_layer(data: HarvestMapDrawData, loader) -> Image.Image:
+    """
+    场景的静态底层 (底图)，按场景和画布参数缓存在 loader 上。
+    返回共享对象，只读，请勿原地修改。
+    """
+    key = ("site_base_layer", data.site_id, data.draw_width, data.draw_height)
+    return loader.get_derived(key, lambda: _build_site_base_layer(data))
+
+SPAWN_MARKER_LINE_WIDTH = 3
+
+@functools.lru_cache(maxsize=8)
+def get_spawn_marker_sprite(scale: float) -> Tuple[Image.Image, int]:
+    """
+    出生点的红色叉号贴图及其中心在贴图内的偏移，与直接在画布上 draw.line 的像素相同。
+    返回共享对象，请勿原地修改。
+    """
+    half_size = int(20 * scale) // 2
+    center = half_size + SPAWN_MARKER_LINE_WIDTH
+    sprite = Image.new("RGBA", (center * 2 + 1, center * 2 + 1), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(sprite, "RGBA")
+    draw.line([(center - half_size, center - half_size), (center + half_size, center + half_size)], fill=RED, width=SPAWN_MARKER_LINE_WIDTH)
+    draw.line([(center + half_size, center - half_size), (center - half_size, center + half_size)], fill=RED, width=SPAWN_MARKER_LINE_WIDTH)
+    return sprite, center
+
+def get_light_sprite(loader, size: int) -> Image.Image:
+    """按尺寸缓存的光晕图，跨地图、跨任务复用"""
+    return loader.sprite(LIGHT_IMAGE_PATH, (size, size))
+
+def preload_site_maps(loader):
+    """预先计算所有场景的裁剪缩放底图、静态底层、光晕图与资源注册表 (启动或资源更新后调用)。"""
+    for site_id in SITE_ID_ORDER:
+        bg = get_site_map_background(loader, site_id)
+        get_site_base_layer(HarvestMapDrawData(site_id, bg.image, bg.draw_width, bg.draw_height, bg.spawn_point, [], []), loader)
+    for is_small in (True, False):
+        get_light_sprite(loader, get_light_size(is_small))
+    get_resource_registry(loader)
+
+def preload_resource_sprites(loader):
+    """预先缩放所有采集点图标与素材图标 (地图大小图标 + 统计图图标)，这些几乎每次解析都会用到。"""
+    point_size, large_size, small_size = get_map_icon_sizes()
+    fixtures = loader.md.mysekai_site_harvest_fixtures
+    for fixture_id in fixtures.ids():
+        loader.sprite(get_harvest_fixture_icon_path(fixtures.find_by_id(fixture_id)), (point_size, point_size))
+    for res in get_resource_registry(loader).infos():
+        if res.resource_type != "mysekai_material" or not res.icon_path: continue
+        for size in (large_size, small_size):
+            loader.sprite(res.icon_path, (size, size), Image.Resampling.LANCZOS)
+        loader.sprite(res.icon_path, SUMMARY_ICON_SIZE, Image.Resampling.BICUBIC)
+
 def draw_harvest_map_image(data: HarvestMapDrawData, loader) -> Image.Image:
     """
-    接收已经计算好所有左上角坐标的数据，直接在最终尺寸的画布上进行绘制。
+    接收已经计算好所有左上角坐标的数据，在缓存的静态底层之上合成一个动态图层。
+    合成顺序：采集点 -> 出生点 -> 光晕 -> 图标与描边 -> 数量标签。
+    出生点与描边直接写入像素 (不混合)，与逐个 ImageDraw 绘制的结果一致。
     """
-    canvas = Image.new("RGBA", (data.draw_width, data.draw_height))
-    draw = ImageDraw.Draw(canvas, "RGBA")
+    compositor = LayerCompositor(get_site_base_layer(data, loader), COMPOSITOR_BACKEND)
 
-    if data.map_bg_image.width > 1:
-        canvas.paste(data.map_bg_image, (0, 0))
+    # 采集点
+    for point in data.harvest_points:
+        if point.image.width > 1:
+            compositor.blit(point.image, point.x, point.y)
 
-    # 绘制采集点
-    if hasattr(data, 'harvest_points'):
-        for point in data.harvest_points:
-            if point.image.width > 1:
-                canvas.paste(point.image, (point.x, point.y), point.image)
-
-    # 绘制出生点
-    if hasattr(data, 'spawn_point'):
-        center_x, center_y = data.spawn_point
-        spawn_size = int(20 * MYSEKAI_HARVEST_MAP_IMAGE_SCALE)
-        half_size = spawn_size // 2
-        draw.line([(center_x - half_size, center_y - half_size), (center_x + half_size, center_y + half_size)], fill=RED, width=3)
-        draw.line([(center_x + half_size, center_y - half_size), (center_x - half_size, center_y + half_size)], fill=RED, width=3)
-
-    if hasattr(data, 'dropped_resources'):
-        for res in data.dropped_resources:
-            if res.light_size:
-                try:
-                    light_img = loader.get("mysekai/light.png").resize((res.light_size, res.light_size), Image.Resampling.LANCZOS)
-                    pos_x = int(res.x + res.size / 2 - res.light_size / 2)
-                    pos_y = int(res.z + res.size / 2 - res.light_size / 2)
-                    canvas.paste(light_img, (pos_x, pos_y), light_img)
-                except Exception: pass
-        for res in data.dropped_resources:
-            if res.image.width <= 1: continue
-            img_resized = res.image.resize((res.size, res.size), Image.Resampling.LANCZOS)
-            canvas.paste(img_resized, (res.x, res.z), img_resized)
-            if res.outline:
-                draw.rectangle([(res.x, res.z), (res.x + res.size, res.z + res.size)], outline=res.outline[0], width=res.outline[1])
-        for res in data.dropped_resources:
-            if res.is_small_icon: continue
-            text = f"{res.quantity}"
-            pos = (res.x, res.z - 1)
-            scale = MYSEKAI_HARVEST_MAP_IMAGE_SCALE
-            font_size = int(11 * scale); font_path = DEFAULT_BOLD_FONT_PATH; color = (50, 50, 50, 255)
-            if res.quantity == 2: font_path, font_size, color = DEFAULT_HEAVY_FONT_PATH, int(13 * scale), (200, 20, 0, 255)
-            elif res.quantity > 2: font_path, font_size, color = DEFAULT_HEAVY_FONT_PATH, int(13 * scale), (200, 20, 200, 255)
-            font = ImageFont.truetype(font_path, font_size)
-            draw.text(pos, text, font=font, fill=color)
+    # 出生点
+    if data.spawn_point:
+        spawn_sprite, center = get_spawn_marker_sprite(MYSEKAI_HARVEST_MAP_IMAGE_SCALE)
+        compositor.paste(spawn_sprite, data.spawn_point[0] - center, data.spawn_point[1] - center)
 
-    return canvas
+    # 稀有资源光晕
+    for res in data.dropped_resources:
+        if not res.light_size: continue
+        light_img = get_light_sprite(loader, res.light_size)
+        if light_img.width <= 1: continue
+        pos_x = int(res.x + res.size / 2 - res.light_size / 2)
+        pos_y = int(res.z + res.size / 2 - res.light_size / 2)
+        compositor.blit(light_img, pos_x, pos_y)
+
+    # 资源图标与描边
+    for res in data.dropped_resources:
+        if res.image.width <= 1: continue
+        img_resized = get_resized_icon(loader, res.image, res.image_path, (res.size, res.size), Image.Resampling.LANCZOS)
+        compositor.blit(img_resized, res.x, res.z)
+        if res.outline:
+            compositor.paste(get_outline_sprite(res.size, res.outline[0], res.outline[1]), res.x, res.z)
+
+    # 数量标签
+    for res in data.dropped_resources:
+        if res.is_small_icon: continue
+        face, font_size, color = get_quantity_label_style(res.quantity)
+        for glyph_img, glyph_x, glyph_y in FONTS.text_sprites((res.x, res.z - 1), f"{res.quantity}", face, font_size, color):
+            compositor.blit(glyph_img, glyph_x, glyph_y)
+
+    return compositor.compose()
 
 # ======================================================================
 #  图片拼接逻辑
 # ======================================================================
-def combine_and_save_maps(map_data_list: List[HarvestMapDrawData], loader, filename: str):
-    map_images = [draw_harvest_map_image(data, loader) for data in map_data_list]
+def combine_maps(map_images: List[Image.Image]) -> Optional[Image.Image]:
+    """把各场景地图按 2 列拼接并加水印，没有有效地图时返回 None。"""
     map_images = [img for img in map_images if img and img.width > 1]
     if not map_images:
         print("Warning: No valid maps were generated to combine.")
-        return
-
-    base_name, extension = os.path.splitext(filename)
-    print("Saving individual maps...")
-    for i, img in enumerate(map_images):
-        site_id = map_data_list[i].site_id
-        map_name = SITE_ID_TO_NAME_MAP.get(site_id, f"unknown_{site_id}")
-        individual_filename = f"{base_name}_map_{map_name}{extension}"
-        try:
-            img.save(individual_filename)
-            print(f"  - Saved: {individual_filename}")
-        except Exception as e:
-            print(f"  - FAILED to save {individual_filename}: {e}")
-
-    cols = 2; rows = math.ceil(len(map_images) / cols); gap = 16
+        return None
+    return add_watermark(combine_grid(map_images, 2), text=DEFAULT_WATERMARK)
+
+def combine_grid(images: List[Image.Image], cols: int) -> Image.Image:
+    """按列数拼接图片，每列取该列最宽、每行取该行最高的尺寸。"""
+    rows = math.ceil(len(images) / cols); gap = 16
     col_widths = [0] * cols; row_heights = [0] * rows
-    for i, img in enumerate(map_images):
+    for i, img in enumerate(images):
         row, col = i // cols, i % cols
         if img.width > col_widths[col]: col_widths[col] = img.width
         if img.height > row_heights[row]: row_heights[row] = img.height
@@ -238,11 +304,109 @@ def combine_and_save_maps(map_data_list: List[HarvestMapDrawData], loader, filen
         current_x = BG_PADDING
         for c in range(cols):
             i = r * cols + c
-            if i < len(map_images):
-                final_canvas.paste(map_images[i], (current_x, current_y))
+            if i < len(images):
+                final_canvas.paste(images[i], (current_x, current_y))
             current_x += col_widths[c] + gap
         current_y += row_heights[r] + gap
+    return final_canvas
+
+def combine_and_save_maps(map_data_list: List[HarvestMapDrawData], loader, filename: str, save_individual: bool = False):
+    """
+    绘制并保存组合地图。单个场景的地图默认不再写出，
+    需要时传入 save_individual=True (内存中按需获取请使用 pipeline.SiteMapArtifacts)。
+    """
+    map_images = [draw_harvest_map_image(data, loader) for data in map_data_list]
+    final_image = combine_maps(map_images)
+    if final_image is None: return
+
+    if save_individual:
+        base_name, extension = os.path.splitext(filename)
+        print("Saving individual maps...")
+        for data, img in zip(map_data_list, map_images):
+            if not img or img.width <= 1: continue
+            map_name = SITE_ID_TO_NAME_MAP.get(data.site_id, f"unknown_{data.site_id}")
+            individual_filename = f"{base_name}_map_{map_name}{extension}"
+            try:
+                img.save(individual_filename)
+                print(f"  - Saved: {individual_filename}")
+            except Exception as e:
+                print(f"  - FAILED to save {individual_filename}: {e}")
 
-    final_image = add_watermark(final_canvas, text=DEFAULT_WATERMARK)
     final_image.save(filename)
-    print(f"Combined map saved as: {filename}")
\ No newline at end of file
+    print(f"Combined map saved as: {filename}")
+
+
+# ======================================================================
+#  批量报告绘制逻辑
+# ======================================================================
+BATCH_REPORT_COLUMNS = 3
+BATCH_LABEL_H = 44
+RARE_TABLE_LABEL_W, RARE_TABLE_CELL_W, RARE_TABLE_ROW_H = 240, 72, 52
+MOST_RARE_COLOR, RARE_COLOR = (200, 50, 0), (50, 0, 200)
+
+def _fit_text(text: str, font, max_width: int) -> str:
+    """超出宽度时截断并加省略号"""
+    if font.getlength(text) <= max_width: return text
+    while text and font.getlength(text + "…") > max_width: text = text[:-1]
+    return text + "…"
+
+def draw_labelled_summary(label: str, summary_image: Image.Image) -> Image.Image:
+    """在统计图上方加一条账号标题"""
+    canvas = Image.new("RGBA", (summary_image.width, summary_image.height + BATCH_LABEL_H), (200, 220, 255, 255))
+    font = FONTS.get('heavy', 24)
+    ImageDraw.Draw(canvas).text((BG_PADDING, 12), _fit_text(label, font, summary_image.width - BG_PADDING * 2), font=font, fill=BLACK)
+    canvas.paste(summary_image, (0, BATCH_LABEL_H))
+    return canvas
+
+def draw_rare_resource_table(rows: List[Tuple[str, List[RareResourceCount]]], loader) -> Optional[Image.Image]:
+    """各账号的稀有资源数量表，最后一行为合计。没有任何稀有资源时返回 None。"""
+    columns = {}
+    for _, rare in rows:
+        for res in rare: columns.setdefault(res.key, res)
+    if not columns: return None
+    columns = sorted(columns.values(), key=lambda r: get_rare_order(r.key))
+    totals = {res.key: 0 for res in columns}
+    for _, rare in rows:
+        for res in rare: totals[res.key] += res.quantity
+
+    width = BG_PADDING * 2 + RARE_TABLE_LABEL_W + RARE_TABLE_CELL_W * len(columns)
+    height = BG_PADDING * 2 + RARE_TABLE_ROW_H * (len(rows) + 2)
+    canvas = Image.new("RGBA", (width, height), (200, 220, 255, 255))
+    draw = ImageDraw.Draw(canvas)
+    draw_rounded_rect(draw, (BG_PADDING, BG_PADDING, width - BG_PADDING, height - BG_PADDING), WIDGET_BG_RADIUS, WIDGET_BG_COLOR)
+    label_font, count_font = FONTS.get('bold', 20), FONTS.get('bold', 22)
+
+    # 表头：资源图标
+    y = BG_PADDING
+    draw.text((BG_PADDING + 16, y + RARE_TABLE_ROW_H // 2), "稀有资源", font=label_font, fill=BLACK, anchor="lm")
+    for i, res in enumerate(columns):
+        x = BG_PADDING + RARE_TABLE_LABEL_W + i * RARE_TABLE_CELL_W + (RARE_TABLE_CELL_W - SUMMARY_ICON_SIZE[0]) // 2
+        if res.image_path:
+            icon = loader.sprite(res.image_path, SUMMARY_ICON_SIZE, Image.Resampling.BICUBIC)
+            if icon.width > 1: canvas.paste(icon, (x, y + (RARE_TABLE_ROW_H - SUMMARY_ICON_SIZE[1]) // 2), icon)
+
+    # 每个账号一行，最后一行合计
+    table_rows = [(label, {res.key: res.quantity for res in rare}) for label, rare in rows] + [("合计", totals)]
+    for label, counts in table_rows:
+        y += RARE_TABLE_ROW_H
+        draw.line([(BG_PADDING + 8, y), (width - BG_PADDING - 8, y)], fill=(150, 150, 150, 255), width=1)
+        center_y = y + RARE_TABLE_ROW_H // 2
+        draw.text((BG_PADDING + 16, center_y), _fit_text(label, label_font, RARE_TABLE_LABEL_W - 24), font=label_font, fill=BLACK, anchor="lm")
+        for i, res in enumerate(columns):
+            center_x = BG_PADDING + RARE_TABLE_LABEL_W + i * RARE_TABLE_CELL_W + RARE_TABLE_CELL_W // 2
+            quantity = counts.get(res.key, 0)
+            color = (120, 120, 120) if not quantity else MOST_RARE_COLOR if res.is_most_rare else RARE_COLOR
+            draw.text((center_x, center_y), str(quantity) if quantity else "-", font=count_font, fill=color, anchor="mm")
+    return canvas
+
+def draw_batch_report(accounts: List[Tuple[str, Image.Image]], rare_table: Optional[Image.Image]) -> Optional[Image.Image]:
+    """批量报告：上方为稀有资源汇总表，下方为各账号统计图的网格。没有任何账号时返回 None。"""
+    if not accounts: return None
+    labelled = [draw_labelled_summary(label, image) for label, image in accounts]
+    grid = combine_grid(labelled, min(BATCH_REPORT_COLUMNS, len(labelled)))
+    if rare_table is None: return add_watermark(grid, text=DEFAULT_WATERMARK)
+
+    canvas = Image.new("RGBA", (max(grid.width, rare_table.width), grid.height + rare_table.height - BG_PADDING), (200, 220, 255, 255))
+    canvas.paste(rare_table, (0, 0))
+    canvas.paste(grid, (0, rare_table.height - BG_PADDING))
+    return add_watermark(canvas, text=DEFAULT_WATERMARK)
@@ -0,0 +1,82 @@
+import io
+from typing import Optional
+
+from PIL import Image
+
+from .. import configs
+
+FORMAT_PNG = "png"
+FORMAT_PNG_QUANTIZED = "png_quantized"
+FORMAT_WEBP_LOSSLESS = "webp_lossless"
+FORMAT_WEBP = "webp"
+FORMAT_JPEG = "jpeg"
+
+FILE_EXTENSIONS = {
+    FORMAT_PNG: "png",
+    FORMAT_PNG_QUANTIZED: "png",
+    FORMAT_WEBP_LOSSLESS: "webp",
+    FORMAT_WEBP: "webp",
+    FORMAT_JPEG: "jpg",
+}
+JPEG_BACKGROUND = (255, 255, 255)
+
+
+class ImageEncoder:
+    """
+    输出图片编码器，全部在内存中完成。
+    - png: 指定 zlib 压缩等级
+    - png_quantized: 先量化为调色板图再以 PNG 编码
+    - webp_lossless / webp: WebP 无损 / 有损
+    - jpeg: 透明部分铺在白底上后编码
+    """
+    def __init__(self, fmt: str = FORMAT_PNG, png_compress_level: int = 6, quality: int = 85, webp_method: int = 4, quantize_colors: int = 256):
+        if fmt not in FILE_EXTENSIONS:
+            raise ValueError(f"不支持的输出格式: {fmt}，可选: {', '.join(FILE_EXTENSIONS)}")
+        self.format = fmt
+        self.png_compress_level = png_compress_level
+        self.quality = quality
+        self.webp_method = webp_method
+        self.quantize_colors = quantize_colors
+
+    @property
+    def extension(self) -> str:
+        return FILE_EXTENSIONS[self.format]
+
+    @property
+    def stage_name(self) -> str:
+        """耗时统计中的阶段名，按格式区分。"""
+        return f"encode:{self.format}"
+
+    def _save(self, image: Image.Image, buffer: io.BytesIO):
+        if self.format == FORMAT_PNG:
+            image.save(buffer, format="PNG", compress_level=self.png_compress_level)
+        elif self.format == FORMAT_PNG_QUANTIZED:
+            method = Image.Quantize.FASTOCTREE if image.mode == "RGBA" else Image.Quantize.MEDIANCUT
+            quantized = image.quantize(self.quantize_colors, method=method, dither=Image.Dither.NONE)
+            quantized.save(buffer, format="PNG", compress_level=self.png_compress_level)
+        elif self.format == FORMAT_WEBP_LOSSLESS:
+            image.save(buffer, format="WEBP", lossless=True, method=self.webp_method)
+        elif self.format == FORMAT_WEBP:
+            image.save(buffer, format="WEBP", quality=self.quality, method=self.webp_method)
+        else:
+            if image.mode in ("RGBA", "LA", "P"):
+                image = image.convert("RGBA")
+                flattened = Image.new("RGB", image.size, JPEG_BACKGROUND)
+                flattened.paste(image, mask=image.getchannel("A"))
+                image = flattened
+            image.save(buffer, format="JPEG", quality=self.quality)
+
+    def encode(self, image: Optional[Image.Image]) -> Optional[bytes]:
+        if image is None: return None
+        buffer = io.BytesIO()
+        self._save(image, buffer)
+        return buffer.getvalue()
+
+
+DEFAULT_ENCODER = ImageEncoder(
+    configs.OUTPUT_FORMAT,
+    png_compress_level=configs.OUTPUT_PNG_COMPRESS_LEVEL,
+    quality=configs.OUTPUT_QUALITY,
+    webp_method=configs.OUTPUT_WEBP_METHOD,
+    quantize_colors=configs.OUTPUT_QUANTIZE_COLORS,
+)
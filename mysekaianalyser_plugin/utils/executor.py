@@ -0,0 +1,58 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+
+from .. import configs
+
+T = TypeVar("T")
+
+
+class BlockingExecutor:
+    """
+    插件专用的线程池。文件读写、解密解析、渲染编码等阻塞操作都在这里执行，
+    既不阻塞事件循环，也不占用 asyncio 默认线程池 (与其它插件共享)。
+    """
+    def __init__(self, workers: int, thread_name_prefix: str = "msa-blocking"):
+        self.workers = workers
+        self._thread_name_prefix = thread_name_prefix
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self._thread_name_prefix)
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """在线程池中执行 fn(*args, **kwargs)，与 asyncio.to_thread 一样传递 contextvars。"""
+        call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        self._in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), call)
+        finally:
+            self._in_flight -= 1
+            self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "in_flight": self._in_flight, "completed": self.completed}
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+BLOCKING_EXECUTOR = BlockingExecutor(configs.BLOCKING_EXECUTOR_WORKERS)
+
+
+async def run_blocking(fn: Callable[..., T], *args, **kwargs) -> T:
+    """在插件专用线程池中执行阻塞函数"""
+    return await BLOCKING_EXECUTOR.run(fn, *args, **kwargs)
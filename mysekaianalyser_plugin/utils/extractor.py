@@ -1,13 +1,26 @@
 from .. import configs
 from PIL import Image
 from datetime import datetime
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 from .loader import LocalAssetLoader, UNKNOWN_IMG
 
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，缺失时使用纯 Python 实现
+    np = None
+
 SITE_ID_ORDER = (5, 7, 6, 8)
 MOST_RARE_MYSEKAI_RES = ["mysekai_material_5", "mysekai_material_12", "mysekai_material_20", "mysekai_material_24", "mysekai_fixture_121", "material_17", "material_170"]
 RARE_MYSEKAI_RES = ["mysekai_material_32", "mysekai_material_33", "mysekai_material_34", "mysekai_material_61", "mysekai_material_64", "mysekai_material_65", "mysekai_material_66"]
+COTTON_MYSEKAI_RES = ['mysekai_material_21', 'mysekai_material_22']
+# 资源类型 -> 元数据表，资源注册表按这些表预先解析全部资源
+RESOURCE_TYPE_TABLES = {
+    "mysekai_material": "mysekai_materials",
+    "mysekai_item": "mysekai_items",
+    "mysekai_fixture": "mysekai_fixtures",
+    "mysekai_music_record": "mysekai_musicrecords",
+}
 MYSEKAI_HARVEST_MAP_IMAGE_SCALE = 0.8
 ENABLE_MAP_CROPPING = configs.ENABLE_MAP_CROPPING
 
@@ -32,20 +45,40 @@ class WeatherInfo: phenomena_images: List[Image.Image]; current_phenomenon_id: i
 @dataclass
 class VisitedCharacter: sd_image: Image.Image
 @dataclass
-class ResourceItem: key: str; quantity: int; image: Image.Image; is_rare: bool; is_most_rare: bool; has_music_record: bool
+class ResourceItem: key: str; quantity: int; image: Image.Image; is_rare: bool; is_most_rare: bool; has_music_record: bool; image_path: str = ""
 @dataclass
 class SiteResourceSummary: site_id: int; site_image: Image.Image; resources: List[ResourceItem]
 @dataclass
+class RareResourceCount: key: str; quantity: int; is_most_rare: bool; image_path: str = ""
+@dataclass
 class SummaryDrawData: weather: WeatherInfo; gate_icon: Image.Image; gate_level: int; visited_characters: List[VisitedCharacter]; site_summaries: List[SiteResourceSummary]
 @dataclass
 class HarvestPoint: image: Image.Image; x: int; y: int
 @dataclass
-class DroppedResource: image: Image.Image; quantity: int; x: int; z: int; size: int; draw_order: int; is_small_icon: bool; outline: Optional[Tuple[Tuple[int, int, int, int], int]]; light_size: Optional[int]
+class DroppedResource: image: Image.Image; quantity: int; x: int; z: int; size: int; draw_order: int; is_small_icon: bool; outline: Optional[Tuple[Tuple[int, int, int, int], int]]; light_size: Optional[int]; image_path: str = ""
+@dataclass
+class ResourceInfo: key: str; resource_type: str; resource_id: int; icon_path: str; is_rare: bool; is_most_rare: bool
+@dataclass
+class _PlacedDrop: resource: ResourceInfo; quantity: int; x: int; z: int; size: float; draw_order: int; is_small: bool
+@dataclass
+class SiteMapBackground: site_id: int; image: Image.Image; draw_width: int; draw_height: int; mid_x: float; mid_z: float; grid_size: float; offset_x: float; offset_z: float; spawn_point: Tuple[int, int] = (0, 0)
 @dataclass
 class HarvestMapDrawData: site_id: int; map_bg_image: Image.Image; draw_width: int; draw_height: int; spawn_point: Tuple[int, int]; harvest_points: List[HarvestPoint]; dropped_resources: List[DroppedResource]
 
 # --- Helper Functions ---
-def _get_resource_icon(loader: LocalAssetLoader, key: str) -> Image.Image:
+def get_light_size(is_small: bool) -> int:
+    """稀有资源光晕的边长，只有大小图标两种"""
+    return int(int(45 * MYSEKAI_HARVEST_MAP_IMAGE_SCALE) * (3 if is_small else 6))
+
+def get_map_icon_sizes() -> Tuple[int, int, int]:
+    """地图上 (采集点, 大图标, 小图标) 的边长"""
+    scale = MYSEKAI_HARVEST_MAP_IMAGE_SCALE
+    return int(160 * scale), int(35 * scale), int(17 * scale)
+
+def get_harvest_fixture_icon_path(meta: dict) -> str:
+    return f"mysekai/harvest_fixture_icon/{meta['mysekaiSiteHarvestFixtureRarityType']}/{meta['assetbundleName']}.png"
+
+def _get_resource_icon_path(loader: LocalAssetLoader, key: str) -> str:
     path = ""
     res_id = int(key.split("_")[-1])
     if key.startswith("mysekai_material"):
@@ -58,14 +91,66 @@ def _get_resource_icon(loader: LocalAssetLoader, key: str) -> Image.Image:
     elif key.startswith("mysekai_music_record"):
         record_data = loader.md.mysekai_musicrecords.find_by_id(res_id)
         if record_data: music_data = loader.md.musics.find_by_id(record_data['externalId']); path = f"music/jacket/{music_data['assetbundleName']}/{music_data['assetbundleName']}.png" if music_data else ""
-    if path:
-        img = loader.rip.img(path)
-        if img.width > 1: return img
-    return UNKNOWN_IMG
+    return path
+
+def _get_resource_icon(loader: LocalAssetLoader, res: ResourceInfo) -> Tuple[Image.Image, str]:
+    """返回资源图标及其路径，路径供绘制时按尺寸查询缩放缓存。"""
+    if res.icon_path:
+        img = loader.peek(res.icon_path)
+        if img.width > 1: return img, res.icon_path
+    return UNKNOWN_IMG, ""
+
+class ResourceRegistry:
+    """
+    (resourceType, resourceId) -> ResourceInfo 的查询表。
+    资源加载后按元数据一次性解析全部资源的 key、图标路径与稀有度，之后每个掉落物只需一次字典查询；
+    元数据之外的资源 (例如 material) 在首次出现时解析并记入表中。
+    """
+    def __init__(self, loader: LocalAssetLoader):
+        self._loader = loader
+        self._entries: Dict[Tuple[str, int], ResourceInfo] = {}
+        self._most_rare = frozenset(MOST_RARE_MYSEKAI_RES)
+        self._rare = frozenset(RARE_MYSEKAI_RES)
+
+    @classmethod
+    def build(cls, loader: LocalAssetLoader) -> "ResourceRegistry":
+        registry = cls(loader)
+        for res_type, table_name in RESOURCE_TYPE_TABLES.items():
+            for res_id in getattr(loader.md, table_name).ids():
+                registry.get(res_type, res_id)
+        return registry
+
+    def get(self, res_type: str, res_id: int) -> ResourceInfo:
+        info = self._entries.get((res_type, res_id))
+        if info is None:
+            key = f"{res_type}_{res_id}"
+            info = ResourceInfo(key, res_type, res_id, _get_resource_icon_path(self._loader, key), key in self._rare, key in self._most_rare)
+            # 并发首次解析时结果相同，后写入的覆盖即可
+            self._entries[(res_type, res_id)] = info
+        return info
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def infos(self) -> List[ResourceInfo]:
+        return list(self._entries.values())
+
+def get_resource_registry(loader: LocalAssetLoader) -> ResourceRegistry:
+    """loader 上缓存的资源注册表，资源更新 (loader 重建或 clear_caches) 后重新构建。"""
+    return loader.get_derived(("resource_registry",), lambda: ResourceRegistry.build(loader))
 
 def _get_character_sd_image(loader: LocalAssetLoader, cuid: int) -> Image.Image:
     return loader.rip.img(f"character/character_sd_l/chr_sp_{cuid}.png")
 
+def get_rare_order(key: str) -> int:
+    """稀有资源在列表中的顺序，最稀有的在前"""
+    rare_list = MOST_RARE_MYSEKAI_RES + RARE_MYSEKAI_RES
+    return rare_list.index(key) if key in rare_list else len(rare_list)
+
+def get_current_phenomenon_index(upload_time: datetime) -> int:
+    """天气预报中当前时段的序号 (4:00 与 16:00 切换)"""
+    return 1 if upload_time.hour < 4 or upload_time.hour >= 16 else 0
+
 # --- Main Extractor Functions ---
 def extract_summary_data(mysekai_info: dict, loader: LocalAssetLoader, show_harvested: bool) -> SummaryDrawData:
     upload_time = datetime.fromtimestamp(mysekai_info['updatedResources']['now'] / 1000)
@@ -74,7 +159,7 @@ def extract_summary_data(mysekai_info: dict, loader: LocalAssetLoader, show_harv
     for item in schedule:
         phenom_data = loader.md.mysekai_phenomenas.find_by_id(item['mysekaiPhenomenaId'])
         if phenom_data: phenom_imgs.append(loader.rip.img(f"mysekai/thumbnail/phenomena/{phenom_data['iconAssetbundleName']}.png")); phenom_ids.append(item['mysekaiPhenomenaId'])
-    current_hour = upload_time.hour; phenom_idx = 1 if current_hour < 4 or current_hour >= 16 else 0
+    phenom_idx = get_current_phenomenon_index(upload_time)
     current_phenomenon_id = phenom_ids[phenom_idx] if phenom_idx < len(phenom_ids) else 1
     weather = WeatherInfo(phenom_imgs, current_phenomenon_id, phenom_idx)
     chara_visit_data = mysekai_info.get('userMysekaiGateCharacterVisit', {}); user_gate = chara_visit_data.get('userMysekaiGate', {})
@@ -82,13 +167,14 @@ def extract_summary_data(mysekai_info: dict, loader: LocalAssetLoader, show_harv
     gate_icon = loader.get(f'mysekai/gate_icon/gate_{gate_id}.png')
     visited_characters_raw = [_get_character_sd_image(loader, item['mysekaiGameCharacterUnitGroupId']) for item in chara_visit_data.get('userMysekaiGateCharacters', [])]
     visited_characters = [VisitedCharacter(img) for img in visited_characters_raw if img.width > 1]
+    registry = get_resource_registry(loader)
     site_res_num = {site_id: {} for site_id in SITE_ID_ORDER}
     for site_map in mysekai_info.get('updatedResources', {}).get('userMysekaiHarvestMaps', []):
         site_id = site_map.get('mysekaiSiteId')
         if site_id not in site_res_num: continue
         for res_drop in site_map.get('userMysekaiSiteHarvestResourceDrops', []):
             if not show_harvested and res_drop.get('mysekaiSiteHarvestResourceDropStatus') != "before_drop": continue
-            res_key = f"{res_drop['resourceType']}_{res_drop['resourceId']}"; site_res_num[site_id][res_key] = site_res_num[site_id].get(res_key, 0) + res_drop['quantity']
+            res_key = (res_drop['resourceType'], res_drop['resourceId']); site_res_num[site_id][res_key] = site_res_num[site_id].get(res_key, 0) + res_drop['quantity']
     user_music_records = {item['mysekaiMusicRecordId'] for item in mysekai_info.get('updatedResources', {}).get('userMysekaiMusicRecords', [])}
 
     site_summaries = []
@@ -99,13 +185,16 @@ def extract_summary_data(mysekai_info: dict, loader: LocalAssetLoader, show_harv
             continue
 
         def get_res_order(item):
-            key, num = item; order = num;
-            if key in MOST_RARE_MYSEKAI_RES: order -= 1000000
-            elif key in RARE_MYSEKAI_RES: order -= 100000
+            res, num = item; order = num;
+            if res.is_most_rare: order -= 1000000
+            elif res.is_rare: order -= 100000
             return order
 
-        sorted_res = sorted(res_map.items(), key=get_res_order, reverse=True)
-        res_items = [ResourceItem(key, qty, _get_resource_icon(loader, key), key in RARE_MYSEKAI_RES, key in MOST_RARE_MYSEKAI_RES, (key.startswith("mysekai_music_record") and int(key.split("_")[-1]) in user_music_records)) for key, qty in sorted_res]
+        sorted_res = sorted(((registry.get(*res_key), qty) for res_key, qty in res_map.items()), key=get_res_order, reverse=True)
+        res_items = []
+        for res, qty in sorted_res:
+            icon, icon_path = _get_resource_icon(loader, res)
+            res_items.append(ResourceItem(res.key, qty, icon, res.is_rare, res.is_most_rare, (res.resource_type == "mysekai_music_record" and res.resource_id in user_music_records), image_path=icon_path))
 
         correct_image_filename = SUMMARY_PREVIEW_IMAGE_MAP.get(site_id, f"{site_id}.png")
         site_img = loader.get(f"mysekai/site_map/{correct_image_filename}")
@@ -114,6 +203,16 @@ def extract_summary_data(mysekai_info: dict, loader: LocalAssetLoader, show_harv
 
     return SummaryDrawData(weather, gate_icon, gate_level, visited_characters, site_summaries)
 
+def count_rare_resources(summary: SummaryDrawData) -> List[RareResourceCount]:
+    """汇总各场景中的稀有资源数量"""
+    counts = {}
+    for site in summary.site_summaries:
+        for res in site.resources:
+            if not (res.is_rare or res.is_most_rare): continue
+            if res.key in counts: counts[res.key].quantity += res.quantity
+            else: counts[res.key] = RareResourceCount(res.key, res.quantity, res.is_most_rare, res.image_path)
+    return sorted(counts.values(), key=lambda r: get_rare_order(r.key))
+
 def extract_all_harvest_map_data(mysekai_info: dict, loader: LocalAssetLoader, show_harvested: bool) -> List[HarvestMapDrawData]:
     map_data_list = []
     maps_by_id = {site_map['mysekaiSiteId']: site_map for site_map in mysekai_info.get('updatedResources', {}).get('userMysekaiHarvestMaps', [])}
@@ -126,13 +225,9 @@ def extract_all_harvest_map_data(mysekai_info: dict, loader: LocalAssetLoader, s
     return map_data_list
 
 
-def _extract_single_harvest_map_data(site_map_info: dict, loader: LocalAssetLoader, show_harvested: bool) -> HarvestMapDrawData:
-    site_id = site_map_info['mysekaiSiteId']
+def _build_site_map_background(loader: LocalAssetLoader, site_id: int, scale: float, enable_cropping: bool) -> SiteMapBackground:
     config = SITE_MAP_CONFIGS[site_id]
-
-    scale = MYSEKAI_HARVEST_MAP_IMAGE_SCALE
-
-    site_image_original = loader.get(config['image'])
+    site_image_original = loader.peek(config['image'])
 
     mid_x = (site_image_original.width * scale) / 2
     mid_z = (site_image_original.height * scale) / 2
@@ -143,7 +238,7 @@ def _extract_single_harvest_map_data(site_map_info: dict, loader: LocalAssetLoad
     offset_z = config['offset_z'] * scale
 
     crop_bbox = config.get('crop_bbox')
-    if ENABLE_MAP_CROPPING and crop_bbox:
+    if enable_cropping and crop_bbox:
         bg_for_render_unscaled = site_image_original.crop((crop_bbox[0], crop_bbox[1], crop_bbox[0] + crop_bbox[2], crop_bbox[1] + crop_bbox[3]))
         draw_w = int(crop_bbox[2] * scale)
         draw_h = int(crop_bbox[3] * scale)
@@ -154,51 +249,72 @@ def _extract_single_harvest_map_data(site_map_info: dict, loader: LocalAssetLoad
         draw_w = int(site_image_original.width * scale)
         draw_h = int(site_image_original.height * scale)
 
-    # 定义坐标转换函数
-    def get_center_pos(x, z) -> tuple[int, int]:
-        if config['rev_xz']: x, z = z, x
-        px = x * grid_size * config['dir_x'] + mid_x + offset_x
-        pz = z * grid_size * config['dir_z'] + mid_z + offset_z
-        px = max(0, min(px, draw_w))
-        pz = max(0, min(pz, draw_h))
-        return int(px), int(pz)
-
-    point_img_size = int(160 * scale)
-    large_res_size = int(35 * scale)
-    small_res_size = int(17 * scale)
-    global_zoffset = -point_img_size * 0.2
+    final_bg = bg_for_render_unscaled.resize((draw_w, draw_h), Image.Resampling.LANCZOS)
+    bg = SiteMapBackground(site_id, final_bg, draw_w, draw_h, mid_x, mid_z, grid_size, offset_x, offset_z)
+    bg.spawn_point = get_site_map_pos(bg, 0, 0)
+    return bg
 
-    harvest_points = []
-    for item in site_map_info.get('userMysekaiSiteHarvestFixtures', []):
-        if not show_harvested and item.get('userMysekaiSiteHarvestFixtureStatus') != "spawned": continue
-        center_x, center_z = get_center_pos(item['positionX'], item['positionZ'])
-        meta = loader.md.mysekai_site_harvest_fixtures.find_by_id(item['mysekaiSiteHarvestFixtureId'])
-        img = loader.get(f"mysekai/harvest_fixture_icon/{meta['mysekaiSiteHarvestFixtureRarityType']}/{meta['assetbundleName']}.png") if meta else UNKNOWN_IMG
-        resized_img = img.resize((point_img_size, point_img_size), Image.Resampling.LANCZOS) if img.width > 1 else img
-        top_left_x = int(center_x - point_img_size * 0.5)
-        top_left_z = int(center_z - point_img_size * 0.6 + global_zoffset)
-        harvest_points.append(HarvestPoint(image=resized_img, x=top_left_x, y=top_left_z))
+def get_site_map_pos(bg: SiteMapBackground, x, z) -> Tuple[int, int]:
+    """游戏坐标 -> 地图画布像素坐标"""
+    config = SITE_MAP_CONFIGS[bg.site_id]
+    if config['rev_xz']: x, z = z, x
+    px = x * bg.grid_size * config['dir_x'] + bg.mid_x + bg.offset_x
+    pz = z * bg.grid_size * config['dir_z'] + bg.mid_z + bg.offset_z
+    px = max(0, min(px, bg.draw_width))
+    pz = max(0, min(pz, bg.draw_height))
+    return int(px), int(pz)
+
+def get_site_map_positions(bg: SiteMapBackground, xs, zs) -> List[Tuple[int, int]]:
+    """批量坐标转换，结果与逐个调用 get_site_map_pos 相同。"""
+    if np is None or not len(xs):
+        return [get_site_map_pos(bg, x, z) for x, z in zip(xs, zs)]
+    px, pz = _project_positions_np(bg, xs, zs)
+    return list(zip(px.tolist(), pz.tolist()))
+
+def _project_positions_np(bg: SiteMapBackground, xs, zs):
+    config = SITE_MAP_CONFIGS[bg.site_id]
+    x, z = np.asarray(xs, dtype=np.float64), np.asarray(zs, dtype=np.float64)
+    if config['rev_xz']: x, z = z, x
+    # 运算顺序与 get_site_map_pos 保持一致，保证浮点结果逐位相同
+    px = x * bg.grid_size * config['dir_x'] + bg.mid_x + bg.offset_x
+    pz = z * bg.grid_size * config['dir_z'] + bg.mid_z + bg.offset_z
+    px = np.maximum(0, np.minimum(px, bg.draw_width))
+    pz = np.maximum(0, np.minimum(pz, bg.draw_height))
+    return px.astype(np.int64), pz.astype(np.int64)
+
+def get_site_map_background(loader: LocalAssetLoader, site_id: int) -> SiteMapBackground:
+    """
+    获取裁剪、缩放后的场景底图及其坐标参数。
+    结果只取决于 SITE_MAP_CONFIGS、缩放比例与裁剪开关，缓存在 loader 上，资源更新后失效。
+    返回的底图为共享对象，请勿原地修改。
+    """
+    scale, enable_cropping = MYSEKAI_HARVEST_MAP_IMAGE_SCALE, ENABLE_MAP_CROPPING
+    return loader.get_derived(
+        ("site_map_bg", site_id, scale, enable_cropping),
+        lambda: _build_site_map_background(loader, site_id, scale, enable_cropping),
+    )
 
+def _layout_drops_py(bg: SiteMapBackground, registry: ResourceRegistry, drops: List[dict], large_res_size: int, small_res_size: int, global_zoffset: float) -> List[_PlacedDrop]:
+    """按像素格聚合掉落物并计算图标位置与绘制顺序 (纯 Python 实现)"""
     all_res_aggregated = {}
-    for item in site_map_info.get('userMysekaiSiteHarvestResourceDrops', []):
-        if not show_harvested and item['mysekaiSiteHarvestResourceDropStatus'] != "before_drop": continue
-        center_x, center_z = get_center_pos(item['positionX'], item['positionZ'])
-        pkey = f"{center_x}_{center_z}"; res_key = f"{item['resourceType']}_{item['resourceId']}"
+    for item in drops:
+        center_x, center_z = get_site_map_pos(bg, item['positionX'], item['positionZ'])
+        pkey = f"{center_x}_{center_z}"; res = registry.get(item['resourceType'], item['resourceId']); res_key = res.key
         if pkey not in all_res_aggregated: all_res_aggregated[pkey] = {}
-        if res_key not in all_res_aggregated[pkey]: all_res_aggregated[pkey][res_key] = {'quantity': 0, 'center_x': center_x, 'center_z': center_z, 'key': res_key}
+        if res_key not in all_res_aggregated[pkey]: all_res_aggregated[pkey][res_key] = {'quantity': 0, 'center_x': center_x, 'center_z': center_z, 'key': res_key, 'resource': res}
         all_res_aggregated[pkey][res_key]['quantity'] += item['quantity']
 
-    dropped_resources = []
+    placed = []
     for pkey, res_group in all_res_aggregated.items():
         pres = sorted(list(res_group.values()), key=lambda x: (-x['quantity'], x['key']))
-        is_cotton = any(item['key'] in ['mysekai_material_21', 'mysekai_material_22'] for item in pres)
+        is_cotton = any(item['key'] in COTTON_MYSEKAI_RES for item in pres)
         has_mat = any(item['key'].startswith("mysekai_material") for item in pres)
         small_total, large_total, processed_pres = 0, 0, []
         for item in pres:
             is_small = False
             if ('mysekai_material_1' in item['key'] or 'mysekai_material_6' in item['key']) and item['quantity'] == 6: continue
             if not item['key'].startswith("mysekai_material") and has_mat: is_small = True
-            if is_cotton and item['key'] not in ['mysekai_material_21', 'mysekai_material_22']: is_small = True
+            if is_cotton and item['key'] not in COTTON_MYSEKAI_RES: is_small = True
             if is_small: small_total += 1
             else: large_total += 1
             processed_pres.append((item, is_small))
@@ -218,17 +334,128 @@ def _extract_single_harvest_map_data(site_map_info: dict, loader: LocalAssetLoad
                 top_left_z = int(center_z - 0.5 * large_res_size + global_zoffset)
                 large_idx += 1
             if top_left_z <= 0: top_left_z += int(0.5 * large_res_size)
-            outline, light_size = None, None
-            if res_key in MOST_RARE_MYSEKAI_RES:
-                outline = ((255, 50, 50, 150), 2); light_size = int(int(45 * scale) * (3 if is_small else 6))
-            elif is_small: outline = ((50, 50, 255, 100), 1)
             draw_order = item['center_z'] * 1000 + item['center_x']
             if is_small: draw_order += 1000000
-            elif res_key in MOST_RARE_MYSEKAI_RES: draw_order += 100000
-            dropped_resources.append(DroppedResource(image=_get_resource_icon(loader, res_key), quantity=item['quantity'], x=top_left_x, z=top_left_z, size=int(size), draw_order=draw_order, is_small_icon=is_small, outline=outline, light_size=light_size))
+            elif item['resource'].is_most_rare: draw_order += 100000
+            placed.append(_PlacedDrop(item['resource'], item['quantity'], top_left_x, top_left_z, size, draw_order, is_small))
+
+    placed.sort(key=lambda r: r.draw_order)
+    return placed
+
+def _layout_drops_np(bg: SiteMapBackground, registry: ResourceRegistry, drops: List[dict], large_res_size: int, small_res_size: int, global_zoffset: float) -> List[_PlacedDrop]:
+    """
+    _layout_drops_py 的向量化版本，输出完全相同：
+    坐标一次性转换，按整数格子键分组聚合，组内排序、大小图标序号与绘制顺序均批量计算。
+    """
+    if not drops: return []
+    n = len(drops)
+    cx, cz = _project_positions_np(bg, [d['positionX'] for d in drops], [d['positionZ'] for d in drops])
+    qty = np.fromiter((d['quantity'] for d in drops), dtype=np.int64, count=n)
+    key_ids = {}
+    drop_key = np.fromiter((key_ids.setdefault((d['resourceType'], d['resourceId']), len(key_ids)) for d in drops), dtype=np.int64, count=n)
+
+    # 每种资源的属性只按资源种类计算一次
+    resources = [registry.get(res_type, res_id) for res_type, res_id in key_ids]
+    keys = [res.key for res in resources]
+    n_keys = len(keys)
+    key_rank = np.empty(n_keys, dtype=np.int64)
+    key_rank[sorted(range(n_keys), key=keys.__getitem__)] = np.arange(n_keys)
+    is_mat = np.array([k.startswith("mysekai_material") for k in keys])
+    is_cotton_key = np.array([k in COTTON_MYSEKAI_RES for k in keys])
+    skippable = np.array([('mysekai_material_1' in k or 'mysekai_material_6' in k) for k in keys])
+    most_rare = np.array([res.is_most_rare for res in resources])
+    enlarged = np.array([k == "mysekai_material_24" or k.startswith("mysekai_music_record") for k in keys])
+
+    # 按像素格分组，格子按首次出现的顺序排列 (与 dict 插入顺序一致)
+    cell_code = (cx << 20) | cz
+    cells, cell_first, cell_of_drop = np.unique(cell_code, return_index=True, return_inverse=True)
+    cell_rank = np.empty(len(cells), dtype=np.int64)
+    cell_rank[np.argsort(cell_first, kind="stable")] = np.arange(len(cells))
+
+    # 同一格子内同种资源合并数量
+    pairs, pair_of_drop = np.unique(cell_of_drop.reshape(-1) * n_keys + drop_key, return_inverse=True)
+    pair_qty = np.zeros(len(pairs), dtype=np.int64)
+    np.add.at(pair_qty, pair_of_drop.reshape(-1), qty)
+    pair_cell, pair_key = pairs // n_keys, pairs % n_keys
+
+    # 格子内按 (-数量, key) 排序
+    order = np.lexsort((key_rank[pair_key], -pair_qty, cell_rank[pair_cell]))
+    pair_cell, pair_key, pair_qty = pair_cell[order], pair_key[order], pair_qty[order]
+
+    # 棉花 / 材料判定基于跳过之前的全部条目
+    has_mat = np.bincount(pair_cell, weights=is_mat[pair_key].astype(np.float64), minlength=len(cells)) > 0
+    is_cotton = np.bincount(pair_cell, weights=is_cotton_key[pair_key].astype(np.float64), minlength=len(cells)) > 0
+    keep = ~(skippable[pair_key] & (pair_qty == 6))
+    pair_cell, pair_key, pair_qty = pair_cell[keep], pair_key[keep], pair_qty[keep]
+    if not len(pair_cell): return []
+
+    is_small = (~is_mat[pair_key] & has_mat[pair_cell]) | (is_cotton[pair_cell] & ~is_cotton_key[pair_key])
+    small_flags, large_flags = is_small.astype(np.int64), (~is_small).astype(np.int64)
+    large_total = np.bincount(pair_cell, weights=large_flags, minlength=len(cells)).astype(np.int64)[pair_cell]
+
+    # 行已按格子连续排列，组内序号 = 组内的排他前缀和
+    group_start = np.concatenate(([True], pair_cell[1:] != pair_cell[:-1]))
+    group_id = np.cumsum(group_start) - 1
+    def _index_within_group(flags):
+        exclusive = np.cumsum(flags) - flags
+        return exclusive - exclusive[group_start][group_id]
+    small_idx, large_idx = _index_within_group(small_flags), _index_within_group(large_flags)
+
+    center_x, center_z = cells[pair_cell] >> 20, cells[pair_cell] & 0xFFFFF
+    size = np.where(is_small, small_res_size, large_res_size).astype(np.float64)
+    size = np.where(~is_small & enlarged[pair_key], size * 1.5, size)
+    top_left_x = np.where(
+        is_small,
+        center_x + 0.5 * large_res_size * large_total - 0.6 * size,
+        center_x - 0.5 * large_res_size * large_total + large_res_size * large_idx,
+    ).astype(np.int64)
+    top_left_z = np.where(
+        is_small,
+        center_z - 0.45 * large_res_size + 1.0 * size * small_idx + global_zoffset,
+        center_z - 0.5 * large_res_size + global_zoffset,
+    ).astype(np.int64)
+    top_left_z = np.where(top_left_z <= 0, top_left_z + int(0.5 * large_res_size), top_left_z)
+    draw_order = center_z * 1000 + center_x + np.where(is_small, 1000000, np.where(most_rare[pair_key], 100000, 0))
+
+    placed = []
+    for i in np.argsort(draw_order, kind="stable").tolist():
+        placed.append(_PlacedDrop(resources[pair_key[i]], int(pair_qty[i]), int(top_left_x[i]), int(top_left_z[i]), float(size[i]), int(draw_order[i]), bool(is_small[i])))
+    return placed
+
+def _extract_single_harvest_map_data(site_map_info: dict, loader: LocalAssetLoader, show_harvested: bool) -> HarvestMapDrawData:
+    site_id = site_map_info['mysekaiSiteId']
+
+    bg = get_site_map_background(loader, site_id)
+
+    point_img_size, large_res_size, small_res_size = get_map_icon_sizes()
+    global_zoffset = -point_img_size * 0.2
+
+    fixtures = [
+        item for item in site_map_info.get('userMysekaiSiteHarvestFixtures', [])
+        if show_harvested or item.get('userMysekaiSiteHarvestFixtureStatus') == "spawned"
+    ]
+    fixture_centers = get_site_map_positions(bg, [item['positionX'] for item in fixtures], [item['positionZ'] for item in fixtures])
+    harvest_points = []
+    for item, (center_x, center_z) in zip(fixtures, fixture_centers):
+        meta = loader.md.mysekai_site_harvest_fixtures.find_by_id(item['mysekaiSiteHarvestFixtureId'])
+        resized_img = loader.sprite(get_harvest_fixture_icon_path(meta), (point_img_size, point_img_size)) if meta else UNKNOWN_IMG
+        top_left_x = int(center_x - point_img_size * 0.5)
+        top_left_z = int(center_z - point_img_size * 0.6 + global_zoffset)
+        harvest_points.append(HarvestPoint(image=resized_img, x=top_left_x, y=top_left_z))
+
+    drops = [
+        item for item in site_map_info.get('userMysekaiSiteHarvestResourceDrops', [])
+        if show_harvested or item['mysekaiSiteHarvestResourceDropStatus'] == "before_drop"
+    ]
+    layout_drops = _layout_drops_np if np is not None else _layout_drops_py
+    dropped_resources = []
+    for drop in layout_drops(bg, get_resource_registry(loader), drops, large_res_size, small_res_size, global_zoffset):
+        outline, light_size = None, None
+        if drop.resource.is_most_rare:
+            outline = ((255, 50, 50, 150), 2); light_size = get_light_size(drop.is_small)
+        elif drop.is_small: outline = ((50, 50, 255, 100), 1)
+        icon, icon_path = _get_resource_icon(loader, drop.resource)
+        dropped_resources.append(DroppedResource(image=icon, quantity=drop.quantity, x=drop.x, z=drop.z, size=int(drop.size), draw_order=drop.draw_order, is_small_icon=drop.is_small, outline=outline, light_size=light_size, image_path=icon_path))
 
     harvest_points.sort(key=lambda p: (p.y, p.x))
-    dropped_resources.sort(key=lambda r: r.draw_order)
-    spawn_point_center = get_center_pos(0, 0)
-    final_bg = bg_for_render_unscaled.resize((draw_w, draw_h), Image.Resampling.LANCZOS)
-    return HarvestMapDrawData(site_id, final_bg, draw_w, draw_h, spawn_point=spawn_point_center, harvest_points=harvest_points, dropped_resources=dropped_resources)
\ No newline at end of file
+    return HarvestMapDrawData(site_id, bg.image, bg.draw_width, bg.draw_height, spawn_point=bg.spawn_point, harvest_points=harvest_points, dropped_resources=dropped_resources)
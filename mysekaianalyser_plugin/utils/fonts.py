@@ -0,0 +1,78 @@
+import os
+import threading
+from typing import Dict, Iterator, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+Color = Tuple[int, int, int, int]
+
+
+class GlyphSprite:
+    """预渲染的单个字形：带透明度的 RGBA 图像、相对文字原点的偏移和步进宽度。"""
+    __slots__ = ("image", "offset_x", "offset_y", "advance")
+
+    def __init__(self, image: Image.Image, offset_x: int, offset_y: int, advance: float):
+        self.image = image
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.advance = advance
+
+
+class FontRegistry:
+    """
+    按 (字体, 字号) 懒加载的字体注册表，线程安全。
+    还可按 (字体, 字号, 颜色) 预渲染字形，把数量标签绘制变成贴图。
+    """
+    def __init__(self, faces: Dict[str, str]):
+        self._faces = {name: str(path) for name, path in faces.items()}
+        self._fonts: Dict[Tuple[str, int], ImageFont.FreeTypeFont] = {}
+        self._glyphs: Dict[Tuple[str, int, Color, str], GlyphSprite] = {}
+        self._lock = threading.Lock()
+
+    def missing_faces(self):
+        return [path for path in self._faces.values() if not os.path.exists(path)]
+
+    def get(self, face: str, size: int) -> ImageFont.FreeTypeFont:
+        key = (face, size)
+        font = self._fonts.get(key)
+        if font is not None: return font
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is None:
+                font = ImageFont.truetype(self._faces[face], size)
+                self._fonts[key] = font
+        return font
+
+    def glyph(self, char: str, face: str, size: int, color: Color) -> GlyphSprite:
+        key = (face, size, color, char)
+        glyph = self._glyphs.get(key)
+        if glyph is not None: return glyph
+
+        font = self.get(face, size)
+        left, top, right, bottom = font.getbbox(char)
+        w, h = max(right - left, 1), max(bottom - top, 1)
+        mask = Image.new("L", (w, h), 0)
+        ImageDraw.Draw(mask).text((-left, -top), char, font=font, fill=255)
+        alpha = mask if color[3] == 255 else mask.point(lambda v: v * color[3] // 255)
+        image = Image.new("RGBA", (w, h), color[:3] + (0,))
+        image.putalpha(alpha)
+        glyph = GlyphSprite(image, left, top, font.getlength(char))
+        with self._lock:
+            self._glyphs.setdefault(key, glyph)
+        return glyph
+
+    def preload_glyphs(self, chars: str, face: str, size: int, color: Color):
+        for char in chars:
+            self.glyph(char, face, size, color)
+
+    def text_sprites(self, pos: Tuple[int, int], text: str, face: str, size: int, color: Color) -> Iterator[Tuple[Image.Image, int, int]]:
+        """
+        逐个返回 (字形 RGBA 图像, x, y)，供合成器批量绘制。
+        锚点为左上/ascender (等价于 draw.text 的默认锚点)，仅适合数字等无需字距调整的短文本。
+        """
+        x, y = pos
+        cursor = 0.0
+        for char in text:
+            glyph = self.glyph(char, face, size, color)
+            yield glyph.image, int(x + cursor) + glyph.offset_x, y + glyph.offset_y
+            cursor += glyph.advance
@@ -0,0 +1,228 @@
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from .extractor import MOST_RARE_MYSEKAI_RES, RARE_MYSEKAI_RES, get_current_phenomenon_index
+
+RARITY_NORMAL, RARITY_RARE, RARITY_MOST_RARE = 0, 1, 2
+# 资源每天 4:00 / 16:00 刷新，按这个边界划分 "天" 和刷新时段
+DAY_START_HOUR = 4
+DAY_MS = 24 * 3600 * 1000
+SLOT_MS = DAY_MS // 2
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    user_id TEXT NOT NULL,
+    upload_time INTEGER NOT NULL,
+    gate_id INTEGER NOT NULL,
+    gate_level INTEGER NOT NULL,
+    phenomena_ids TEXT NOT NULL,
+    current_phenomenon_id INTEGER,
+    recorded_at INTEGER NOT NULL,
+    PRIMARY KEY (user_id, upload_time)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS resource_counts (
+    user_id TEXT NOT NULL,
+    upload_time INTEGER NOT NULL,
+    site_id INTEGER NOT NULL,
+    resource_key TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    rarity INTEGER NOT NULL,
+    PRIMARY KEY (user_id, upload_time, site_id, resource_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_resource_counts_key ON resource_counts (user_id, resource_key, upload_time);
+CREATE INDEX IF NOT EXISTS idx_resource_counts_site ON resource_counts (user_id, site_id, upload_time);
+CREATE INDEX IF NOT EXISTS idx_resource_counts_rare ON resource_counts (user_id, rarity, upload_time) WHERE rarity > 0;
+"""
+
+
+@dataclass
+class HistoryEntry: upload_time: int; gate_id: int; gate_level: int; phenomena_ids: List[int]; current_phenomenon_id: Optional[int]; resources: List[Tuple[int, str, int, int]]
+@dataclass
+class LastDrop: upload_time: int; sites: List[Tuple[int, int]]
+@dataclass
+class DailyYield: total: int; days: int; average: float
+
+
+def get_rarity(key: str) -> int:
+    if key in MOST_RARE_MYSEKAI_RES: return RARITY_MOST_RARE
+    if key in RARE_MYSEKAI_RES: return RARITY_RARE
+    return RARITY_NORMAL
+
+
+def build_history_entry(mysekai_data: dict) -> HistoryEntry:
+    """
+    从解析后的数据中取出需要保存的部分：各场景的资源数量 (包括已采集的)、门等级与天气。
+    resources 为 [(场景ID, 资源 key, 数量, 稀有度)]。
+    """
+    updated = mysekai_data['updatedResources']
+    upload_time = updated['now']
+    counts: Dict[Tuple[int, str], int] = {}
+    for site_map in updated.get('userMysekaiHarvestMaps', []):
+        site_id = site_map.get('mysekaiSiteId')
+        for res_drop in site_map.get('userMysekaiSiteHarvestResourceDrops', []):
+            key = (site_id, f"{res_drop['resourceType']}_{res_drop['resourceId']}")
+            counts[key] = counts.get(key, 0) + res_drop['quantity']
+    user_gate = mysekai_data.get('userMysekaiGateCharacterVisit', {}).get('userMysekaiGate', {})
+    phenomena_ids = [item['mysekaiPhenomenaId'] for item in mysekai_data.get('mysekaiPhenomenaSchedules', [])]
+    phenom_idx = get_current_phenomenon_index(datetime.fromtimestamp(upload_time / 1000))
+    return HistoryEntry(
+        upload_time, user_gate.get('mysekaiGateId', 1), user_gate.get('mysekaiGateLevel', 1), phenomena_ids,
+        phenomena_ids[phenom_idx] if phenom_idx < len(phenomena_ids) else None,
+        [(site_id, key, quantity, get_rarity(key)) for (site_id, key), quantity in counts.items()],
+    )
+
+
+def _day_shift_ms() -> int:
+    """把 UTC 毫秒时间戳平移到以本地 DAY_START_HOUR 为一天起点的偏移量"""
+    offset = datetime.now().astimezone().utcoffset()
+    return int(offset.total_seconds() * 1000) - DAY_START_HOUR * 3600 * 1000
+
+
+class HistoryStore:
+    """
+    采集记录库 (SQLite)。按 (用户, updatedResources.now) 保存每次上传的各场景资源数量、门等级与天气，
+    资源数量表按用户 + 资源 key / 场景 / 稀有度建索引。
+    record() 只把数据放进队列立即返回，由后台线程整理并批量写入 (同一事务)，不增加回复延迟；
+    查询在调用方线程中使用各自的只读连接。
+    """
+    def __init__(self, db_path, batch_size: int = 64):
+        self.db_path = Path(db_path)
+        self.batch_size = batch_size
+        self.written = 0
+        self.failed = 0
+        self._queue: "queue.Queue[Optional[Tuple[str, Union[dict, HistoryEntry]]]]" = queue.Queue()
+        self._local = threading.local()
+        self._thread: Optional[threading.Thread] = None
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # --- 写入 ---
+    def start(self):
+        if self._thread is not None: return
+        self._thread = threading.Thread(target=self._run, name="msa-history-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        """写完队列中剩余的数据后停止后台线程"""
+        if self._thread is None: return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def record(self, user_id: str, mysekai_data: dict):
+        """登记一次上传 (非阻塞)。同一用户同一时间戳的重复上传只保存一次。"""
+        if self._thread is None: self.start()
+        self._queue.put((user_id, mysekai_data))
+
+    def record_entry(self, user_id: str, entry: HistoryEntry):
+        """登记已由 build_history_entry 整理好的上传 (批量解析在子进程中整理，只传回这部分数据)。"""
+        if self._thread is None: self.start()
+        self._queue.put((user_id, entry))
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self):
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None: break
+            batch = [item]
+            # 把已经排队的数据一起写入，负载高时自然形成批量
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._write(conn, batch)
+                self.written += len(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                print(f"[History] 写入 {len(batch)} 条记录失败: {e}")
+        conn.close()
+
+    def _write(self, conn: sqlite3.Connection, batch: List[Tuple[str, Union[dict, HistoryEntry]]]):
+        recorded_at = int(time.time() * 1000)
+        with conn:
+            for user_id, item in batch:
+                entry = item if isinstance(item, HistoryEntry) else build_history_entry(item)
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO uploads VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (user_id, entry.upload_time, entry.gate_id, entry.gate_level,
+                     ",".join(map(str, entry.phenomena_ids)), entry.current_phenomenon_id, recorded_at),
+                )
+                if cursor.rowcount == 0: continue
+                conn.executemany(
+                    "INSERT OR REPLACE INTO resource_counts VALUES (?, ?, ?, ?, ?, ?)",
+                    [(user_id, entry.upload_time, site_id, key, quantity, rarity) for site_id, key, quantity, rarity in entry.resources],
+                )
+
+    # --- 查询 ---
+    def last_drop(self, user_id: str, resource_key: str) -> Optional[LastDrop]:
+        """最近一次出现该资源的上传及其在各场景的数量"""
+        conn = self._reader()
+        row = conn.execute(
+            "SELECT upload_time FROM resource_counts WHERE user_id = ? AND resource_key = ? ORDER BY upload_time DESC LIMIT 1",
+            (user_id, resource_key),
+        ).fetchone()
+        if row is None: return None
+        sites = conn.execute(
+            "SELECT site_id, quantity FROM resource_counts WHERE user_id = ? AND upload_time = ? AND resource_key = ? ORDER BY site_id",
+            (user_id, row[0], resource_key),
+        ).fetchall()
+        return LastDrop(row[0], [tuple(site) for site in sites])
+
+    def average_daily_yield(self, user_id: str, resource_key: str, days: int, now_ms: Optional[int] = None) -> DailyYield:
+        """
+        最近 days 天内该资源的日均产量。
+        同一刷新时段 (半天) 内的多次上传看到的是同一批资源，只取数量最多的一次；
+        平均值按有上传记录的天数计算 (当天没有出现该资源记为 0)。
+        """
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        since, shift = now_ms - days * DAY_MS, _day_shift_ms()
+        conn = self._reader()
+        total = conn.execute(
+            """
+            WITH per_upload AS (
+                SELECT upload_time, SUM(quantity) AS quantity FROM resource_counts
+                WHERE user_id = ? AND resource_key = ? AND upload_time >= ? GROUP BY upload_time
+            ), per_slot AS (
+                SELECT (upload_time + ?) / ? AS slot, MAX(quantity) AS quantity FROM per_upload GROUP BY slot
+            )
+            SELECT COALESCE(SUM(quantity), 0) FROM per_slot
+            """,
+            (user_id, resource_key, since, shift, SLOT_MS),
+        ).fetchone()[0]
+        active_days = conn.execute(
+            "SELECT COUNT(DISTINCT (upload_time + ?) / ?) FROM uploads WHERE user_id = ? AND upload_time >= ?",
+            (shift, DAY_MS, user_id, since),
+        ).fetchone()[0]
+        return DailyYield(total, active_days, total / active_days if active_days else 0.0)
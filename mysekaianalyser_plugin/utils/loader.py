@@ -1,12 +1,84 @@
 import json
 import os
+import threading
+from collections import OrderedDict
 from PIL import Image
-from typing import Dict, Any, List, Optional
+
+from .md_index import MasterDataIndex
+from .atlas import AssetAtlas, NAMESPACE_ASSETS, NAMESPACE_STATIC
+from typing import Dict, Any, Callable, List, Optional, Tuple
 
 UNKNOWN_IMG = Image.new("RGBA", (1, 1), (0, 0, 0, 0))
 
+DEFAULT_IMAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_SPRITE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _image_nbytes(image: Image.Image) -> int:
+    """解码后图像占用的字节数估算 (宽 x 高 x 通道数)。"""
+    return image.width * image.height * len(image.getbands())
+
+
+class LRUImageCache:
+    """
+    按解码后字节数限制容量的线程安全 LRU 图像缓存。
+    """
+    def __init__(self, max_bytes: int = DEFAULT_IMAGE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[Any, Tuple[Image.Image, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key) -> Optional[Image.Image]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, image: Image.Image):
+        size = _image_nbytes(image)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None: self.current_bytes -= old[1]
+            # 单张超过上限的图像不缓存，避免把整个缓存冲掉
+            if size > self.max_bytes: return
+            self._items[key] = (image, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._items:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._items), "bytes": self.current_bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+            }
+
+
 class LocalAssetLoader:
-    def __init__(self, resource_path: str, region: str = 'jp'):
+    def __init__(self, resource_path: str, region: str = 'jp', cache_max_bytes: int = DEFAULT_IMAGE_CACHE_MAX_BYTES,
+                 sprite_cache_max_bytes: int = DEFAULT_SPRITE_CACHE_MAX_BYTES, use_atlas: bool = False):
         self.resource_path = resource_path
         self.asset_path = os.path.join(resource_path, 'assets', region)
         self.static_path = os.path.join(resource_path, 'static_images')
@@ -16,49 +88,160 @@ class LocalAssetLoader:
 
         self.metadata_path = os.path.join(resource_path, 'metadata', region)
         self.region = region
-        self._image_cache: Dict[str, Image.Image] = {}
+        self._image_cache = LRUImageCache(cache_max_bytes)
+        self._sprite_cache = LRUImageCache(sprite_cache_max_bytes)
+        self._derived: Dict[Any, Any] = {}
+        self._derived_locks: Dict[Any, threading.Lock] = {}
+        self._derived_lock = threading.Lock()
+        self.use_atlas = use_atlas
+        self._atlas: Optional[AssetAtlas] = None
+        self._atlas_loaded = False
 
         self.md = self.MasterDataLocal(self)
         self.rip = self
         self.static_imgs = self
 
-    def get(self, path: str, **kwargs) -> Image.Image:
-        path_no_rip = path.replace("_rip", "")
-        if path_no_rip in self._image_cache: return self._image_cache[path_no_rip].copy()
+    @property
+    def atlas(self) -> Optional[AssetAtlas]:
+        """启用图集存储且图集已构建时返回图集，否则为 None"""
+        if not self.use_atlas: return None
+        if not self._atlas_loaded:
+            with self._derived_lock:
+                if not self._atlas_loaded:
+                    self._atlas = AssetAtlas.open(self.resource_path, self.region)
+                    self._atlas_loaded = True
+        return self._atlas
 
-        file_path_static = os.path.join(self.static_path, path_no_rip)
+    def _open_cached(self, path_no_rip: str, namespace: str) -> Optional[Image.Image]:
+        """读取并缓存图像 (优先从图集读取)，文件不存在时返回 None，其余错误返回 UNKNOWN_IMG。"""
         try:
-            image = Image.open(file_path_static).convert("RGBA")
-            self._image_cache[path_no_rip] = image
-            return image.copy()
+            atlas = self.atlas
+            image = atlas.load(namespace, path_no_rip) if atlas is not None else None
+            if image is None:
+                base_path = self.static_path if namespace == NAMESPACE_STATIC else self.asset_path
+                image = Image.open(os.path.join(base_path, path_no_rip)).convert("RGBA")
         except FileNotFoundError:
-            return self.img(path_no_rip, **kwargs)
+            return None
         except Exception:
             return UNKNOWN_IMG
+        self._image_cache.put(path_no_rip, image)
+        return image
+
+    def get(self, path: str, **kwargs) -> Image.Image:
+        path_no_rip = path.replace("_rip", "")
+        cached = self._image_cache.get(path_no_rip)
+        if cached is not None: return cached.copy()
+
+        # 已确认不在缓存中，直接按 static -> assets 顺序读取，避免经 img() 再查一次缓存重复计入 miss
+        image = self._open_cached(path_no_rip, NAMESPACE_STATIC)
+        if image is None: image = self._open_cached(path_no_rip, NAMESPACE_ASSETS)
+        if image is None or image is UNKNOWN_IMG: return UNKNOWN_IMG
+        return image.copy()
 
     def img(self, path: str, **kwargs) -> Image.Image:
         path_no_rip = path.replace("_rip", "")
-        if path_no_rip in self._image_cache: return self._image_cache[path_no_rip].copy()
+        cached = self._image_cache.get(path_no_rip)
+        if cached is not None: return cached.copy()
 
-        file_path = os.path.join(self.asset_path, path_no_rip)
-        try:
-            image = Image.open(file_path).convert("RGBA")
-            self._image_cache[path_no_rip] = image
-            return image.copy()
-        except FileNotFoundError:
-            return UNKNOWN_IMG
-        except Exception:
-            return UNKNOWN_IMG
+        image = self._open_cached(path_no_rip, NAMESPACE_ASSETS)
+        if image is None or image is UNKNOWN_IMG: return UNKNOWN_IMG
+        return image.copy()
+
+    def peek(self, path: str) -> Image.Image:
+        """与 get() 相同的查找顺序，但直接返回缓存中的共享对象而不复制，只能读取。"""
+        path_no_rip = path.replace("_rip", "")
+        cached = self._image_cache.get(path_no_rip)
+        if cached is not None: return cached
+        image = self._open_cached(path_no_rip, NAMESPACE_STATIC)
+        if image is None: image = self._open_cached(path_no_rip, NAMESPACE_ASSETS)
+        return image if image is not None else UNKNOWN_IMG
+
+    def sprite(self, path: str, size: Tuple[int, int], resample: int = Image.Resampling.LANCZOS) -> Image.Image:
+        """
+        获取按 (路径, 尺寸, 重采样方式) 缓存的缩放后 RGBA 图像。
+        返回的是缓存中的共享对象，只能读取 (paste/composite)，请勿原地修改。
+        """
+        path_no_rip = path.replace("_rip", "")
+        key = (path_no_rip, tuple(size), int(resample))
+        cached = self._sprite_cache.get(key)
+        if cached is not None: return cached
+
+        base = self.peek(path_no_rip)
+        if base.width <= 1: return UNKNOWN_IMG
+        resized = base.resize(tuple(size), resample)
+        self._sprite_cache.put(key, resized)
+        return resized
+
+    def get_derived(self, key, factory: Callable[[], Any]) -> Any:
+        """
+        由资源派生出的对象缓存 (例如裁剪缩放后的地图底图)，每个 key 只计算一次。
+        随 clear_caches() 一起失效。
+        """
+        derived = self._derived
+        if key in derived: return derived[key]
+        with self._derived_lock:
+            derived = self._derived
+            key_lock = self._derived_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key in derived: return derived[key]
+            value = factory()
+            with self._derived_lock:
+                # 计算期间 clear_caches() 已换上新字典时，结果基于旧资源，只返回不缓存
+                if self._derived is derived: derived[key] = value
+            return value
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self._image_cache.stats()
+
+    def sprite_cache_stats(self) -> Dict[str, int]:
+        return self._sprite_cache.stats()
+
+    def clear_caches(self):
+        """清空图像缓存与已加载的元数据表，资源更新后调用。"""
+        self._image_cache.clear()
+        self._sprite_cache.clear()
+        with self._derived_lock:
+            self._derived = {}
+            self._derived_locks = {}
+            if self._atlas is not None: self._atlas.close()
+            self._atlas = None
+            self._atlas_loaded = False
+        self.md.clear()
 
     class MasterDataLocal:
         def __init__(self, loader: 'LocalAssetLoader'):
             self._loader = loader
             self._tables: Dict[str, 'LocalAssetLoader.MasterDataTable'] = {}
+            self._lock = threading.Lock()
+            self._index: Optional[MasterDataIndex] = None
+            self._index_loaded = False
+
+        @property
+        def index(self) -> Optional[MasterDataIndex]:
+            """update_resources 编译的二进制索引，不存在时为 None"""
+            if not self._index_loaded:
+                with self._lock:
+                    if not self._index_loaded:
+                        self._index = MasterDataIndex.load(self._loader.metadata_path)
+                        self._index_loaded = True
+            return self._index
 
         def __getattr__(self, name: str) -> 'LocalAssetLoader.MasterDataTable':
-            if name not in self._tables:
-                self._tables[name] = LocalAssetLoader.MasterDataTable(self._loader, name)
-            return self._tables[name]
+            if name.startswith('_'): raise AttributeError(name)
+            table = self._tables.get(name)
+            if table is None:
+                with self._lock:
+                    table = self._tables.get(name)
+                    if table is None:
+                        table = LocalAssetLoader.MasterDataTable(self._loader, name)
+                        self._tables[name] = table
+            return table
+
+        def clear(self):
+            with self._lock:
+                self._tables = {}
+                self._index = None
+                self._index_loaded = False
 
     class MasterDataTable:
         def __init__(self, loader: 'LocalAssetLoader', table_name: str):
@@ -66,12 +249,17 @@ class LocalAssetLoader:
             self._table_name = table_name
             self._data: Optional[List[Dict[str, Any]]] = None
             self._index_by_id: Optional[Dict[int, Any]] = None
+            self._lock = threading.Lock()
 
         def _load_data(self) -> List[Dict[str, Any]]:
             if self._data is not None: return self._data
+            with self._lock:
+                return self._load_data_locked()
 
-            parts = self._table_name.split('_')
-            camel_case_name = parts[0] + ''.join(p.capitalize() for p in parts[1:])
+        def _load_data_locked(self) -> List[Dict[str, Any]]:
+            if self._data is not None: return self._data
+
+            camel_case_name = self._camel_case_name()
 
             file_path = os.path.join(self._loader.resource_path, 'metadata', self._loader.region, f"{camel_case_name}.json")
 
@@ -90,13 +278,57 @@ class LocalAssetLoader:
 
         def _build_index_by_id(self):
             if self._index_by_id is not None: return
-            self._index_by_id = {}
             data = self._load_data()
-            if not isinstance(data, list): return
-            for item in data:
-                if isinstance(item, dict) and 'id' in item:
-                    self._index_by_id[item['id']] = item
+            index = {}
+            if isinstance(data, list):
+                for item in data:
+                    if isinstance(item, dict) and 'id' in item:
+                        index[item['id']] = item
+            # 构建完成后再整体赋值，其他线程不会看到半成品索引
+            self._index_by_id = index
+
+        def _camel_case_name(self) -> str:
+            parts = self._table_name.split('_')
+            return parts[0] + ''.join(p.capitalize() for p in parts[1:])
 
         def find_by_id(self, record_id: int) -> Optional[Dict[str, Any]]:
+            index = self._loader.md.index
+            if index is not None and index.has_table(self._camel_case_name()):
+                return index.find_by_id(self._camel_case_name(), record_id)
             self._build_index_by_id()
-            return self._index_by_id.get(record_id)
\ No newline at end of file
+            return self._index_by_id.get(record_id)
+
+        def ids(self) -> List[int]:
+            """表中全部记录的 id"""
+            index = self._loader.md.index
+            if index is not None and index.has_table(self._camel_case_name()):
+                return index.ids(self._camel_case_name())
+            self._build_index_by_id()
+            return list(self._index_by_id)
+
+
+_shared_loaders: Dict[Tuple[str, str], LocalAssetLoader] = {}
+_shared_loaders_lock = threading.Lock()
+
+def get_shared_loader(resource_path, region: str = 'jp', cache_max_bytes: int = DEFAULT_IMAGE_CACHE_MAX_BYTES,
+                      sprite_cache_max_bytes: int = DEFAULT_SPRITE_CACHE_MAX_BYTES, use_atlas: bool = False) -> LocalAssetLoader:
+    """
+    获取进程内按 (资源路径, 区服) 共享的 LocalAssetLoader，供所有任务与线程复用。
+    """
+    key = (str(resource_path), region)
+    loader = _shared_loaders.get(key)
+    if loader is not None: return loader
+    with _shared_loaders_lock:
+        loader = _shared_loaders.get(key)
+        if loader is None:
+            loader = LocalAssetLoader(resource_path=str(resource_path), region=region, cache_max_bytes=cache_max_bytes,
+                                      sprite_cache_max_bytes=sprite_cache_max_bytes, use_atlas=use_atlas)
+            _shared_loaders[key] = loader
+    return loader
+
+def clear_shared_loaders():
+    """清空所有共享 loader 的缓存 (资源更新后调用)。"""
+    with _shared_loaders_lock:
+        loaders = list(_shared_loaders.values())
+    for loader in loaders:
+        loader.clear_caches()
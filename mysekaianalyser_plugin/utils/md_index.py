@@ -0,0 +1,91 @@
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import msgpack
+import orjson
+
+INDEX_FILENAME = "masterdata_index.msgpack"
+INDEX_VERSION = 1
+
+# 编译进索引的表及分析器实际读取的字段，其余字段丢弃
+INDEX_FIELDS: Dict[str, List[str]] = {
+    "mysekaiMaterials": ["iconAssetbundleName"],
+    "mysekaiItems": ["iconAssetbundleName"],
+    "mysekaiFixtures": ["assetbundleName"],
+    "mysekaiMusicRecords": ["externalId"],
+    "musics": ["assetbundleName"],
+    "mysekaiPhenomenas": ["iconAssetbundleName"],
+    "mysekaiSiteHarvestFixtures": ["mysekaiSiteHarvestFixtureRarityType", "assetbundleName"],
+}
+
+
+def _source_stamp(path: Path) -> List[int]:
+    st = path.stat()
+    return [st.st_mtime_ns, st.st_size]
+
+
+def compile_masterdata_index(metadata_dir) -> Path:
+    """
+    把元数据 JSON 编译成只含所需字段的 msgpack 索引: {表名: {"fields": [...], "rows": {id: [值...]}}}。
+    同时记录源文件的 mtime/大小，加载时据此判断是否过期。
+    """
+    metadata_dir = Path(metadata_dir)
+    tables, sources = {}, {}
+    for table_name, fields in INDEX_FIELDS.items():
+        src = metadata_dir / f"{table_name}.json"
+        if not src.exists(): continue
+        rows = orjson.loads(src.read_bytes())
+        if not isinstance(rows, list): continue
+        tables[table_name.lower()] = {
+            "fields": fields,
+            "rows": {row["id"]: [row.get(f) for f in fields] for row in rows if isinstance(row, dict) and "id" in row},
+        }
+        sources[table_name.lower()] = _source_stamp(src)
+
+    out = metadata_dir / INDEX_FILENAME
+    tmp = out.with_suffix(".tmp")
+    tmp.write_bytes(msgpack.packb({"version": INDEX_VERSION, "sources": sources, "tables": tables}, use_bin_type=True))
+    os.replace(tmp, out)
+    return out
+
+
+class MasterDataIndex:
+    """已编译的元数据索引，按表名 (不区分大小写) 和 id 查询。"""
+    def __init__(self, tables: Dict[str, dict]):
+        self._tables = tables
+
+    @classmethod
+    def load(cls, metadata_dir) -> Optional["MasterDataIndex"]:
+        metadata_dir = Path(metadata_dir)
+        try:
+            with open(metadata_dir / INDEX_FILENAME, "rb") as f:
+                raw = msgpack.unpackb(f.read(), raw=False, strict_map_key=False)
+        except (FileNotFoundError, ValueError, msgpack.UnpackException):
+            return None
+        if raw.get("version") != INDEX_VERSION: return None
+
+        tables = {}
+        for name, table in raw.get("tables", {}).items():
+            src = metadata_dir / f"{next((t for t in INDEX_FIELDS if t.lower() == name), name)}.json"
+            # JSON 在编译后又被更新过则跳过该表，回退到直接读取 JSON
+            try:
+                if _source_stamp(src) != list(raw["sources"].get(name, [])): continue
+            except FileNotFoundError:
+                continue
+            tables[name] = table
+        return cls(tables)
+
+    def has_table(self, table_name: str) -> bool:
+        return table_name.lower() in self._tables
+
+    def find_by_id(self, table_name: str, record_id: int) -> Optional[Dict[str, Any]]:
+        table = self._tables[table_name.lower()]
+        values = table["rows"].get(record_id)
+        if values is None: return None
+        record = dict(zip(table["fields"], values))
+        record["id"] = record_id
+        return record
+
+    def ids(self, table_name: str) -> List[int]:
+        return list(self._tables[table_name.lower()]["rows"])
@@ -0,0 +1,209 @@
+import asyncio
+import bisect
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, List, Optional, Sequence
+
+from aiohttp import web
+
+# 各阶段的展示顺序，未列出的阶段排在最后
+STAGES = (
+    "queue_wait", "download", "decrypt", "parse", "warmup_wait", "extract",
+    "draw_summary", "draw_maps", "compose", "encode", "upload", "total",
+)
+# Prometheus 直方图的桶上限 (秒)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# 输出图片体积直方图的桶上限 (字节)
+SIZE_BUCKETS = tuple(kb * 1024 for kb in (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384))
+# 事件循环延迟直方图的桶上限 (秒)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# 计算分位数时保留的最近样本数
+DEFAULT_WINDOW = 1024
+
+
+@contextmanager
+def timed(timings: Dict[str, float], stage: str):
+    """把代码块耗时 (秒) 累加到 timings[stage]，用于跨线程/进程收集后统一上报。"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+class Histogram:
+    """
+    累计计数的分桶直方图 (用于 Prometheus 导出) + 最近样本窗口 (用于 p50/p95/p99)。
+    非线程安全，由 MetricsRegistry 加锁。
+    """
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, window: int = DEFAULT_WINDOW):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.bucket_counts): self.bucket_counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self._recent.append(value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._recent: return None
+        # nearest-rank 分位数
+        samples = sorted(self._recent)
+        return samples[min(len(samples), max(1, math.ceil(q / 100 * len(samples)))) - 1]
+
+    def cumulative_buckets(self) -> List[int]:
+        total, result = 0, []
+        for n in self.bucket_counts:
+            total += n
+            result.append(total)
+        return result
+
+
+class MetricsRegistry:
+    """按阶段名记录耗时直方图，线程安全。"""
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, window: int = DEFAULT_WINDOW):
+        self._buckets = buckets
+        self._window = window
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            hist = self._histograms.get(stage)
+            if hist is None:
+                hist = self._histograms[stage] = Histogram(self._buckets, self._window)
+            hist.observe(seconds)
+
+    def observe_all(self, timings: Dict[str, float]):
+        for stage, seconds in timings.items():
+            self.observe(stage, seconds)
+
+    def _ordered_stages(self) -> List[str]:
+        order = {stage: i for i, stage in enumerate(STAGES)}
+        # "encode:webp" 这类带格式后缀的阶段按前缀排序
+        return sorted(self._histograms, key=lambda s: (order.get(s.split(":")[0], len(order)), s))
+
+    def snapshot(self) -> Dict[str, dict]:
+        """{阶段: {count, mean, p50, p95, p99}}，耗时单位为秒。"""
+        result = {}
+        with self._lock:
+            for stage in self._ordered_stages():
+                hist = self._histograms[stage]
+                result[stage] = {
+                    "count": hist.count,
+                    "mean": hist.sum / hist.count if hist.count else 0.0,
+                    "p50": hist.percentile(50),
+                    "p95": hist.percentile(95),
+                    "p99": hist.percentile(99),
+                }
+        return result
+
+    def format_summary(self, scale: float = 1000, unit: str = "ms", title: str = "阶段") -> str:
+        """供聊天命令展示的文本，默认把秒换算为毫秒。"""
+        snapshot = self.snapshot()
+        if not snapshot: return "暂无统计数据"
+        fmt = lambda v: f"{v * scale:.0f}" if v is not None else "-"
+        lines = [f"{title} | 次数 | p50 / p95 / p99 ({unit})"]
+        for stage, s in snapshot.items():
+            lines.append(f"{stage} | {s['count']} | {fmt(s['p50'])} / {fmt(s['p95'])} / {fmt(s['p99'])}")
+        return "\n".join(lines)
+
+    def to_prometheus(self, name: str = "mysekai_stage_duration_seconds", help_text: str = "MySekai analyser per-stage duration in seconds.") -> str:
+        """Prometheus 文本格式 (histogram 类型，stage 作为标签)。"""
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        with self._lock:
+            for stage in self._ordered_stages():
+                hist = self._histograms[stage]
+                for le, n in zip(hist.buckets, hist.cumulative_buckets()):
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {n}')
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {hist.count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {hist.sum}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {hist.count}')
+        return "\n".join(lines) + "\n"
+
+# 进程级全局统计：各阶段耗时 (秒) 与各输出格式的图片体积 (字节)
+METRICS = MetricsRegistry()
+OUTPUT_SIZES = MetricsRegistry(buckets=SIZE_BUCKETS)
+LOOP_LAG = MetricsRegistry(buckets=LAG_BUCKETS)
+
+
+def format_output_sizes() -> str:
+    return OUTPUT_SIZES.format_summary(scale=1 / 1024, unit="KB", title="格式")
+
+
+def format_loop_lag() -> str:
+    return LOOP_LAG.format_summary(title="事件循环")
+
+
+class LoopLagMonitor:
+    """
+    事件循环延迟监控：每隔 interval 秒预约一次唤醒，实际唤醒比预约晚的时间即为循环被阻塞的时长。
+    延迟记入 registry 的 "event_loop" 项，超过 target 时调用 on_slow(延迟秒数)。
+    """
+    def __init__(self, registry: MetricsRegistry, interval: float = 0.25, target: float = 0.05,
+                 on_slow: Optional[Callable[[float], None]] = None):
+        self.registry = registry
+        self.interval = interval
+        self.target = target
+        self.on_slow = on_slow
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - scheduled)
+            self.registry.observe("event_loop", lag)
+            if lag > self.target and self.on_slow is not None:
+                self.on_slow(lag)
+
+
+class PrometheusExporter:
+    """在本地端口上以 Prometheus 文本格式提供 /metrics。"""
+    def __init__(self, registry: MetricsRegistry, host: str, port: int, size_registry: Optional[MetricsRegistry] = None,
+                 lag_registry: Optional[MetricsRegistry] = None):
+        self.registry = registry
+        self.size_registry = size_registry
+        self.lag_registry = lag_registry
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def start(self):
+        async def handle_metrics(_request):
+            text = self.registry.to_prometheus()
+            if self.size_registry is not None:
+                text += self.size_registry.to_prometheus("mysekai_output_size_bytes", "MySekai analyser encoded output size in bytes, by format.")
+            if self.lag_registry is not None:
+                text += self.lag_registry.to_prometheus("mysekai_event_loop_lag_seconds", "Event loop wake-up delay in seconds.")
+            return web.Response(text=text, content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
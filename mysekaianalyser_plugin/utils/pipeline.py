@@ -0,0 +1,69 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from .drawer import SITE_ID_TO_NAME_MAP, combine_maps, draw_harvest_map_image, draw_summary_image
+from .encoder import DEFAULT_ENCODER, ImageEncoder
+from .extractor import extract_all_harvest_map_data, extract_summary_data
+from .loader import LocalAssetLoader
+from .metrics import timed
+
+
+class SiteMapArtifacts:
+    """
+    单次解析中各场景的地图图像。组合图只需要原始图像，
+    单张场景图只在调用方请求时才编码 (结果缓存在内存中)，不请求则没有任何额外开销。
+    """
+    def __init__(self, site_images: List[Tuple[int, Image.Image]], encoder: ImageEncoder = DEFAULT_ENCODER):
+        self._images = {site_id: image for site_id, image in site_images if image and image.width > 1}
+        self._encoder = encoder
+        self._encoded: Dict[int, bytes] = {}
+
+    @property
+    def site_ids(self) -> List[int]:
+        return list(self._images)
+
+    @property
+    def extension(self) -> str:
+        return self._encoder.extension
+
+    def image(self, site_id: int) -> Optional[Image.Image]:
+        return self._images.get(site_id)
+
+    def encoded(self, site_id: int) -> Optional[bytes]:
+        if site_id not in self._encoded:
+            image = self._images.get(site_id)
+            if image is None: return None
+            self._encoded[site_id] = self._encoder.encode(image)
+        return self._encoded[site_id]
+
+    def encoded_all(self) -> Dict[str, bytes]:
+        """{场景名: 编码后的图片}"""
+        return {SITE_ID_TO_NAME_MAP.get(site_id, f"unknown_{site_id}"): self.encoded(site_id) for site_id in self._images}
+
+
+@dataclass
+class RenderedImages: summary_image: Optional[bytes]; maps_image: Optional[bytes]; site_maps: Optional[SiteMapArtifacts] = None
+
+
+def render_images(mysekai_data: dict, loader: LocalAssetLoader, show_harvested: bool, timings: Optional[Dict[str, float]] = None,
+                  encoder: ImageEncoder = DEFAULT_ENCODER) -> RenderedImages:
+    """
+    已解析的 MySekai 数据 -> 绘制数据 -> 编码后的统计图与地图，全程在内存中完成。
+    传入 timings 时记录各阶段耗时 (秒)。
+    """
+    timings = {} if timings is None else timings
+    with timed(timings, "extract"):
+        summary_data = extract_summary_data(mysekai_data, loader, show_harvested)
+        map_data_list = extract_all_harvest_map_data(mysekai_data, loader, show_harvested)
+    with timed(timings, "draw_summary"):
+        summary_image = draw_summary_image(summary_data, loader)
+    with timed(timings, "draw_maps"):
+        map_images = [draw_harvest_map_image(data, loader) for data in map_data_list]
+    with timed(timings, "compose"):
+        maps_image = combine_maps(map_images)
+    with timed(timings, encoder.stage_name):
+        summary_bytes, maps_bytes = encoder.encode(summary_image), encoder.encode(maps_image)
+    site_maps = SiteMapArtifacts([(data.site_id, image) for data, image in zip(map_data_list, map_images)], encoder)
+    return RenderedImages(summary_bytes, maps_bytes, site_maps)
@@ -0,0 +1,189 @@
+import asyncio
+import multiprocessing
+import runpy
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from PIL import Image
+
+from .batch import AccountResult, BatchFile
+from .drawer import combine_maps
+from .encoder import DEFAULT_ENCODER
+from .extractor import SITE_ID_ORDER
+from .metrics import timed
+from .pipeline import RenderedImages, SiteMapArtifacts
+from .render_worker import analyse_batch_file, ping, render_site_map, render_summary
+from .executor import run_blocking
+from .worker_bootstrap import RUN_NAME as WORKER_RUN_NAME
+
+# 插件包名与目录，子进程据此在不执行包 __init__ 的情况下导入 utils 下的模块
+PACKAGE_NAME = __name__.rsplit(".", 2)[0]
+PACKAGE_DIR = str(Path(__file__).resolve().parent.parent)
+WORKER_BOOTSTRAP_PATH = str(Path(__file__).resolve().parent / "worker_bootstrap.py")
+
+# 同一时间只允许一个进程池隐藏 __main__，否则交错的恢复会把隐藏后的状态写回去
+_MAIN_MODULE_LOCK = threading.Lock()
+
+
+@contextmanager
+def _main_module_hidden():
+    """
+    forkserver / spawn 启动子进程时，会按 __main__ 的 __spec__ / __file__ 在子进程中重新执行宿主的主模块
+    (例如 bot.py 会再次初始化 NoneBot 并导入完整的插件)。启动子进程期间暂时隐藏这两个属性，子进程只执行 worker_bootstrap。
+    """
+    main_module = sys.modules.get("__main__")
+    with _MAIN_MODULE_LOCK:
+        if main_module is None:
+            yield
+            return
+        saved = {name: main_module.__dict__[name] for name in ("__file__", "__spec__") if name in main_module.__dict__}
+        main_module.__spec__ = None
+        main_module.__dict__.pop("__file__", None)
+        try:
+            yield
+        finally:
+            main_module.__dict__.update(saved)
+
+
+def _build_summary_input(mysekai_data: dict) -> dict:
+    """只保留统计图需要的字段，减少跨进程传输的数据量。"""
+    updated = mysekai_data.get('updatedResources', {})
+    return {
+        'updatedResources': {
+            'now': updated['now'],
+            'userMysekaiHarvestMaps': [
+                {'mysekaiSiteId': m.get('mysekaiSiteId'), 'userMysekaiSiteHarvestResourceDrops': m.get('userMysekaiSiteHarvestResourceDrops', [])}
+                for m in updated.get('userMysekaiHarvestMaps', [])
+            ],
+            'userMysekaiMusicRecords': updated.get('userMysekaiMusicRecords', []),
+        },
+        'mysekaiPhenomenaSchedules': mysekai_data.get('mysekaiPhenomenaSchedules', []),
+        'userMysekaiGateCharacterVisit': mysekai_data.get('userMysekaiGateCharacterVisit', {}),
+    }
+
+
+def _merge_parallel_timings(timings: Dict[str, float], parts):
+    """并行执行的各子任务取最大值，近似其对总耗时的贡献。"""
+    for part in parts:
+        for stage, seconds in part.items():
+            timings[stage] = max(timings.get(stage, 0.0), seconds)
+
+
+def _combine_and_encode(site_images: List[Image.Image]) -> Tuple[Optional[bytes], Dict[str, float]]:
+    """拼接各子进程返回的场景地图并编码组合图，返回编码后的图片与各阶段耗时。"""
+    timings = {}
+    with timed(timings, "compose"):
+        image = combine_maps(site_images)
+    with timed(timings, DEFAULT_ENCODER.stage_name):
+        return DEFAULT_ENCODER.encode(image), timings
+
+
+def _cancel_all(futures):
+    """取消尚未开始执行的子任务 (已在子进程中运行的任务无法中断，结果会被丢弃)。"""
+    for future in futures:
+        future.cancel()
+
+
+class ProcessRenderPool:
+    """
+    常驻进程池：各场景地图的提取+绘制与统计图并行执行，批量解析时各账号也在此并行处理。
+    子进程启动时预加载资源，跨进程只传递单个场景的原始数据、绘制好的场景地图和编码后的统计图，
+    组合地图在调用方拼接并编码。
+    子进程以 forkserver / spawn 方式启动，不继承父进程中其它线程持有的锁，也不会重新执行宿主的 __main__。
+    """
+    def __init__(self, processes: int, resource_path, region: str, cache_max_bytes: int, sprite_cache_max_bytes: int, use_atlas: bool = False):
+        self._processes = processes
+        init_args = (str(resource_path), region, cache_max_bytes, sprite_cache_max_bytes, use_atlas)
+        self._init_globals = {"PACKAGE_NAME": PACKAGE_NAME, "PACKAGE_DIR": PACKAGE_DIR, "INIT_ARGS": init_args}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # 批量解析在首次使用时才启动进程池，多个请求可能同时触发 start()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _mp_context():
+        # 不使用 fork：父进程的预热线程与线程池可能正持有缓存或字体的锁，fork 出的子进程会永远等待。
+        # 子进程通过 worker_bootstrap 导入模块，不依赖父进程的状态。
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            return multiprocessing.get_context("forkserver")
+        return multiprocessing.get_context("spawn")
+
+    def start(self):
+        """创建进程池并等待所有子进程完成预热 (阻塞，请在线程中调用)。子进程启动失败时关闭进程池并抛出异常。"""
+        with self._lock:
+            if self._executor is not None: return
+            context = self._mp_context()
+            # 子进程在 submit 时才按需创建，只有 start() 期间隐藏了 __main__。
+            # 子进程预热后在屏障处等待，直到 processes 个 ping 都各自创建了一个子进程，之后进程数不再变化。
+            init_globals = dict(self._init_globals, STARTUP_BARRIER=context.Barrier(self._processes))
+            with _main_module_hidden():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._processes,
+                    mp_context=context,
+                    initializer=runpy.run_path,
+                    initargs=(WORKER_BOOTSTRAP_PATH, init_globals, WORKER_RUN_NAME),
+                )
+                try:
+                    for future in [self._executor.submit(ping) for _ in range(self._processes)]:
+                        future.result()
+                except BaseException:
+                    self._shutdown_locked()
+                    raise
+
+    def shutdown(self):
+        with self._lock:
+            self._shutdown_locked()
+
+    def _shutdown_locked(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def processes(self) -> int:
+        return self._processes
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def restart(self):
+        """资源更新后重建进程池，使子进程重新加载资源。"""
+        self.shutdown()
+        self.start()
+
+    async def analyse_batch(self, files: List[BatchFile], aes_key: bytes, aes_iv: bytes, show_harvested: bool) -> List[Union[AccountResult, BaseException]]:
+        """批量解析：每个文件一个任务分发到各子进程，按输入顺序返回结果，单个文件失败时对应位置为异常。"""
+        if self._executor is None:
+            await run_blocking(self.start)
+        loop = asyncio.get_running_loop()
+        futures = [loop.run_in_executor(self._executor, analyse_batch_file, file, aes_key, aes_iv, show_harvested) for file in files]
+        return await asyncio.gather(*futures, return_exceptions=True)
+
+    async def render(self, mysekai_data: dict, show_harvested: bool, timings: Optional[Dict[str, float]] = None) -> RenderedImages:
+        timings = {} if timings is None else timings
+        if self._executor is None:
+            await run_blocking(self.start)
+        loop = asyncio.get_running_loop()
+        maps_by_id = {m['mysekaiSiteId']: m for m in mysekai_data.get('updatedResources', {}).get('userMysekaiHarvestMaps', [])}
+        summary_future = loop.run_in_executor(self._executor, render_summary, _build_summary_input(mysekai_data), show_harvested)
+        map_futures = [
+            loop.run_in_executor(self._executor, render_site_map, maps_by_id[site_id], show_harvested)
+            for site_id in SITE_ID_ORDER if site_id in maps_by_id
+        ]
+        try:
+            rendered = await asyncio.gather(*map_futures)
+            rendered_maps = [(site_id, image) for site_id, image, _ in rendered if image is not None]
+            maps_image, combine_timings = await run_blocking(_combine_and_encode, [image for _, image in rendered_maps])
+            summary_image, summary_timings = await summary_future
+        except BaseException:
+            # 调度器超时 (asyncio.wait_for) 或其它子任务失败时，不让剩余任务继续占用进程池
+            _cancel_all([summary_future, *map_futures])
+            raise
+        _merge_parallel_timings(timings, [m[2] for m in rendered] + [summary_timings])
+        for stage, seconds in combine_timings.items():
+            timings[stage] = timings.get(stage, 0.0) + seconds
+        return RenderedImages(summary_image, maps_image, SiteMapArtifacts(rendered_maps))
@@ -0,0 +1,51 @@
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+from .batch import AccountResult, BatchFile, analyse_account
+from .drawer import draw_harvest_map_image, draw_summary_image, preload_quantity_glyphs, preload_resource_sprites, preload_site_maps
+from .encoder import DEFAULT_ENCODER
+from .extractor import _extract_single_harvest_map_data, extract_summary_data
+from .loader import LocalAssetLoader, get_shared_loader
+from .metrics import timed
+
+# 子进程中的共享 loader，由 init_worker 创建并预热
+_worker_loader: Optional[LocalAssetLoader] = None
+
+
+def init_worker(resource_path: str, region: str, cache_max_bytes: int, sprite_cache_max_bytes: int, use_atlas: bool):
+    global _worker_loader
+    _worker_loader = get_shared_loader(resource_path, region, cache_max_bytes, sprite_cache_max_bytes, use_atlas)
+    preload_site_maps(_worker_loader)
+    preload_quantity_glyphs()
+    preload_resource_sprites(_worker_loader)
+
+
+def ping() -> bool:
+    return _worker_loader is not None
+
+
+def render_site_map(site_map_info: dict, show_harvested: bool) -> Tuple[int, Optional[Image.Image], Dict[str, float]]:
+    """提取并绘制单个场景地图，返回 (场景ID, 地图, 各阶段耗时)，地图无效时为 None。地图只随结果传回一次，不另行编码。"""
+    timings = {}
+    with timed(timings, "extract"):
+        data = _extract_single_harvest_map_data(site_map_info, _worker_loader, show_harvested)
+    with timed(timings, "draw_maps"):
+        image = draw_harvest_map_image(data, _worker_loader)
+    return data.site_id, (image if image.width > 1 else None), timings
+
+
+def render_summary(summary_input: dict, show_harvested: bool) -> Tuple[Optional[bytes], Dict[str, float]]:
+    """提取并绘制统计图，返回编码后的图片与各阶段耗时。"""
+    timings = {}
+    with timed(timings, "extract"):
+        summary_data = extract_summary_data(summary_input, _worker_loader, show_harvested)
+    with timed(timings, "draw_summary"):
+        image = draw_summary_image(summary_data, _worker_loader)
+    with timed(timings, DEFAULT_ENCODER.stage_name):
+        return DEFAULT_ENCODER.encode(image), timings
+
+
+def analyse_batch_file(file: BatchFile, aes_key: bytes, aes_iv: bytes, show_harvested: bool) -> AccountResult:
+    """批量解析中的单个账号，复用子进程已预热的 loader。"""
+    return analyse_account(file, _worker_loader, aes_key, aes_iv, show_harvested)
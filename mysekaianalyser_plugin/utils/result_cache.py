@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+from .pipeline import RenderedImages
+
+ASSET_VERSION_FILENAME = "asset_version"
+
+
+def read_asset_version(resource_path) -> str:
+    """资源版本号，由 update_resources 在每次更新完成后重写。"""
+    try:
+        return (Path(resource_path) / ASSET_VERSION_FILENAME).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return "0"
+
+
+def bump_asset_version(resource_path) -> str:
+    version = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    path = Path(resource_path) / ASSET_VERSION_FILENAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(version, encoding="utf-8")
+    return version
+
+
+class ResultCache:
+    """
+    以 (加密文件内容哈希 + 影响输出的配置 + 资源版本) 为键的结果缓存。
+    每个键对应磁盘上的一个目录，保存编码后的统计图和地图；按 TTL 和总体积淘汰。
+    各条目的体积、创建时间与访问顺序保存在内存索引中，只在启动时扫描一次磁盘。
+    """
+    def __init__(self, cache_dir, ttl: float, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (创建时间, 体积)，按最近访问从旧到新排列
+        self._index: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._total = 0
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(content_digest: str, **config) -> str:
+        config_blob = json.dumps(config, sort_keys=True, default=str)
+        return hashlib.sha256(f"{content_digest}|{config_blob}".encode()).hexdigest()
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def _load_index(self):
+        """扫描磁盘上已有的条目建立索引，顺带清理中断写入留下的临时目录，之后按总体积淘汰一次。"""
+        entries = []
+        for entry in self.cache_dir.glob("*/*"):
+            if ".tmp-" in entry.name:
+                shutil.rmtree(entry, ignore_errors=True)
+                continue
+            meta_path = entry / "meta.json"
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                atime = meta_path.stat().st_mtime
+            except (FileNotFoundError, NotADirectoryError, ValueError):
+                shutil.rmtree(entry, ignore_errors=True)
+                continue
+            entries.append((atime, entry.name, meta.get("created", 0), meta.get("size", 0)))
+        with self._lock:
+            for _, key, created, size in sorted(entries):
+                self._index[key] = (created, size)
+                self._total += size
+            self._evict_locked()
+
+    def _remove_locked(self, key: str):
+        _, size = self._index.pop(key)
+        self._total -= size
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def _expired(self, created: float, now: float) -> bool:
+        return now - created > self.ttl
+
+    def get(self, key: str) -> Optional[RenderedImages]:
+        with self._lock:
+            indexed = self._index.get(key)
+            if indexed is None: return None
+            if self._expired(indexed[0], time.time()):
+                self._remove_locked(key)
+                return None
+            self._index.move_to_end(key)
+        entry = self._entry_dir(key)
+        summary_path, maps_path = entry / "summary", entry / "maps"
+        try:
+            result = RenderedImages(
+                summary_path.read_bytes() if summary_path.exists() else None,
+                maps_path.read_bytes() if maps_path.exists() else None,
+            )
+            # 更新访问时间，重启后重建索引时按它恢复访问顺序
+            os.utime(entry / "meta.json")
+        except FileNotFoundError:
+            # 读取过程中被淘汰
+            return None
+        return result
+
+    def put(self, key: str, result: RenderedImages):
+        entry = self._entry_dir(key)
+        tmp = entry.with_name(f"{entry.name}.tmp-{uuid.uuid4().hex[:8]}")
+        tmp.mkdir(parents=True, exist_ok=True)
+        size = 0
+        if result.summary_image:
+            (tmp / "summary").write_bytes(result.summary_image); size += len(result.summary_image)
+        if result.maps_image:
+            (tmp / "maps").write_bytes(result.maps_image); size += len(result.maps_image)
+        created = time.time()
+        (tmp / "meta.json").write_text(json.dumps({"created": created, "size": size}), encoding="utf-8")
+        with self._lock:
+            if key in self._index: self._remove_locked(key)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp, entry)
+            self._index[key] = (created, size)
+            self._total += size
+            if self._total > self.max_bytes: self._evict_locked()
+
+    def evict(self):
+        """删除过期条目，并按最近访问从旧到新删除，直到总体积不超过上限。"""
+        with self._lock:
+            self._evict_locked()
+
+    def _evict_locked(self):
+        now = time.time()
+        for key in [key for key, (created, _) in self._index.items() if self._expired(created, now)]:
+            self._remove_locked(key)
+        while self._total > self.max_bytes and self._index:
+            self._remove_locked(next(iter(self._index)))
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._index.clear()
+            self._total = 0
@@ -0,0 +1,141 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Hashable, List, Optional
+
+from .metrics import METRICS
+
+
+class QueueFullError(Exception):
+    """队列已满，拒绝新任务 (背压)"""
+
+
+@dataclass
+class Job:
+    group_key: Hashable
+    user_key: Hashable
+    runner: Callable[[], Awaitable[Any]]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+
+    @property
+    def queue_wait(self) -> float:
+        return (self.started_at or time.monotonic()) - self.enqueued_at
+
+
+class JobScheduler:
+    """
+    有界任务队列 + 固定数量的 worker。
+    出队时先在群 (私聊视为独立的组) 之间轮转，再在同组的用户之间轮转，
+    避免单个用户或群占满所有 worker。
+    """
+    def __init__(self, max_queue: int, workers: int, timeout: Optional[float]):
+        self.max_queue = max_queue
+        self.workers = workers
+        self.timeout = timeout
+        # group -> user -> 待处理任务
+        self._groups: "OrderedDict[Hashable, OrderedDict[Hashable, Deque[Job]]]" = OrderedDict()
+        self._pending = 0
+        self._running = 0
+        self._cond: Optional[asyncio.Condition] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def start(self):
+        if self._tasks: return
+        self._cond = asyncio.Condition()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks: task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for users in self._groups.values():
+            for jobs in users.values():
+                for job in jobs:
+                    if not job.future.done(): job.future.cancel()
+        self._groups.clear()
+        self._pending = 0
+
+    def submit(self, group_key: Hashable, user_key: Hashable, runner: Callable[[], Awaitable[Any]]) -> Job:
+        """
+        提交任务，队列满时抛出 QueueFullError。
+        返回的 Job.future 在任务完成、失败或超时 (asyncio.TimeoutError) 时结束。
+        """
+        if self._cond is None: self.start()
+        if self._pending >= self.max_queue:
+            raise QueueFullError(f"队列已满 ({self._pending}/{self.max_queue})")
+        job = Job(group_key, user_key, runner, asyncio.get_running_loop().create_future())
+        self._groups.setdefault(group_key, OrderedDict()).setdefault(user_key, deque()).append(job)
+        self._pending += 1
+        asyncio.get_running_loop().create_task(self._notify())
+        return job
+
+    def position(self, job: Job) -> int:
+        """任务前面还有多少个排队任务 (按轮转顺序模拟)，不在队列中时返回 -1。"""
+        for i, queued in enumerate(self._dispatch_order()):
+            if queued is job: return i
+        return -1
+
+    def will_start_immediately(self, job: Job) -> bool:
+        return self.position(job) < max(self.workers - self._running, 0)
+
+    def _dispatch_order(self) -> List[Job]:
+        groups = [(g, [list(jobs) for jobs in users.values()]) for g, users in self._groups.items()]
+        order: List[Job] = []
+        while groups:
+            next_groups = []
+            for g, user_queues in groups:
+                order.append(user_queues[0].pop(0))
+                user_queues = [q for q in user_queues[1:] + user_queues[:1] if q]
+                if user_queues: next_groups.append((g, user_queues))
+            groups = next_groups
+        return order
+
+    def _pop_next(self) -> Optional[Job]:
+        if not self._groups: return None
+        group_key, users = next(iter(self._groups.items()))
+        user_key, jobs = next(iter(users.items()))
+        job = jobs.popleft()
+        # 当前用户/组移到队尾，实现轮转
+        if jobs: users.move_to_end(user_key)
+        else: del users[user_key]
+        if users: self._groups.move_to_end(group_key)
+        else: del self._groups[group_key]
+        self._pending -= 1
+        return job
+
+    async def _notify(self):
+        async with self._cond:
+            self._cond.notify()
+
+    async def _worker(self):
+        while True:
+            async with self._cond:
+                job = self._pop_next()
+                while job is None:
+                    await self._cond.wait()
+                    job = self._pop_next()
+            if job.future.cancelled(): continue
+            job.started_at = time.monotonic()
+            METRICS.observe("queue_wait", job.queue_wait)
+            self._running += 1
+            try:
+                result = await asyncio.wait_for(job.runner(), timeout=self.timeout)
+                if not job.future.done(): job.future.set_result(result)
+            except asyncio.CancelledError:
+                if not job.future.done(): job.future.cancel()
+                raise
+            except Exception as e:
+                if not job.future.done(): job.future.set_exception(e)
+            finally:
+                self._running -= 1
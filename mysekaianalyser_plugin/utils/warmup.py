@@ -0,0 +1,127 @@
+import asyncio
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .drawer import preload_fonts, preload_resource_sprites, preload_site_maps
+from .executor import run_blocking
+from .extractor import get_resource_registry
+from .loader import LocalAssetLoader
+
+COMPONENT_FONTS = "fonts"
+COMPONENT_MASTERDATA = "masterdata"
+COMPONENT_SITE_MAPS = "site_maps"
+COMPONENT_SPRITES = "sprites"
+
+# 除资源注册表用到的表之外，每次解析都会查询的元数据表
+EXTRA_MASTERDATA_TABLES = ("mysekai_site_harvest_fixtures", "mysekai_phenomenas")
+
+
+class WarmupError(Exception):
+    """请求依赖的预热组件加载失败"""
+    def __init__(self, component: str, error: BaseException):
+        super().__init__(f"{component}: {error}")
+        self.component = component
+        self.error = error
+
+
+class Warmup:
+    """
+    启动预热：各步骤按顺序在插件线程池中执行，每个步骤结束 (无论成功与否) 后单独置位。
+    请求只等待自己用到的组件，预热期间其它命令照常处理；
+    步骤失败只记录错误，依赖它的请求会收到 WarmupError，其余组件仍在首次使用时懒加载。
+    """
+    def __init__(self, steps: Sequence[Tuple[str, Callable[[], None]]]):
+        self._steps = list(steps)
+        self._events: Dict[str, asyncio.Event] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, BaseException] = {}
+
+    @property
+    def components(self) -> List[str]:
+        return [name for name, _ in self._steps]
+
+    def start(self):
+        """在后台开始预热 (已在运行时忽略)"""
+        if self._task is not None and not self._task.done(): return
+        self._reset()
+        self._task = asyncio.create_task(self._run_steps())
+
+    async def run(self):
+        """重新预热并等待完成，资源更新后调用。"""
+        if self._task is not None and not self._task.done():
+            await self._task
+        self._reset()
+        self._task = asyncio.create_task(self._run_steps())
+        await self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # 唤醒仍在等待的请求，让它们退回懒加载
+        for event in self._events.values(): event.set()
+
+    def _reset(self):
+        self._events = {name: asyncio.Event() for name, _ in self._steps}
+        self.timings.clear()
+        self.errors.clear()
+
+    async def _run_steps(self):
+        start = time.perf_counter()
+        for name, fn in self._steps:
+            step_start = time.perf_counter()
+            try:
+                await run_blocking(fn)
+            except Exception as e:
+                self.errors[name] = e
+                print(f"[Warmup] {name} 预热失败: {e}")
+            finally:
+                self.timings[name] = time.perf_counter() - step_start
+                self._events[name].set()
+        print(f"[Warmup] 预热完成，耗时 {time.perf_counter() - start:.2f} 秒 | {self.format_timings()}")
+
+    def is_ready(self, components: Iterable[str]) -> bool:
+        """未启动预热时视为就绪 (全部懒加载)"""
+        return all(self._events[c].is_set() for c in components if c in self._events)
+
+    async def wait_for(self, components: Iterable[str]):
+        """等待指定组件预热结束，其中任一失败时抛出 WarmupError"""
+        components = [c for c in components if c in self._events]
+        for component in components:
+            await self._events[component].wait()
+        for component in components:
+            if component in self.errors:
+                raise WarmupError(component, self.errors[component])
+
+    @property
+    def ready(self) -> bool:
+        return self.is_ready(self.components)
+
+    def format_timings(self) -> str:
+        return " ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.timings.items())
+
+    def format_status(self) -> str:
+        if not self._events: return "预热: 未启动"
+        if self.errors:
+            state = "失败 (" + ", ".join(f"{name}: {e}" for name, e in self.errors.items()) + ")"
+        else:
+            state = "已完成" if self.ready else "进行中"
+        return f"预热: {state} | {self.format_timings()}"
+
+
+def build_warmup_steps(get_loader: Callable[[], LocalAssetLoader]) -> List[Tuple[str, Callable[[], None]]]:
+    """默认的预热步骤: 字体 -> 元数据与资源注册表 -> 场景底图 -> 常用图标"""
+    def warm_masterdata():
+        loader = get_loader()
+        get_resource_registry(loader)
+        for table_name in EXTRA_MASTERDATA_TABLES:
+            getattr(loader.md, table_name).ids()
+
+    return [
+        (COMPONENT_FONTS, preload_fonts),
+        (COMPONENT_MASTERDATA, warm_masterdata),
+        (COMPONENT_SITE_MAPS, lambda: preload_site_maps(get_loader())),
+        (COMPONENT_SPRITES, lambda: preload_resource_sprites(get_loader())),
+    ]
@@ -0,0 +1,30 @@
+# 渲染进程池子进程的入口脚本，由 runpy.run_path 按文件路径执行，不经过插件包的导入。
+# 插件包的 __init__ 依赖已初始化的 NoneBot，子进程中无法执行。这里先在 sys.modules 中登记一个
+# 只有 __path__ 的空包代替插件包，之后按名称导入 utils 下的模块 (包括反序列化任务函数时) 都不会再执行它。
+import importlib
+import importlib.util
+import sys
+from importlib.machinery import ModuleSpec
+
+RUN_NAME = "__msa_render_worker__"
+
+
+def install_package_stub(package_name: str, package_dir: str):
+    """插件包尚未导入时，登记一个不执行 __init__ 的空包"""
+    if package_name in sys.modules: return
+    parent_name = package_name.rpartition(".")[0]
+    if parent_name: importlib.import_module(parent_name)
+    spec = ModuleSpec(package_name, None, is_package=True)
+    spec.submodule_search_locations = [package_dir]
+    sys.modules[package_name] = importlib.util.module_from_spec(spec)
+
+
+def main(package_name: str, package_dir: str, init_args: tuple, startup_barrier=None):
+    install_package_stub(package_name, package_dir)
+    importlib.import_module(f"{package_name}.utils.render_worker").init_worker(*init_args)
+    # 所有子进程都启动后才开始接收任务，保证进程池在 start() 期间一次建满，之后不会再按需创建子进程
+    if startup_barrier is not None: startup_barrier.wait()
+
+
+if __name__ == RUN_NAME:
+    main(PACKAGE_NAME, PACKAGE_DIR, INIT_ARGS, STARTUP_BARRIER)  # noqa: F821 (由 run_path 的 init_globals 传入)
@@ -0,0 +1,41 @@
+"""
+测试不依赖 NoneBot 与插件目录中的 configs.py：
+与渲染子进程一样先登记一个不执行 __init__ 的插件包，再以 configs_example.py 为模板生成配置模块，
+其中的路径都指向临时目录，密钥为固定的测试值。
+"""
+import re
+import runpy
+import sys
+import tempfile
+import types
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+PACKAGE_NAME = "mysekaianalyser_plugin"
+PLUGIN_DIR = REPO_ROOT / PACKAGE_NAME
+TEST_AES_KEY = bytes(range(16))
+TEST_AES_IV = bytes(range(16, 32))
+
+
+def make_configs_source() -> str:
+    """configs_example.py 的内容，示例文件中留空的密钥填入测试用的固定值"""
+    source = (PLUGIN_DIR / "configs_example.py").read_text(encoding="utf-8")
+    for name, value in (("AES_KEY_BYTES", TEST_AES_KEY), ("AES_IV_BYTES", TEST_AES_IV)):
+        source = re.sub(rf"^{name}[ \t]*=[ \t]*$", lambda _: f"{name} = {value!r}", source, flags=re.M)
+    return source
+
+
+def _load_test_configs(plugin_root: Path) -> types.ModuleType:
+    source = make_configs_source()
+    module = types.ModuleType(f"{PACKAGE_NAME}.configs")
+    # PLUGIN_ROOT 由 __file__ 推出，测试期间的缓存、临时文件都写入这个目录
+    module.__file__ = str(plugin_root / "configs.py")
+    exec(compile(source, str(PLUGIN_DIR / "configs_example.py"), "exec"), module.__dict__)
+    return module
+
+
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+runpy.run_path(str(PLUGIN_DIR / "utils" / "worker_bootstrap.py"))["install_package_stub"](PACKAGE_NAME, str(PLUGIN_DIR))
+configs = sys.modules[f"{PACKAGE_NAME}.configs"] = _load_test_configs(Path(tempfile.mkdtemp(prefix="msa-test-")))
+sys.modules[PACKAGE_NAME].configs = configs
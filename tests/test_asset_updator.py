@@ -0,0 +1,215 @@
+"""
+AssetSyncer / AssetManifest 对本地 aiohttp 测试服务器的同步行为：
+304 不改动本地文件、200 原子替换、5xx 重试后失败、中断后按清单继续。
+"""
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("aiofiles")
+pytest.importorskip("tqdm")
+web = pytest.importorskip("aiohttp.web")
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp.test_utils import TestServer  # noqa: E402
+
+from mysekaianalyser_plugin.utils import asset_updator  # noqa: E402
+from mysekaianalyser_plugin.utils.asset_updator import FAILED, NOT_FOUND, UNCHANGED, UPDATED, AssetManifest, AssetSyncer  # noqa: E402
+
+
+class FakeAssetServer:
+    """按路径提供文件，支持 If-None-Match；可指定返回 5xx 的次数或在响应体中途断开连接。"""
+    def __init__(self):
+        self.files = {}
+        self.failures = {}
+        self.truncated = set()
+        self.requests = []
+        self.app = web.Application()
+        self.app.router.add_get("/{path:.*}", self._handle)
+        self.server = None
+
+    def publish(self, path: str, body: bytes, etag: str):
+        self.files[path] = (body, etag)
+
+    def url(self, path: str) -> str:
+        return str(self.server.make_url(f"/{path}"))
+
+    def requests_for(self, path: str):
+        return [headers for requested, headers in self.requests if requested == path]
+
+    async def _handle(self, request):
+        path = request.match_info["path"]
+        self.requests.append((path, dict(request.headers)))
+        if self.failures.get(path, 0) > 0:
+            self.failures[path] -= 1
+            raise web.HTTPServiceUnavailable()
+        if path not in self.files:
+            raise web.HTTPNotFound()
+        body, etag = self.files[path]
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        if path in self.truncated:
+            response = web.StreamResponse(headers={"ETag": etag})
+            response.content_length = len(body)
+            await response.prepare(request)
+            await response.write(body[:len(body) // 2])
+            request.transport.close()
+            return response
+        return web.Response(body=body, headers={"ETag": etag})
+
+    async def __aenter__(self):
+        self.server = TestServer(self.app)
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.server.close()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    """重试退避不真正等待，记录每次的等待时长"""
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay, *args, **kwargs):
+        # aiohttp 内部也会调用 asyncio.sleep(0) 让出控制权
+        if delay: delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(asset_updator.asyncio, "sleep", sleep)
+    return delays
+
+
+def _run(coro_fn, *args):
+    async def main():
+        async with FakeAssetServer() as server:
+            async with aiohttp.ClientSession() as session:
+                return await coro_fn(server, session, *args)
+    return asyncio.run(main())
+
+
+def test_not_modified_leaves_file_untouched(tmp_path):
+    dest = tmp_path / "files" / "a.png"
+    manifest = AssetManifest(tmp_path / "manifest.json")
+
+    async def scenario(server, session):
+        server.publish("a.png", b"first", '"v1"')
+        syncer = AssetSyncer(session, manifest, concurrency=4, retries=0)
+        assert await syncer.fetch("a.png", server.url("a.png"), dest) == UPDATED
+        stat = dest.stat()
+        assert await syncer.fetch("a.png", server.url("a.png"), dest) == UNCHANGED
+        assert server.requests_for("a.png")[-1]["If-None-Match"] == '"v1"'
+        return stat
+
+    stat = _run(scenario)
+    assert dest.read_bytes() == b"first"
+    assert (dest.stat().st_ino, dest.stat().st_mtime_ns) == (stat.st_ino, stat.st_mtime_ns)
+    assert manifest.get("a.png")["etag"] == '"v1"'
+
+
+def test_ok_response_replaces_file_atomically(tmp_path):
+    dest = tmp_path / "files" / "a.png"
+    manifest = AssetManifest(tmp_path / "manifest.json")
+
+    async def scenario(server, session):
+        syncer = AssetSyncer(session, manifest, concurrency=4, retries=1)
+        server.publish("a.png", b"first", '"v1"')
+        assert await syncer.fetch("a.png", server.url("a.png"), dest) == UPDATED
+        # 新版本的响应体传到一半断开: 重试后仍失败，本地保留旧文件
+        server.publish("a.png", b"second version" * 1000, '"v2"')
+        server.truncated.add("a.png")
+        assert await syncer.fetch("a.png", server.url("a.png"), dest) == FAILED
+        assert dest.read_bytes() == b"first"
+        assert manifest.get("a.png")["etag"] == '"v1"'
+        server.truncated.clear()
+        assert await syncer.fetch("a.png", server.url("a.png"), dest) == UPDATED
+
+    _run(scenario)
+    assert dest.read_bytes() == b"second version" * 1000
+    assert sorted(os.listdir(dest.parent)) == ["a.png"]
+    assert manifest.get("a.png")["etag"] == '"v2"'
+    assert manifest.get("a.png")["size"] == len(b"second version" * 1000)
+
+
+def test_server_error_retries_then_fails(tmp_path, no_backoff):
+    dest = tmp_path / "files" / "a.png"
+    manifest = AssetManifest(tmp_path / "manifest.json")
+
+    async def scenario(server, session):
+        server.publish("a.png", b"body", '"v1"')
+        server.failures["a.png"] = 10
+        syncer = AssetSyncer(session, manifest, concurrency=4, retries=2)
+        return await syncer.fetch("a.png", server.url("a.png"), dest), len(server.requests_for("a.png"))
+
+    assert _run(scenario) == (FAILED, 3)
+    assert len(no_backoff) == 2
+    assert not dest.parent.exists() or os.listdir(dest.parent) == []
+    assert manifest.get("a.png") is None
+
+
+def test_server_error_recovers_within_retries(tmp_path):
+    dest = tmp_path / "files" / "a.png"
+    manifest = AssetManifest(tmp_path / "manifest.json")
+
+    async def scenario(server, session):
+        server.publish("a.png", b"body", '"v1"')
+        server.failures["a.png"] = 2
+        syncer = AssetSyncer(session, manifest, concurrency=4, retries=2)
+        return await syncer.fetch("a.png", server.url("a.png"), dest)
+
+    assert _run(scenario) == UPDATED
+    assert dest.read_bytes() == b"body"
+
+
+def test_interrupted_run_resumes_from_manifest(tmp_path, monkeypatch):
+    resource_path = tmp_path / "resources"
+    dest_base = resource_path / "assets"
+    manifest_path = resource_path / "manifest.json"
+    monkeypatch.setattr(asset_updator, "RESOURCE_PATH", resource_path)
+    assets = ["a.png", "b.png", "c.png"]
+
+    async def sync(server, retries: int):
+        # 每轮使用新的会话与从磁盘读取的清单，相当于重新启动一次更新
+        manifest = AssetManifest(manifest_path)
+        async with aiohttp.ClientSession() as session:
+            syncer = AssetSyncer(session, manifest, concurrency=4, retries=retries)
+            try:
+                return await asyncio.gather(*(syncer.fetch_asset(name, dest_base) for name in assets))
+            finally:
+                # 与 update_resources 一样，中断时也把已完成的部分写入清单
+                await manifest.save_async()
+
+    async def main():
+        async with FakeAssetServer() as server:
+            monkeypatch.setattr(asset_updator, "ASSET_BASE_URL", server.url(""))
+            for name in ("a.png", "b.png"):
+                server.publish(f"ondemand/{name}", name.encode(), f'"{name}"')
+            # c.png 只在 startapp 下存在，第一轮一直失败
+            server.publish("startapp/c.png", b"c.png", '"c.png"')
+            server.failures["startapp/c.png"] = 100
+            assert await sync(server, retries=0) == [UPDATED, UPDATED, FAILED]
+
+            server.failures.clear()
+            server.requests.clear()
+            assert await sync(server, retries=0) == [UNCHANGED, UNCHANGED, UPDATED]
+            # 已完成的文件按清单中的 ETag 做条件请求，只有未完成的文件重新下载
+            for name in ("a.png", "b.png"):
+                assert [headers.get("If-None-Match") for headers in server.requests_for(f"ondemand/{name}")] == [f'"{name}"']
+
+            server.requests.clear()
+            assert await sync(server, retries=0) == [UNCHANGED, UNCHANGED, UNCHANGED]
+            # 清单记录了成功的来源地址，c.png 直接请求 startapp，不再先试 ondemand
+            assert sorted(path for path, _ in server.requests) == ["ondemand/a.png", "ondemand/b.png", "startapp/c.png"]
+
+    asyncio.run(main())
+    assert [dest_base.joinpath(name).read_bytes() for name in assets] == [b"a.png", b"b.png", b"c.png"]
+    assert sorted(os.listdir(dest_base)) == assets
+
+
+def test_missing_asset_reports_not_found(tmp_path):
+    async def scenario(server, session):
+        syncer = AssetSyncer(session, AssetManifest(tmp_path / "manifest.json"), concurrency=4, retries=2)
+        return await syncer.fetch("x.png", server.url("x.png"), tmp_path / "x.png"), len(server.requests)
+
+    assert _run(scenario) == (NOT_FOUND, 1)
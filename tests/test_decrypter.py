@@ -0,0 +1,105 @@
+"""SelectiveMapParser / StreamDecrypter 的分块解析结果必须与 msgpack.unpackb 一致，错误只在 finalize() 时抛出。"""
+import pytest
+
+msgpack = pytest.importorskip("msgpack")
+pytest.importorskip("cryptography")
+
+from benchmarks.synthetic import make_encrypted_bin, make_payload  # noqa: E402
+from conftest import TEST_AES_IV, TEST_AES_KEY  # noqa: E402
+from mysekaianalyser_plugin.utils.decrypter import (  # noqa: E402
+    MIN_PARSE_RETRY_BYTES, MYSEKAI_TOP_LEVEL_KEYS, SelectiveMapParser, StreamDecrypter, decrypt_and_parse_bin_bytes,
+)
+
+PAYLOAD = make_payload(drops_per_site=30, fixtures_per_site=10, filler_items=3000)
+PACKED = msgpack.packb(PAYLOAD, use_bin_type=True)
+ENCRYPTED = make_encrypted_bin(PAYLOAD, TEST_AES_KEY, TEST_AES_IV)
+# 文件大小需超过重试阈值，才能覆盖解析推迟重试的路径
+assert len(PACKED) > 2 * MIN_PARSE_RETRY_BYTES
+
+CHUNK_SIZES = [1, 15, 16, 1000, 4096, MIN_PARSE_RETRY_BYTES - 1, MIN_PARSE_RETRY_BYTES + 1, len(PACKED)]
+
+
+def _chunks(data: bytes, size: int):
+    return [data[offset:offset + size] for offset in range(0, len(data), size)]
+
+
+def _parse(chunks, keys=None) -> dict:
+    parser = SelectiveMapParser(keys)
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.result()
+
+
+def _selected(document: dict, keys=MYSEKAI_TOP_LEVEL_KEYS) -> dict:
+    return {key: value for key, value in document.items() if key in keys}
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_parser_matches_unpackb(chunk_size):
+    expected = msgpack.unpackb(PACKED, raw=False)
+    assert _parse(_chunks(PACKED, chunk_size)) == expected
+    assert _parse(_chunks(PACKED, chunk_size), MYSEKAI_TOP_LEVEL_KEYS) == _selected(expected)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_stream_decrypter_matches_unpackb(chunk_size):
+    decrypter = StreamDecrypter(TEST_AES_KEY, TEST_AES_IV, None)
+    for chunk in _chunks(ENCRYPTED, chunk_size):
+        decrypter.feed(chunk)
+    assert decrypter.finalize() == msgpack.unpackb(PACKED, raw=False)
+
+
+def test_decrypt_and_parse_bin_bytes_selects_top_level_keys():
+    assert decrypt_and_parse_bin_bytes(ENCRYPTED, TEST_AES_KEY, TEST_AES_IV, chunk_size=777) == _selected(PAYLOAD)
+
+
+@pytest.mark.parametrize("keys", [None, ("wanted",)])
+def test_key_split_across_chunks(keys):
+    # 每个切分位置都试一遍，覆盖字段名、字段值以及 map 头被切开的情况
+    document = {"skipped_" + "k" * 40: list(range(50)), "wanted": {"nested_key": "v" * 40}, "tail": 1}
+    packed = msgpack.packb(document, use_bin_type=True)
+    expected = document if keys is None else _selected(document, keys)
+    for split in range(1, len(packed)):
+        assert _parse([packed[:split], packed[split:]], keys) == expected, split
+
+
+@pytest.mark.parametrize("cut", [1, 100, len(PACKED) // 2])
+def test_truncated_msgpack(cut):
+    with pytest.raises(ValueError):
+        _parse(_chunks(PACKED[:-cut], 4096))
+
+
+@pytest.mark.parametrize("cut", [16, 32])
+def test_truncated_ciphertext_fails_in_finalize(cut):
+    # 截掉整块密文时 CBC 仍能解密，错误来自填充校验或不完整的 MessagePack
+    decrypter = StreamDecrypter(TEST_AES_KEY, TEST_AES_IV)
+    for chunk in _chunks(ENCRYPTED[:-cut], 4096):
+        decrypter.feed(chunk)
+    with pytest.raises(ValueError, match="解密或解析数据失败"):
+        decrypter.finalize()
+
+
+def test_partial_block_fails_in_finalize():
+    decrypter = StreamDecrypter(TEST_AES_KEY, TEST_AES_IV)
+    decrypter.feed(ENCRYPTED[:-5])
+    with pytest.raises(ValueError, match="解密或解析数据失败"):
+        decrypter.finalize()
+
+
+def test_bad_padding_fails_in_finalize():
+    # 修改倒数第二块会改变最后一块明文的同一位置，最后一个字节即填充长度
+    tampered = bytearray(ENCRYPTED)
+    tampered[-17] ^= 0xFF
+    decrypter = StreamDecrypter(TEST_AES_KEY, TEST_AES_IV)
+    decrypter.feed(bytes(tampered))
+    with pytest.raises(ValueError, match="解密或解析数据失败"):
+        decrypter.finalize()
+
+
+def test_wrong_key_fails_in_finalize():
+    decrypter = StreamDecrypter(bytes(reversed(TEST_AES_KEY)), TEST_AES_IV)
+    # 乱码明文导致的解析错误不会在 feed() 中抛出
+    for chunk in _chunks(ENCRYPTED, 4096):
+        decrypter.feed(chunk)
+    with pytest.raises(ValueError, match="解密或解析数据失败"):
+        decrypter.finalize()
@@ -0,0 +1,102 @@
+"""HistoryStore 的写入与查询：last_drop、average_daily_yield (同一刷新时段去重、按有上传的天数平均)。"""
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("PIL")
+
+from benchmarks.synthetic import make_payload  # noqa: E402
+from mysekaianalyser_plugin.utils.history import (  # noqa: E402
+    DAY_START_HOUR, RARITY_NORMAL, DailyYield, HistoryEntry, HistoryStore, LastDrop, build_history_entry,
+)
+
+USER = "10001"
+KEY = "mysekai_material_5"
+OTHER = "mysekai_material_1"
+# 本地时间 2025-01-10 DAY_START_HOUR 点为第 0 天的起点。
+# _day_shift_ms 使用当前的 UTC 偏移，夏令时地区会差一小时，测试数据都离时段边界一小时以上
+DAY0 = datetime(2025, 1, 10, DAY_START_HOUR)
+
+
+def _ms(day: int, hour: float) -> int:
+    """第 day 天 (以 DAY_START_HOUR 为起点) 起 hour 小时后的本地时间，转为毫秒时间戳"""
+    return int((DAY0 + timedelta(days=day, hours=hour)).timestamp() * 1000)
+
+
+def _entry(upload_time: int, *resources) -> HistoryEntry:
+    return HistoryEntry(upload_time, 1, 10, [1, 2], 1, [(site_id, key, quantity, RARITY_NORMAL) for site_id, key, quantity in resources])
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(tmp_path / "history.db", batch_size=4)
+    yield store
+    store.stop()
+
+
+def _flush(store: HistoryStore):
+    """等后台线程写完队列中的数据"""
+    store.stop()
+    assert store.failed == 0
+
+
+def test_last_drop(store):
+    store.record_entry(USER, _entry(_ms(0, 1.5), (5, KEY, 2), (6, KEY, 1), (5, OTHER, 4)))
+    store.record_entry(USER, _entry(_ms(0, 14), (5, OTHER, 3)))
+    store.record_entry(USER, _entry(_ms(1, 2), (8, KEY, 3), (7, KEY, 1)))
+    store.record_entry(USER, _entry(_ms(1, 20), (5, OTHER, 1)))
+    store.record_entry("20002", _entry(_ms(2, 1), (5, KEY, 9)))
+    _flush(store)
+    assert store.last_drop(USER, KEY) == LastDrop(_ms(1, 2), [(7, 1), (8, 3)])
+    assert store.last_drop(USER, OTHER) == LastDrop(_ms(1, 20), [(5, 1)])
+    assert store.last_drop(USER, "mysekai_material_99") is None
+    assert store.last_drop("30003", KEY) is None
+
+
+def test_duplicate_upload_recorded_once(store):
+    entry = _entry(_ms(0, 1.5), (5, KEY, 2))
+    store.record_entry(USER, entry)
+    store.record_entry(USER, _entry(entry.upload_time, (5, KEY, 7)))
+    _flush(store)
+    assert store.last_drop(USER, KEY) == LastDrop(entry.upload_time, [(5, 2)])
+    assert store.average_daily_yield(USER, KEY, 7, now_ms=_ms(0, 3)) == DailyYield(2, 1, 2.0)
+
+
+def test_average_daily_yield(store):
+    # 第 0 天上午时段: 两次上传看到的是同一批资源，只取数量最多的一次 (5)
+    store.record_entry(USER, _entry(_ms(0, 1.5), (5, KEY, 3)))
+    store.record_entry(USER, _entry(_ms(0, 6), (5, KEY, 4), (6, KEY, 1)))
+    # 第 0 天下午时段 (16:00 起)，次日 4:00 前的上传仍属于这一时段和第 0 天
+    store.record_entry(USER, _entry(_ms(0, 13.5), (5, KEY, 2)))
+    store.record_entry(USER, _entry(_ms(0, 22.5), (5, KEY, 1)))
+    # 第 1 天有上传但没有该资源，计入天数
+    store.record_entry(USER, _entry(_ms(1, 3), (5, OTHER, 6)))
+    # 第 2 天
+    store.record_entry(USER, _entry(_ms(2, 13), (7, KEY, 4)))
+    # 统计范围之外
+    store.record_entry(USER, _entry(_ms(-10, 1), (5, KEY, 100)))
+    # 其它用户
+    store.record_entry("20002", _entry(_ms(0, 1), (5, KEY, 50)))
+    _flush(store)
+
+    now = _ms(2, 16)
+    assert store.average_daily_yield(USER, KEY, 7, now_ms=now) == DailyYield(5 + 2 + 4, 3, 11 / 3)
+    assert store.average_daily_yield(USER, OTHER, 7, now_ms=now) == DailyYield(6, 3, 2.0)
+    # 缩短统计范围只保留第 2 天
+    assert store.average_daily_yield(USER, KEY, 1, now_ms=now) == DailyYield(4, 1, 4.0)
+    assert store.average_daily_yield("30003", KEY, 7, now_ms=now) == DailyYield(0, 0, 0.0)
+
+
+def test_record_raw_data_matches_prebuilt_entry(tmp_path):
+    # 单文件上传传入解析后的数据，批量解析传入子进程整理好的 HistoryEntry，写入结果必须相同
+    payload = make_payload(drops_per_site=20, fixtures_per_site=5, filler_items=0)
+    stores = [HistoryStore(tmp_path / f"{name}.db") for name in ("raw", "entry")]
+    stores[0].record(USER, payload)
+    stores[1].record_entry(USER, build_history_entry(payload))
+    for store in stores:
+        _flush(store)
+    upload_time = payload["updatedResources"]["now"]
+    keys = {key for _, key, _, _ in build_history_entry(payload).resources}
+    for key in keys:
+        assert stores[0].last_drop(USER, key) == stores[1].last_drop(USER, key)
+        assert stores[0].average_daily_yield(USER, key, 3, now_ms=upload_time) == stores[1].average_daily_yield(USER, key, 3, now_ms=upload_time)
@@ -0,0 +1,250 @@
+"""
+_layout_drops_np 与 _layout_drops_py 的结果必须逐项相同，固定输入的绘制数据必须与优化前 (f96fa20) 的实现一致。
+插件包与 configs 模块由 conftest.py 登记。
+"""
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+from mysekaianalyser_plugin.utils import extractor  # noqa: E402
+from mysekaianalyser_plugin.utils.loader import LocalAssetLoader  # noqa: E402
+
+SCALE = extractor.MYSEKAI_HARVEST_MAP_IMAGE_SCALE
+POINT_SIZE, LARGE_SIZE, SMALL_SIZE = extractor.get_map_icon_sizes()
+GLOBAL_ZOFFSET = -POINT_SIZE * 0.2
+
+# 覆盖各条布局规则: 棉花、数量为 6 时跳过的材料、放大的图标、非材料资源、最稀有资源
+RESOURCES = [
+    ("mysekai_material", [1, 2, 5, 6, 12, 21, 22, 24, 32, 61]),
+    ("mysekai_item", [7, 8]),
+    ("mysekai_fixture", [121, 3]),
+    ("mysekai_music_record", [352, 353]),
+    ("material", [17, 170]),
+]
+
+
+class _EmptyTable:
+    def find_by_id(self, record_id):
+        return None
+
+
+class _EmptyMasterData:
+    def __getattr__(self, name):
+        return _EmptyTable()
+
+
+class _FakeLoader:
+    """资源注册表只需要查询元数据表，全部返回 None (图标路径为空)"""
+    md = _EmptyMasterData()
+
+
+def _make_background(site_id: int) -> extractor.SiteMapBackground:
+    config = extractor.SITE_MAP_CONFIGS[site_id]
+    crop_x, crop_y, crop_w, crop_h = config['crop_bbox']
+    return extractor.SiteMapBackground(
+        site_id, None, int(crop_w * SCALE), int(crop_h * SCALE), 1280 * SCALE / 2, 1080 * SCALE / 2,
+        config['grid_size'] * SCALE, config['offset_x'] * SCALE - crop_x * SCALE, config['offset_z'] * SCALE - crop_y * SCALE,
+    )
+
+
+def _drop(res_type: str, res_id: int, x: float, z: float, quantity: int) -> dict:
+    return {"resourceType": res_type, "resourceId": res_id, "positionX": x, "positionZ": z, "quantity": quantity}
+
+
+def _random_drops(rng: random.Random, count: int) -> list:
+    # 坐标取半格，保证大量掉落物落在同一像素格；少量坐标超出地图范围，触发边缘截断
+    positions = [(rng.randint(-24, 24) / 2, rng.randint(-24, 24) / 2) for _ in range(max(1, count // 6))]
+    positions += [(-40.0, 40.0), (40.0, -40.0)]
+    drops = []
+    for _ in range(count):
+        res_type, ids = rng.choice(RESOURCES)
+        x, z = rng.choice(positions)
+        drops.append(_drop(res_type, rng.choice(ids), x, z, rng.choice((1, 2, 3, 6))))
+    return drops
+
+
+def _layout_both(site_id: int, drops: list):
+    bg = _make_background(site_id)
+    registry = extractor.ResourceRegistry(_FakeLoader())
+    expected = extractor._layout_drops_py(bg, registry, drops, LARGE_SIZE, SMALL_SIZE, GLOBAL_ZOFFSET)
+    actual = extractor._layout_drops_np(bg, registry, drops, LARGE_SIZE, SMALL_SIZE, GLOBAL_ZOFFSET)
+    return expected, actual
+
+
+@pytest.mark.parametrize("site_id", extractor.SITE_ID_ORDER)
+@pytest.mark.parametrize("seed", range(20))
+def test_random_sites(site_id, seed):
+    rng = random.Random(seed * 100 + site_id)
+    expected, actual = _layout_both(site_id, _random_drops(rng, rng.randint(1, 300)))
+    assert actual == expected
+
+
+@pytest.mark.parametrize("site_id", extractor.SITE_ID_ORDER)
+def test_empty_site(site_id):
+    assert _layout_both(site_id, []) == ([], [])
+
+
+@pytest.mark.parametrize("drop", [
+    _drop("mysekai_material", 2, 0, 0, 1),
+    _drop("mysekai_material", 24, 3.5, -2, 2),
+    _drop("mysekai_music_record", 352, -6, 6, 1),
+    _drop("mysekai_material", 1, 0, 0, 6),
+    _drop("mysekai_fixture", 121, 40, 40, 1),
+])
+def test_single_drop(drop):
+    expected, actual = _layout_both(5, [drop])
+    assert actual == expected
+
+
+def test_overlapping_coordinates():
+    # 同一格子内: 材料与非材料 (小图标)、棉花与其它资源、同种资源重复出现需合并、数量相同时按 key 排序
+    drops = [
+        _drop("mysekai_material", 21, 1, 1, 1),
+        _drop("mysekai_material", 2, 1, 1, 2),
+        _drop("mysekai_item", 7, 1, 1, 1),
+        _drop("mysekai_material", 2, 1, 1, 1),
+        _drop("mysekai_material", 6, 1, 1, 6),
+        _drop("mysekai_material", 5, 1, 1, 3),
+        _drop("material", 17, 1, 1, 3),
+        _drop("mysekai_material", 12, -1, -1, 1),
+        _drop("mysekai_material", 32, -1, -1, 1),
+        _drop("mysekai_music_record", 353, -1, -1, 1),
+    ]
+    for site_id in extractor.SITE_ID_ORDER:
+        expected, actual = _layout_both(site_id, drops)
+        assert actual == expected
+
+
+def _fixed_site(site_id: int) -> dict:
+    def fixture(fixture_id, x, z, status):
+        return {"mysekaiSiteHarvestFixtureId": fixture_id, "positionX": x, "positionZ": z, "userMysekaiSiteHarvestFixtureStatus": status}
+
+    def drop(res_type, res_id, x, z, quantity, status):
+        return {**_drop(res_type, res_id, x, z, quantity), "mysekaiSiteHarvestResourceDropStatus": status}
+
+    return {
+        "mysekaiSiteId": site_id,
+        "userMysekaiSiteHarvestFixtures": [
+            fixture(1001, 2.0, -3.5, "spawned"),
+            fixture(1002, -6.5, 4.0, "harvested"),
+            fixture(1003, 0.0, 11.5, "spawned"),
+        ],
+        "userMysekaiSiteHarvestResourceDrops": [
+            drop("mysekai_material", 21, 2.0, -3.5, 2, "before_drop"),
+            drop("mysekai_material", 2, 2.0, -3.5, 1, "before_drop"),
+            drop("mysekai_item", 7, 2.0, -3.5, 1, "dropped"),
+            drop("mysekai_material", 24, -6.5, 4.0, 1, "before_drop"),
+            drop("mysekai_material", 5, -6.5, 4.0, 1, "before_drop"),
+            drop("mysekai_material", 1, -6.5, 4.0, 6, "before_drop"),
+            drop("mysekai_music_record", 352, 0.0, 11.5, 1, "before_drop"),
+            drop("mysekai_fixture", 121, 0.0, 11.5, 1, "dropped"),
+            drop("material", 17, 40.0, -40.0, 3, "before_drop"),
+            drop("mysekai_material", 2, 2.0, -3.5, 2, "dropped"),
+        ],
+    }
+
+
+_RED = ((255, 50, 50, 150), 2)
+_BLUE = ((50, 50, 255, 100), 1)
+
+# 由 f96fa20 的 _extract_single_harvest_map_data 对 _fixed_site 生成:
+# (draw_width, draw_height, spawn_point, [采集点], [(quantity, x, z, size, draw_order, is_small_icon, outline, light_size)])
+BASELINE_DRAW_DATA = {
+    (5, False): (1024, 864, (272, 384), [(301, 227), (-64, 281)], [
+        (3, 1010, -25, 28, 101024, False, _RED, 216),
+        (2, 351, 290, 28, 330365, False, None, None),
+        (1, -14, 344, 42, 384000, False, None, None),
+        (1, 137, 517, 42, 657165, False, _RED, 216),
+        (1, 165, 517, 28, 657165, False, _RED, 216),
+        (1, 371, 291, 13, 1330365, True, _BLUE, None),
+    ]),
+    (5, True): (1024, 864, (272, 384), [(301, 227), (-64, 281), (101, 454)], [
+        (3, 1010, -25, 28, 101024, False, _RED, 216),
+        (2, 351, 290, 28, 330365, False, None, None),
+        (1, 0, 344, 42, 384000, False, None, None),
+        (1, -28, 344, 28, 484000, False, _RED, 216),
+        (1, 137, 517, 42, 657165, False, _RED, 216),
+        (1, 165, 517, 28, 657165, False, _RED, 216),
+        (3, 371, 291, 13, 1330365, True, _BLUE, None),
+        (1, 371, 304, 13, 1330365, True, _BLUE, None),
+    ]),
+    (6, False): (1024, 864, (272, 496), [(208, 204), (240, 450)], [
+        (1, 258, 267, 42, 307272, False, None, None),
+        (1, 137, 390, 42, 530165, False, _RED, 216),
+        (1, 165, 390, 28, 530165, False, _RED, 216),
+        (2, 290, 513, 28, 553304, False, None, None),
+        (3, 914, 824, 28, 964928, False, _RED, 216),
+        (1, 310, 514, 13, 1553304, True, _BLUE, None),
+    ]),
+    (6, True): (1024, 864, (272, 496), [(208, 204), (101, 327), (240, 450)], [
+        (1, 272, 267, 42, 307272, False, None, None),
+        (1, 244, 267, 28, 407272, False, _RED, 216),
+        (1, 137, 390, 42, 530165, False, _RED, 216),
+        (1, 165, 390, 28, 530165, False, _RED, 216),
+        (2, 290, 513, 28, 553304, False, None, None),
+        (3, 914, 824, 28, 964928, False, _RED, 216),
+        (3, 310, 514, 13, 1553304, True, _BLUE, None),
+        (1, 310, 527, 13, 1553304, True, _BLUE, None),
+    ]),
+    (7, False): (1024, 864, (182, 448), [(187, 305), (-64, 345)], [
+        (3, 962, -25, 28, 100976, False, _RED, 216),
+        (2, 237, 368, 28, 408251, False, None, None),
+        (1, -14, 408, 42, 448000, False, None, None),
+        (1, 75, 537, 42, 677103, False, _RED, 216),
+        (1, 103, 537, 28, 677103, False, _RED, 216),
+        (1, 257, 369, 13, 1408251, True, _BLUE, None),
+    ]),
+    (7, True): (1024, 864, (182, 448), [(187, 305), (-64, 345), (39, 474)], [
+        (3, 962, -25, 28, 100976, False, _RED, 216),
+        (2, 237, 368, 28, 408251, False, None, None),
+        (1, 0, 408, 42, 448000, False, None, None),
+        (1, -28, 408, 28, 548000, False, _RED, 216),
+        (1, 75, 537, 42, 677103, False, _RED, 216),
+        (1, 103, 537, 28, 677103, False, _RED, 216),
+        (3, 257, 369, 13, 1408251, True, _BLUE, None),
+        (1, 257, 382, 13, 1408251, True, _BLUE, None),
+    ]),
+    (8, False): (1024, 864, (352, 328), [(288, 28), (322, 284)], [
+        (1, 338, 91, 42, 131352, False, None, None),
+        (1, 213, 219, 42, 359241, False, _RED, 216),
+        (1, 241, 219, 28, 359241, False, _RED, 216),
+        (2, 372, 347, 28, 387386, False, None, None),
+        (3, 1010, 824, 28, 965024, False, _RED, 216),
+        (1, 392, 348, 13, 1387386, True, _BLUE, None),
+    ]),
+    (8, True): (1024, 864, (352, 328), [(288, 28), (177, 156), (322, 284)], [
+        (1, 352, 91, 42, 131352, False, None, None),
+        (1, 324, 91, 28, 231352, False, _RED, 216),
+        (1, 213, 219, 42, 359241, False, _RED, 216),
+        (1, 241, 219, 28, 359241, False, _RED, 216),
+        (2, 372, 347, 28, 387386, False, None, None),
+        (3, 1010, 824, 28, 965024, False, _RED, 216),
+        (3, 392, 348, 13, 1387386, True, _BLUE, None),
+        (1, 392, 361, 13, 1387386, True, _BLUE, None),
+    ]),
+}
+
+
+@pytest.fixture(scope="module")
+def fixed_loader(tmp_path_factory):
+    # 只需要场景底图的尺寸；元数据为空时所有图标路径为空
+    root = tmp_path_factory.mktemp("resources")
+    (root / "metadata" / "jp").mkdir(parents=True)
+    site_map_dir = root / "assets" / "jp" / "mysekai" / "site_map"
+    site_map_dir.mkdir(parents=True)
+    for site_id in extractor.SITE_ID_ORDER:
+        Image.new("RGBA", (1280, 1080), (90, 160, 90, 255)).save(site_map_dir / f"{site_id}.png")
+    return LocalAssetLoader(str(root), "jp")
+
+
+@pytest.mark.parametrize("site_id, show_harvested", sorted(BASELINE_DRAW_DATA))
+def test_fixed_input_matches_baseline(fixed_loader, site_id, show_harvested):
+    data = extractor._extract_single_harvest_map_data(_fixed_site(site_id), fixed_loader, show_harvested)
+    actual = (
+        data.draw_width, data.draw_height, tuple(data.spawn_point), [(p.x, p.y) for p in data.harvest_points],
+        [(r.quantity, r.x, r.z, r.size, r.draw_order, r.is_small_icon, r.outline, r.light_size) for r in data.dropped_resources],
+    )
+    assert actual == BASELINE_DRAW_DATA[site_id, show_harvested]
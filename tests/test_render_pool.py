@@ -0,0 +1,76 @@
+"""
+进程池以 forkserver / spawn 启动子进程时，不能在子进程中重新执行宿主的 __main__ (例如 bot.py 会再次初始化 NoneBot)。
+子进程按插件目录导入模块，需要完整的 configs.py 与字体，这里把插件复制到临时目录中运行。
+"""
+import multiprocessing
+import shutil
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from conftest import PACKAGE_NAME, PLUGIN_DIR, make_configs_source
+
+ImageFont = pytest.importorskip("PIL.ImageFont")
+Image = pytest.importorskip("PIL.Image")
+
+FONT_FILES = ("SourceHanSansSC-Regular.otf", "SourceHanSansSC-Bold.otf", "SourceHanSansSC-Heavy.otf")
+
+# 顶层的副作用每执行一次就在标记文件中追加一行，只有 __main__ 分支会启动进程池
+HOST_SCRIPT = textwrap.dedent('''
+    import sys
+
+    with open(sys.argv[1], "a") as marker:
+        marker.write("main\\n")
+
+    if __name__ == "__main__":
+        import multiprocessing
+        import runpy
+
+        marker_path, root, package_dir, resource_path, start_method = sys.argv[1:]
+        sys.path.insert(0, root)
+        runpy.run_path(f"{package_dir}/utils/worker_bootstrap.py")["install_package_stub"]("%s", package_dir)
+        from %s.utils.render_pool import ProcessRenderPool
+
+        ProcessRenderPool._mp_context = staticmethod(lambda: multiprocessing.get_context(start_method))
+        pool = ProcessRenderPool(2, resource_path, "jp", 1 << 24, 1 << 24)
+        pool.start()
+        assert pool.started
+        pool.shutdown()
+''' % (PACKAGE_NAME, PACKAGE_NAME))
+
+
+@pytest.fixture(scope="module")
+def plugin_copy(tmp_path_factory):
+    font = ImageFont.load_default(12)
+    if not isinstance(font, ImageFont.FreeTypeFont):
+        pytest.skip("Pillow 未启用 FreeType")
+    root = tmp_path_factory.mktemp("host")
+    package_dir = root / PACKAGE_NAME
+    shutil.copytree(PLUGIN_DIR, package_dir, ignore=shutil.ignore_patterns("__pycache__"))
+    (package_dir / "configs.py").write_text(make_configs_source(), encoding="utf-8")
+    # 任意 FreeType 字体都能满足预热，使用 Pillow 内置的默认字体
+    font_dir = package_dir / "resources" / "fonts"
+    font_dir.mkdir(parents=True)
+    for name in FONT_FILES:
+        (font_dir / name).write_bytes(font.font_bytes)
+    resource_path = root / "resources"
+    (resource_path / "metadata" / "jp").mkdir(parents=True)
+    site_map_dir = resource_path / "assets" / "jp" / "mysekai" / "site_map"
+    site_map_dir.mkdir(parents=True)
+    for site_id in (5, 6, 7, 8):
+        Image.new("RGBA", (1280, 1080), (90, 160, 90, 255)).save(site_map_dir / f"{site_id}.png")
+    return root, package_dir, resource_path
+
+
+@pytest.mark.parametrize("start_method", [m for m in ("forkserver", "spawn") if m in multiprocessing.get_all_start_methods()])
+def test_workers_do_not_rerun_host_main(plugin_copy, tmp_path, start_method):
+    root, package_dir, resource_path = plugin_copy
+    script, marker = tmp_path / "bot.py", tmp_path / "marker.txt"
+    script.write_text(HOST_SCRIPT, encoding="utf-8")
+    subprocess.run(
+        [sys.executable, str(script), str(marker), str(root), str(package_dir), str(resource_path), start_method],
+        check=True, timeout=120, cwd=tmp_path,
+    )
+    assert marker.read_text().splitlines() == ["main"]
@@ -0,0 +1,109 @@
+"""ResultCache 的 TTL 过期、按总体积淘汰、clear() 以及重启后的索引重建。"""
+import types
+
+import pytest
+
+pytest.importorskip("PIL")
+
+from mysekaianalyser_plugin.utils import result_cache as result_cache_module  # noqa: E402
+from mysekaianalyser_plugin.utils.pipeline import RenderedImages  # noqa: E402
+from mysekaianalyser_plugin.utils.result_cache import ResultCache  # noqa: E402
+
+TTL = 100
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(result_cache_module, "time", types.SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def _result(size: int, tag: bytes = b"s") -> RenderedImages:
+    # 统计图与地图各占一半体积
+    return RenderedImages(tag * (size // 2), tag * (size - size // 2))
+
+
+def _cached_keys(cache: ResultCache):
+    return sorted(path.name for path in cache.cache_dir.glob("*/*"))
+
+
+def test_get_returns_stored_images(tmp_path, clock):
+    cache = ResultCache(tmp_path, TTL, 1 << 20)
+    cache.put("aa01", RenderedImages(b"summary", None))
+    assert cache.get("aa01") == RenderedImages(b"summary", None)
+    assert cache.get("aa02") is None
+
+
+def test_ttl_expiry(tmp_path, clock):
+    cache = ResultCache(tmp_path, TTL, 1 << 20)
+    cache.put("aa01", _result(10))
+    clock.now += TTL - 1
+    assert cache.get("aa01") == _result(10)
+    clock.now += 2
+    assert cache.get("aa01") is None
+    assert _cached_keys(cache) == []
+
+
+def test_evict_removes_expired_entries(tmp_path, clock):
+    cache = ResultCache(tmp_path, TTL, 1 << 20)
+    cache.put("aa01", _result(10))
+    clock.now += TTL / 2
+    cache.put("bb02", _result(10))
+    clock.now += TTL / 2 + 1
+    cache.evict()
+    assert _cached_keys(cache) == ["bb02"]
+
+
+def test_size_eviction_drops_least_recently_used(tmp_path, clock):
+    cache = ResultCache(tmp_path, TTL, 250)
+    cache.put("aa01", _result(100, b"a"))
+    cache.put("bb02", _result(100, b"b"))
+    # 访问 aa01 后，最久未访问的是 bb02
+    assert cache.get("aa01") is not None
+    cache.put("cc03", _result(100, b"c"))
+    assert _cached_keys(cache) == ["aa01", "cc03"]
+    assert cache.get("bb02") is None
+
+
+def test_replacing_entry_keeps_size_accounting(tmp_path, clock):
+    cache = ResultCache(tmp_path, TTL, 250)
+    for _ in range(5):
+        cache.put("aa01", _result(100, b"a"))
+    cache.put("bb02", _result(100, b"b"))
+    assert _cached_keys(cache) == ["aa01", "bb02"]
+
+
+def test_clear(tmp_path, clock):
+    cache = ResultCache(tmp_path, TTL, 250)
+    cache.put("aa01", _result(100))
+    cache.put("bb02", _result(100))
+    cache.clear()
+    assert _cached_keys(cache) == []
+    assert cache.get("aa01") is None
+    # 清空后重新计算总体积，不会因为旧条目的体积而立即淘汰新条目
+    cache.put("cc03", _result(200))
+    cache.put("dd04", _result(40))
+    assert _cached_keys(cache) == ["cc03", "dd04"]
+
+
+def test_index_rebuilt_on_restart(tmp_path, clock):
+    cache = ResultCache(tmp_path, TTL, 1 << 20)
+    cache.put("aa01", _result(10))
+    cache.put("bb02", _result(10))
+    stale = tmp_path / "cc" / "cc03.tmp-deadbeef"
+    stale.mkdir(parents=True)
+
+    clock.now += TTL / 2
+    reopened = ResultCache(tmp_path, TTL, 1 << 20)
+    assert not stale.exists()
+    assert reopened.get("aa01") == _result(10)
+    clock.now += TTL / 2 + 1
+    assert reopened.get("bb02") is None
+
+
+def test_restart_evicts_when_over_budget(tmp_path, clock):
+    cache = ResultCache(tmp_path, TTL, 1 << 20)
+    for key in ("aa01", "bb02", "cc03"):
+        cache.put(key, _result(100))
+    assert len(_cached_keys(ResultCache(tmp_path, TTL, 250))) == 2